@@ -0,0 +1,15 @@
+import argparse
+
+from main.utils.logger import setup_root_logger
+from main.factories.compact_collection_factory import create_collection_compactor
+
+setup_root_logger()
+
+ap = argparse.ArgumentParser()
+ap.add_argument("-collection", "--collection", required=True, help="Collection name (will be used to determine root folder and manifest file)")
+ap.add_argument("-indexers", "--indexers", required=False, default=None, help="List of indexer names to compact. By default all indexers of the collection are compacted.", nargs='+')
+args = vars(ap.parse_args())
+
+collection_compactor = create_collection_compactor(args['collection'], args['indexers'])
+
+collection_compactor.run()
\ No newline at end of file
@@ -0,0 +1,15 @@
+import argparse
+
+from main.utils.logger import setup_root_logger
+from main.factories.reindex_collection_factory import create_collection_reindexer
+
+setup_root_logger()
+
+ap = argparse.ArgumentParser()
+ap.add_argument("-collection", "--collection", required=True, help="Collection name (will be used to determine root folder and manifest file)")
+ap.add_argument("-indexers", "--indexers", required=True, help="List of indexer names to build from stored embeddings, e.g. another FAISS index type for a model the collection is already indexed with", nargs='+')
+args = vars(ap.parse_args())
+
+collection_reindexer = create_collection_reindexer(args['collection'], args['indexers'])
+
+collection_reindexer.run()
\ No newline at end of file
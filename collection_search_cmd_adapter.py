@@ -1,18 +1,26 @@
+import sys
 import json
 import argparse
 import logging
 
 from main.utils.logger import setup_root_logger
 from main.utils.performance import log_execution_duration
-from main.factories.search_collection_factory import create_collection_searcher
+from main.factories.search_collection_factory import create_collection_searcher, create_federated_collections_searcher
 
 setup_root_logger()
 
 ap = argparse.ArgumentParser()
-ap.add_argument("-collection", "--collection", required=True, help="Collection name (will be used as root folder name)")
-ap.add_argument("-query", "--query", required=True, help="Text query for search")
+ap.add_argument("-collection", "--collection", required=True, nargs='+', help="Collection name (will be used as root folder name). Pass several names to search all of them at once, results are merged by score.")
+
+query_group = ap.add_mutually_exclusive_group(required=True)
+query_group.add_argument("-query", "--query", help="Text query for search")
+query_group.add_argument("-queriesFile", "--queriesFile", help="Path to a file with text queries (one per line). Queries are searched in batches and results are written as JSON lines.")
 
 ap.add_argument("-index", "--index", required=False, default="indexer_FAISS_IndexFlatL2__embeddings_all-MiniLM-L6-v2", help="Index that will be used for search")
+ap.add_argument("-hybridIndex", "--hybridIndex", required=False, default=None, help="Lexical index (e.g. indexer_BM25) to combine with --index by reciprocal rank fusion. Scores in results are then fused ranks (higher is better).")
+ap.add_argument("-nprobe", "--nprobe", required=False, type=int, default=None, help="Number of IVF lists probed per query for IVFFlat/IVFPQ FAISS indexes. Higher is slower but more accurate, see buildReport in the collection manifest.")
+ap.add_argument("-efSearch", "--efSearch", required=False, type=int, default=None, help="Size of the candidate list per query for HNSW FAISS indexes. Higher is slower but more accurate, see buildReport in the collection manifest.")
+ap.add_argument("-refineFactor", "--refineFactor", required=False, type=int, default=None, help="For PQRefine FAISS indexes - how many times more PQ candidates than requested are re-ranked by the stored SQ8 copy. Higher is slower but more accurate, see buildReport in the collection manifest.")
 
 ap.add_argument("-maxNumberOfChunks", "--maxNumberOfChunks", required=False, type=int, default=None, help="Max number of text chunks in result")
 ap.add_argument("-maxNumberOfDocuments", "--maxNumberOfDocuments", required=False, type=int, default=10, help="Max number of documents in result")
@@ -20,17 +28,67 @@ ap.add_argument("-maxNumberOfDocuments", "--maxNumberOfDocuments", required=Fals
 ap.add_argument("-includeFullText", "--includeFullText", action="store_true", required=False, default=False, help="If passed - full text content will be included in the search result.")
 ap.add_argument("-includeAllChunksText", "--includeAllChunksText", action="store_true", required=False, default=False, help="If passed - all chunks text content will be included in the search result.")
 ap.add_argument("-includeMatchedChunksText", "--includeMatchedChunksText", action="store_true", required=False, default=False, help="If passed - matched chunks text content will be included in the search result.")
+
+ap.add_argument("-queryEmbeddingCacheSize", "--queryEmbeddingCacheSize", required=False, type=int, default=1000, help="Max number of query embeddings kept in memory, so repeated queries skip the embedding model. 0 disables the in-memory cache.")
+ap.add_argument("-persistQueryEmbeddings", "--persistQueryEmbeddings", action="store_true", required=False, default=False, help="If passed - query embeddings are also stored in ./data/caches/query_embeddings.sqlite, so cache hits survive restarts.")
+ap.add_argument("-queriesBatchSize", "--queriesBatchSize", required=False, type=int, default=64, help="Number of queries from --queriesFile embedded and searched together")
+ap.add_argument("-output", "--output", required=False, default=None, help="Path to a JSON lines file for --queriesFile results. If not passed, results are written to stdout.")
 args = vars(ap.parse_args())
 
-searcher = create_collection_searcher(collection_name=args['collection'], index_name=args['index'])
+if len(args['collection']) == 1:
+    searcher = create_collection_searcher(collection_name=args['collection'][0], 
+                                          index_name=args['index'],
+                                          query_embedding_cache_size=args['queryEmbeddingCacheSize'],
+                                          persist_query_embeddings=args['persistQueryEmbeddings'],
+                                          hybrid_index_name=args['hybridIndex'],
+                                          nprobe=args['nprobe'],
+                                          ef_search=args['efSearch'],
+                                          refine_factor=args['refineFactor'])
+else:
+    searcher = create_federated_collections_searcher(collection_names=args['collection'],
+                                                     index_name=args['index'],
+                                                     query_embedding_cache_size=args['queryEmbeddingCacheSize'],
+                                                     persist_query_embeddings=args['persistQueryEmbeddings'],
+                                                     hybrid_index_name=args['hybridIndex'],
+                                                     nprobe=args['nprobe'],
+                                                     ef_search=args['efSearch'],
+                                                     refine_factor=args['refineFactor'])
+
+collections_description = ', '.join(args['collection'])
 
 max_number_of_chunks = args['maxNumberOfChunks'] if args['maxNumberOfChunks'] is not None else args['maxNumberOfDocuments'] * 3
-search_result = log_execution_duration(lambda: searcher.search(args['query'],
-                                                               max_number_of_chunks=max_number_of_chunks, 
-                                                               max_number_of_documents=args['maxNumberOfDocuments'], 
-                                                               include_text_content=args['includeFullText'], 
-                                                               include_matched_chunks_content=args['includeMatchedChunksText'],
-                                                               include_all_chunks_content=args['includeAllChunksText']),
-                                       identifier=f"Searching collection: \"{args['collection']}\" by query: \"{args['query']}\"")
-
-logging.info(f"Search results:\n{json.dumps(search_result, indent=2, ensure_ascii=False)}")
\ No newline at end of file
+search_parameters = {
+    "max_number_of_chunks": max_number_of_chunks,
+    "max_number_of_documents": args['maxNumberOfDocuments'],
+    "include_text_content": args['includeFullText'],
+    "include_matched_chunks_content": args['includeMatchedChunksText'],
+    "include_all_chunks_content": args['includeAllChunksText'],
+}
+
+def search_queries_file(output_file):
+    with open(args['queriesFile'], 'r', encoding="utf-8") as queries_file:
+        queries = [line.strip() for line in queries_file if line.strip()]
+
+    for batch_start in range(0, len(queries), args['queriesBatchSize']):
+        batch_queries = queries[batch_start:batch_start + args['queriesBatchSize']]
+
+        for query, search_result in zip(batch_queries, searcher.search_many(batch_queries, **search_parameters)):
+            output_file.write(json.dumps({ "query": query, **search_result }, ensure_ascii=False) + "\n")
+
+    return len(queries)
+
+if args['queriesFile']:
+    if args['output']:
+        with open(args['output'], 'w', encoding="utf-8") as output_file:
+            number_of_queries = log_execution_duration(lambda: search_queries_file(output_file),
+                                                       identifier=f"Searching collection: \"{collections_description}\" by queries from: \"{args['queriesFile']}\"")
+    else:
+        number_of_queries = log_execution_duration(lambda: search_queries_file(sys.stdout),
+                                                   identifier=f"Searching collection: \"{collections_description}\" by queries from: \"{args['queriesFile']}\"")
+
+    logging.info(f"Searched {number_of_queries} queries")
+else:
+    search_result = log_execution_duration(lambda: searcher.search(args['query'], **search_parameters),
+                                           identifier=f"Searching collection: \"{collections_description}\" by query: \"{args['query']}\"")
+
+    logging.info(f"Search results:\n{json.dumps(search_result, indent=2, ensure_ascii=False)}")
@@ -4,7 +4,7 @@ import argparse
 
 from mcp.server.fastmcp import FastMCP
 
-from main.factories.search_collection_factory import create_collection_searcher
+from main.factories.search_collection_factory import create_collection_searcher, create_federated_collections_searcher
 from main.utils.logger import setup_root_logger
 
 setup_root_logger()
@@ -12,21 +12,47 @@ setup_root_logger()
 mcp = FastMCP("documents-search")
 
 ap = argparse.ArgumentParser()
-ap.add_argument("-collection", "--collection", required=True, help="Collection name (will be used as root folder name)")
+ap.add_argument("-collection", "--collection", required=True, nargs='+', help="Collection name (will be used as root folder name). Pass several names to expose one tool that searches all of them at once, results are merged by score.")
 ap.add_argument("-index", "--index", required=False, default="indexer_FAISS_IndexFlatL2__embeddings_all-MiniLM-L6-v2", help="Index that will be used for search")
+ap.add_argument("-hybridIndex", "--hybridIndex", required=False, default=None, help="Lexical index (e.g. indexer_BM25) to combine with --index by reciprocal rank fusion. Scores in results are then fused ranks (higher is better).")
+ap.add_argument("-nprobe", "--nprobe", required=False, type=int, default=None, help="Number of IVF lists probed per query for IVFFlat/IVFPQ FAISS indexes. Higher is slower but more accurate, see buildReport in the collection manifest.")
+ap.add_argument("-efSearch", "--efSearch", required=False, type=int, default=None, help="Size of the candidate list per query for HNSW FAISS indexes. Higher is slower but more accurate, see buildReport in the collection manifest.")
+ap.add_argument("-refineFactor", "--refineFactor", required=False, type=int, default=None, help="For PQRefine FAISS indexes - how many times more PQ candidates than requested are re-ranked by the stored SQ8 copy. Higher is slower but more accurate, see buildReport in the collection manifest.")
 
 ap.add_argument("-maxNumberOfChunks", "--maxNumberOfChunks", required=False, type=int, default=100, help="Max number of text chunks in result")
 ap.add_argument("-maxNumberOfDocuments", "--maxNumberOfDocuments", required=False, type=int, default=None, help="Max number of documents in result")
 
 ap.add_argument("-includeFullText", "--includeFullText", action="store_true", required=False, default=False, help="If passed - full text content will be included in the search result. By default only matched chunks content is included. If passed, it's better to reduce --maxNumberOfChunks or set small --maxNumberOfDocuments like 10-30 to avoid too big response and breaking AI agent.")
+ap.add_argument("-queryEmbeddingCacheSize", "--queryEmbeddingCacheSize", required=False, type=int, default=1000, help="Max number of query embeddings kept in memory, so repeated queries skip the embedding model. 0 disables the in-memory cache.")
+ap.add_argument("-persistQueryEmbeddings", "--persistQueryEmbeddings", action="store_true", required=False, default=False, help="If passed - query embeddings are also stored in ./data/caches/query_embeddings.sqlite, so cache hits survive restarts.")
+ap.add_argument("-documentCacheSizeMb", "--documentCacheSizeMb", required=False, type=int, default=256, help="Max size (in MB of document JSON) of parsed documents kept in memory between searches to build results faster")
 args = vars(ap.parse_args())
 
-searcher = create_collection_searcher(collection_name=args['collection'], index_name=args['index'])
+if len(args['collection']) == 1:
+    searcher = create_collection_searcher(collection_name=args['collection'][0], 
+                                          index_name=args['index'], 
+                                          document_cache_max_size_bytes=args['documentCacheSizeMb'] * 1024 * 1024,
+                                          query_embedding_cache_size=args['queryEmbeddingCacheSize'],
+                                          persist_query_embeddings=args['persistQueryEmbeddings'],
+                                          hybrid_index_name=args['hybridIndex'],
+                                          nprobe=args['nprobe'],
+                                          ef_search=args['efSearch'],
+                                          refine_factor=args['refineFactor'])
+else:
+    searcher = create_federated_collections_searcher(collection_names=args['collection'],
+                                                     index_name=args['index'],
+                                                     document_cache_max_size_bytes=args['documentCacheSizeMb'] * 1024 * 1024,
+                                                     query_embedding_cache_size=args['queryEmbeddingCacheSize'],
+                                                     persist_query_embeddings=args['persistQueryEmbeddings'],
+                                                     hybrid_index_name=args['hybridIndex'],
+                                                     nprobe=args['nprobe'],
+                                                     ef_search=args['efSearch'],
+                                                     refine_factor=args['refineFactor'])
 
 tool_description = """The tool allows searching in collection of documents by vector search. 
-Each document contains 'url' field, if you consider a document as relevant to the query, always include the 'url' field in the response, put it close to the information used from the document"""
+Each document contains 'url' field (and 'collectionName' field if several collections are searched), if you consider a document as relevant to the query, always include the 'url' field in the response, put it close to the information used from the document"""
 
-@mcp.tool(name=f"search_{args['collection']}", description=tool_description)
+@mcp.tool(name=f"search_{'_'.join(args['collection'])}", description=tool_description)
 def search_documents(query: str) -> str:
     search_results = searcher.search(query, 
                                      max_number_of_chunks=args['maxNumberOfChunks'], 
@@ -7,8 +7,18 @@ setup_root_logger()
 
 ap = argparse.ArgumentParser()
 ap.add_argument("-collection", "--collection", required=True, help="Collection name (will be used to determine root folder and manifest file)")
-args = vars(ap.parse_args())
+ap.add_argument("-embeddingCacheSizeMb", "--embeddingCacheSizeMb", required=False, type=int, default=2048, help="Max size (in MB) of the chunk embedding cache in ./data/caches/chunk_embeddings.sqlite shared by all collections. Chunks with cached embeddings (same model and text) are not embedded again. 0 disables the cache.")
+ap.add_argument("-embeddingWorkers", "--embeddingWorkers", required=False, type=int, default=0, help="Number of processes that embed chunks with sentence-transformers models in parallel. 0 (default) embeds in the main process. Useful on machines with many CPU cores.")
+ap.add_argument("-embeddingThreadsPerWorker", "--embeddingThreadsPerWorker", required=False, type=int, default=None, help="Number of PyTorch threads of each embedding worker. By default CPU cores are split evenly between workers.")
+ap.add_argument("-resume", "--resume", action="store_true", required=False, default=False, help="If passed and a previous update of the collection was interrupted, the update continues from its last checkpoint (saved every 10 minutes). Documents are read again, but already indexed ones are not embedded again.")
 
-create_collection_updater = create_collection_updater(args['collection'])
+if __name__ == "__main__":
+    args = vars(ap.parse_args())
 
-create_collection_updater.run()
\ No newline at end of file
+    create_collection_updater = create_collection_updater(args['collection'],
+                                                          embedding_cache_size_bytes=args['embeddingCacheSizeMb'] * 1024 * 1024,
+                                                          number_of_embedding_workers=args['embeddingWorkers'],
+                                                          number_of_threads_per_embedding_worker=args['embeddingThreadsPerWorker'],
+                                                          resume=args['resume'])
+
+    create_collection_updater.run()
\ No newline at end of file
@@ -17,48 +17,58 @@ ap.add_argument("-url", "--url", required=True, help="Confluence base url (e.g.,
 ap.add_argument("-cql", "--cql", required=True, help="Confluence query (CQL) to get pages for indexing")
 
 ap.add_argument("-indexers", "--indexers", required=False, default=["indexer_FAISS_IndexFlatL2__embeddings_all-MiniLM-L6-v2"], help="List on indexer names", nargs='+')
+ap.add_argument("-embeddingCacheSizeMb", "--embeddingCacheSizeMb", required=False, type=int, default=2048, help="Max size (in MB) of the chunk embedding cache in ./data/caches/chunk_embeddings.sqlite shared by all collections. Chunks with cached embeddings (same model and text) are not embedded again. 0 disables the cache.")
+ap.add_argument("-embeddingWorkers", "--embeddingWorkers", required=False, type=int, default=0, help="Number of processes that embed chunks with sentence-transformers models in parallel. 0 (default) embeds in the main process. Useful on machines with many CPU cores.")
+ap.add_argument("-embeddingThreadsPerWorker", "--embeddingThreadsPerWorker", required=False, type=int, default=None, help="Number of PyTorch threads of each embedding worker. By default CPU cores are split evenly between workers.")
+ap.add_argument("-resume", "--resume", action="store_true", required=False, default=False, help="If passed and a previous creation of the collection was interrupted, creation continues from its last checkpoint (saved every 10 minutes) instead of starting over. Documents are read again, but already indexed ones are not embedded again.")
 
 ap.add_argument("-readOnlyFirstLevelComments", "--readOnlyFirstLevelComments", action="store_true", required=False, default=False, help="Confluence has hierarchical comments, first level comments are read by default, but for other ones additional call is needed what can slowdown the process. Pass this argument to read only first level comments and have better performance.")
-args = vars(ap.parse_args())
-
-# Detect if it's Confluence Cloud or Server/Data Center based on URL
-is_cloud = args['url'].endswith('.atlassian.net')
-
-if is_cloud:
-    # Confluence Cloud setup
-    email = os.environ.get('ATLASSIAN_EMAIL')
-    api_token = os.environ.get('ATLASSIAN_TOKEN')
-
-    if not email or not api_token:
-        raise ValueError("Both 'ATLASSIAN_EMAIL' and 'ATLASSIAN_TOKEN' environment variables must be provided for Confluence Cloud.")
-
-    confluence_document_reader = ConfluenceCloudDocumentReader(base_url=args['url'],
-                                                               query=args['cql'],
-                                                               email=email,
-                                                               api_token=api_token,
-                                                               read_all_comments=(not args['readOnlyFirstLevelComments']))
-    confluence_document_converter = ConfluenceCloudDocumentConverter()
-
-else:
-    # Confluence Server/Data Center setup
-    token = os.environ.get('CONF_TOKEN')
-    login = os.environ.get('CONF_LOGIN')
-    password = os.environ.get('CONF_PASSWORD')
-
-    if not token and (not login or not password):
-        raise ValueError("Either 'token' ('CONF_TOKEN' env variable) or both 'login' ('CONF_LOGIN' env variable) and 'password' ('CONF_PASSWORD' env variable) must be provided.")
-
-    confluence_document_reader = ConfluenceDocumentReader(base_url=args['url'],
-                                                          query=args['cql'],
-                                                          token=token,
-                                                          login=login, 
-                                                          password=password,
-                                                          read_all_comments=(not args['readOnlyFirstLevelComments']))
-    confluence_document_converter = ConfluenceDocumentConverter()
-
-confluence_collection_creator = create_collection_creator(collection_name=args['collection'],
-                                                          indexers=args['indexers'],
-                                                          document_reader=confluence_document_reader,
-                                                          document_converter=confluence_document_converter)
-
-confluence_collection_creator.run()
\ No newline at end of file
+
+if __name__ == "__main__":
+    args = vars(ap.parse_args())
+
+    # Detect if it's Confluence Cloud or Server/Data Center based on URL
+    is_cloud = args['url'].endswith('.atlassian.net')
+
+    if is_cloud:
+        # Confluence Cloud setup
+        email = os.environ.get('ATLASSIAN_EMAIL')
+        api_token = os.environ.get('ATLASSIAN_TOKEN')
+
+        if not email or not api_token:
+            raise ValueError("Both 'ATLASSIAN_EMAIL' and 'ATLASSIAN_TOKEN' environment variables must be provided for Confluence Cloud.")
+
+        confluence_document_reader = ConfluenceCloudDocumentReader(base_url=args['url'],
+                                                                   query=args['cql'],
+                                                                   email=email,
+                                                                   api_token=api_token,
+                                                                   read_all_comments=(not args['readOnlyFirstLevelComments']))
+        confluence_document_converter = ConfluenceCloudDocumentConverter()
+
+    else:
+        # Confluence Server/Data Center setup
+        token = os.environ.get('CONF_TOKEN')
+        login = os.environ.get('CONF_LOGIN')
+        password = os.environ.get('CONF_PASSWORD')
+
+        if not token and (not login or not password):
+            raise ValueError("Either 'token' ('CONF_TOKEN' env variable) or both 'login' ('CONF_LOGIN' env variable) and 'password' ('CONF_PASSWORD' env variable) must be provided.")
+
+        confluence_document_reader = ConfluenceDocumentReader(base_url=args['url'],
+                                                              query=args['cql'],
+                                                              token=token,
+                                                              login=login, 
+                                                              password=password,
+                                                              read_all_comments=(not args['readOnlyFirstLevelComments']))
+        confluence_document_converter = ConfluenceDocumentConverter()
+
+    confluence_collection_creator = create_collection_creator(collection_name=args['collection'],
+                                                              indexers=args['indexers'],
+                                                              document_reader=confluence_document_reader,
+                                                              document_converter=confluence_document_converter,
+                                                              embedding_cache_size_bytes=args['embeddingCacheSizeMb'] * 1024 * 1024,
+                                                              number_of_embedding_workers=args['embeddingWorkers'],
+                                                              number_of_threads_per_embedding_worker=args['embeddingThreadsPerWorker'],
+                                                              resume=args['resume'])
+
+    confluence_collection_creator.run()
\ No newline at end of file
@@ -16,23 +16,33 @@ ap.add_argument("-includePatterns", "--includePatterns", required=False, default
 ap.add_argument("-excludePatterns", "--excludePatterns", required=False, default=[], help="List of file patterns to NOT include into collection", nargs='+')
 
 ap.add_argument("-indexers", "--indexers", required=False, default=["indexer_FAISS_IndexFlatL2__embeddings_all-MiniLM-L6-v2"], help="List on indexer names", nargs='+')
+ap.add_argument("-embeddingCacheSizeMb", "--embeddingCacheSizeMb", required=False, type=int, default=2048, help="Max size (in MB) of the chunk embedding cache in ./data/caches/chunk_embeddings.sqlite shared by all collections. Chunks with cached embeddings (same model and text) are not embedded again. 0 disables the cache.")
+ap.add_argument("-embeddingWorkers", "--embeddingWorkers", required=False, type=int, default=0, help="Number of processes that embed chunks with sentence-transformers models in parallel. 0 (default) embeds in the main process. Useful on machines with many CPU cores.")
+ap.add_argument("-embeddingThreadsPerWorker", "--embeddingThreadsPerWorker", required=False, type=int, default=None, help="Number of PyTorch threads of each embedding worker. By default CPU cores are split evenly between workers.")
+ap.add_argument("-resume", "--resume", action="store_true", required=False, default=False, help="If passed and a previous creation of the collection was interrupted, creation continues from its last checkpoint (saved every 10 minutes) instead of starting over. Documents are read again, but already indexed ones are not embedded again.")
 
 ap.add_argument("-failFast", "--failFast", action="store_true", required=False, default=False, help="If passed - the process will stop on the first error. Otherwise, it will try to process all files and log errors for those that failed.")
-args = vars(ap.parse_args())
-
-files_document_reader = FilesDocumentReader(base_path=args['basePath'], 
-                                            include_patterns=args['includePatterns'], 
-                                            exclude_patterns=args['excludePatterns'],
-                                            fail_fast=args['failFast'])
-files_document_converter = FilesDocumentConverter()
-
-collection_name = args['collection'] if args['collection'] else os.path.basename(args['basePath'])
-files_collection_creator = create_collection_creator(collection_name=collection_name,
-                                                     indexers=args['indexers'],
-                                                     document_reader=files_document_reader,
-                                                     document_converter=files_document_converter,
-                                                     use_cache=False)
-
-files_collection_creator.run()
+
+if __name__ == "__main__":
+    args = vars(ap.parse_args())
+
+    files_document_reader = FilesDocumentReader(base_path=args['basePath'], 
+                                                include_patterns=args['includePatterns'], 
+                                                exclude_patterns=args['excludePatterns'],
+                                                fail_fast=args['failFast'])
+    files_document_converter = FilesDocumentConverter()
+
+    collection_name = args['collection'] if args['collection'] else os.path.basename(args['basePath'])
+    files_collection_creator = create_collection_creator(collection_name=collection_name,
+                                                         indexers=args['indexers'],
+                                                         document_reader=files_document_reader,
+                                                         document_converter=files_document_converter,
+                                                         use_cache=False,
+                                                         embedding_cache_size_bytes=args['embeddingCacheSizeMb'] * 1024 * 1024,
+                                                         number_of_embedding_workers=args['embeddingWorkers'],
+                                                         number_of_threads_per_embedding_worker=args['embeddingThreadsPerWorker'],
+                                                         resume=args['resume'])
+
+    files_collection_creator.run()
 
 
@@ -17,46 +17,56 @@ ap.add_argument("-url", "--url", required=True, help="Jira base url (Cloud: http
 ap.add_argument("-jql", "--jql", required=True, help="Jira query (JQL) to get tickets for indexing")
 
 ap.add_argument("-indexers", "--indexers", required=False, default=["indexer_FAISS_IndexFlatL2__embeddings_all-MiniLM-L6-v2"], help="list on indexer names", nargs='+')
-args = vars(ap.parse_args())
+ap.add_argument("-embeddingCacheSizeMb", "--embeddingCacheSizeMb", required=False, type=int, default=2048, help="Max size (in MB) of the chunk embedding cache in ./data/caches/chunk_embeddings.sqlite shared by all collections. Chunks with cached embeddings (same model and text) are not embedded again. 0 disables the cache.")
+ap.add_argument("-embeddingWorkers", "--embeddingWorkers", required=False, type=int, default=0, help="Number of processes that embed chunks with sentence-transformers models in parallel. 0 (default) embeds in the main process. Useful on machines with many CPU cores.")
+ap.add_argument("-embeddingThreadsPerWorker", "--embeddingThreadsPerWorker", required=False, type=int, default=None, help="Number of PyTorch threads of each embedding worker. By default CPU cores are split evenly between workers.")
+ap.add_argument("-resume", "--resume", action="store_true", required=False, default=False, help="If passed and a previous creation of the collection was interrupted, creation continues from its last checkpoint (saved every 10 minutes) instead of starting over. Documents are read again, but already indexed ones are not embedded again.")
 
-# Detect if it's Jira Cloud or Server/Data Center based on URL
-is_cloud = args['url'].endswith('.atlassian.net')
+if __name__ == "__main__":
+    args = vars(ap.parse_args())
 
-if is_cloud:
-    # Jira Cloud authentication
-    email = os.environ.get('ATLASSIAN_EMAIL')
-    api_token = os.environ.get('ATLASSIAN_TOKEN')
+    # Detect if it's Jira Cloud or Server/Data Center based on URL
+    is_cloud = args['url'].endswith('.atlassian.net')
+
+    if is_cloud:
+        # Jira Cloud authentication
+        email = os.environ.get('ATLASSIAN_EMAIL')
+        api_token = os.environ.get('ATLASSIAN_TOKEN')
     
-    if not email or not api_token:
-        raise ValueError("Both 'ATLASSIAN_EMAIL' and 'ATLASSIAN_TOKEN' environment variables must be provided for Jira Cloud.")
+        if not email or not api_token:
+            raise ValueError("Both 'ATLASSIAN_EMAIL' and 'ATLASSIAN_TOKEN' environment variables must be provided for Jira Cloud.")
     
-    jira_document_reader = JiraCloudDocumentReader(base_url=args['url'],
-                                                   query=args['jql'],
-                                                   email=email,
-                                                   api_token=api_token)
+        jira_document_reader = JiraCloudDocumentReader(base_url=args['url'],
+                                                       query=args['jql'],
+                                                       email=email,
+                                                       api_token=api_token)
     
-    jira_document_converter = JiraCloudDocumentConverter()
+        jira_document_converter = JiraCloudDocumentConverter()
     
-else:
-    # Jira Server/Data Center authentication
-    token = os.environ.get('JIRA_TOKEN')
-    login = os.environ.get('JIRA_LOGIN')
-    password = os.environ.get('JIRA_PASSWORD')
-
-    if not token and (not login or not password):
-        raise ValueError("Either 'token' ('JIRA_TOKEN' env variable) or both 'login' ('JIRA_LOGIN' env variable) and 'password' ('JIRA_PASSWORD' env variable) must be provided for Jira Server/Data Center.")
-
-    jira_document_reader = JiraDocumentReader(base_url=args['url'],
-                                              query=args['jql'],
-                                              token=token,
-                                              login=login, 
-                                              password=password)
+    else:
+        # Jira Server/Data Center authentication
+        token = os.environ.get('JIRA_TOKEN')
+        login = os.environ.get('JIRA_LOGIN')
+        password = os.environ.get('JIRA_PASSWORD')
+
+        if not token and (not login or not password):
+            raise ValueError("Either 'token' ('JIRA_TOKEN' env variable) or both 'login' ('JIRA_LOGIN' env variable) and 'password' ('JIRA_PASSWORD' env variable) must be provided for Jira Server/Data Center.")
+
+        jira_document_reader = JiraDocumentReader(base_url=args['url'],
+                                                  query=args['jql'],
+                                                  token=token,
+                                                  login=login, 
+                                                  password=password)
     
-    jira_document_converter = JiraDocumentConverter()
+        jira_document_converter = JiraDocumentConverter()
 
-jira_collection_creator = create_collection_creator(collection_name=args['collection'],
-                                                     indexers=args['indexers'],
-                                                     document_reader=jira_document_reader,
-                                                     document_converter=jira_document_converter)
+    jira_collection_creator = create_collection_creator(collection_name=args['collection'],
+                                                         indexers=args['indexers'],
+                                                         document_reader=jira_document_reader,
+                                                         document_converter=jira_document_converter,
+                                                         embedding_cache_size_bytes=args['embeddingCacheSizeMb'] * 1024 * 1024,
+                                                         number_of_embedding_workers=args['embeddingWorkers'],
+                                                         number_of_threads_per_embedding_worker=args['embeddingThreadsPerWorker'],
+                                                         resume=args['resume'])
 
-jira_collection_creator.run()
\ No newline at end of file
+    jira_collection_creator.run()
\ No newline at end of file
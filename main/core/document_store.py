@@ -0,0 +1,369 @@
+import json
+import mmap
+import zlib
+import struct
+import logging
+import threading
+
+import numpy as np
+
+from ..utils.content_hash import compute_text_hash
+
+# Every record is an id length, a compressed document length and CRC32 of both, followed by the id and the document
+RECORD_HEADER = struct.Struct("<III")
+# Sorted by id hash, so a document is found by binary search in the memory-mapped index.
+# 64-bit hashes of ids do not collide in practice, ids stored in records are still checked on read.
+INDEX_DTYPE = np.dtype([("idHash", "<u8"), ("segmentNumber", "<i4"), ("length", "<i4"), ("offset", "<i8")])
+
+# Records are written to the active segment in groups instead of one small write per document
+WRITE_BUFFER_MAX_BYTES = 4 * 1024 * 1024
+MAX_SEGMENT_BYTES = 256 * 1024 * 1024
+# Segments mostly taken by replaced documents, and small segments when there are many of them, are merged into the active segment
+MAX_REPLACED_BYTES_RATIO = 0.5
+SMALL_SEGMENT_BYTES = MAX_SEGMENT_BYTES // 8
+MAX_NUMBER_OF_SMALL_SEGMENTS = 8
+
+class DocumentStore:
+    def __init__(self, persister, collection_name):
+        self.persister = persister
+        self.base_path = DocumentStore.__build_base_path(collection_name)
+        self.lock = threading.Lock()
+        # Collections of older versions keep documents as JSON files until they are migrated, they are read from there
+        self.json_documents_path = None
+
+        if persister.is_path_exists(f"{self.base_path}/info.json"):
+            self.info = json.loads(persister.read_text_file(f"{self.base_path}/info.json"))
+            self.index = persister.read_numpy_file(f"{self.base_path}/index.npy", mmap_mode="r")
+        else:
+            self.info = { "segments": [], "numberOfDocuments": 0, "numberOfDocumentBytes": 0 }
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+            if DocumentStore.has_json_documents(persister, collection_name):
+                self.json_documents_path = DocumentStore.__build_json_documents_path(collection_name)
+
+        # Bytes of live records, kept up to date by saves so statistics never need a pass over the index (stores of older versions count it once)
+        self.number_of_document_bytes = self.info["numberOfDocumentBytes"] if "numberOfDocumentBytes" in self.info else int(self.index["length"].sum())
+
+        # Sizes of segments including records written after the last save, the info keeps only saved ones
+        self.segment_sizes = { segment["number"]: segment["numberOfBytes"] for segment in self.info["segments"] }
+        self.segment_views = {}
+        # Search processes map segments lazily and keep reading the index they loaded until the manifest changes,
+        # so merged segments are removed only by the first save of the next run, their files stay until then
+        self.removable_segment_numbers = list(self.info.get("obsoleteSegmentNumbers", []))
+        self.obsolete_segment_numbers = []
+        # Records written after the last save by id hash, the active segment works as a write-ahead log for them
+        self.pending_entries = {}
+        self.write_buffer = bytearray()
+        self.number_of_flushed_bytes = None
+
+    @staticmethod
+    def load(persister, collection_name):
+        return DocumentStore(persister, collection_name)
+
+    @staticmethod
+    def has_json_documents(persister, collection_name):
+        return persister.is_path_exists(DocumentStore.__build_json_documents_path(collection_name))
+
+    @staticmethod
+    def migrate_json_documents(persister, collection_name):
+        # Returns False when the documents were already migrated by a previous run, JSON files are left for remove_json_documents
+        document_store = DocumentStore(persister, collection_name)
+        if document_store.json_documents_path is None:
+            return False
+
+        document_files = persister.read_folder_files(document_store.json_documents_path)
+
+        logging.info(f"Migrating {len(document_files)} documents of {document_store.json_documents_path} to the document store")
+
+        for document_file in document_files:
+            document = json.loads(persister.read_text_file(f"{document_store.json_documents_path}/{document_file}"))
+            document_store.put(document["id"], document)
+        document_store.save()
+
+        return True
+
+    @staticmethod
+    def remove_json_documents(persister, collection_name):
+        persister.remove_folder(DocumentStore.__build_json_documents_path(collection_name))
+
+    def put(self, document_id, document):
+        data = zlib.compress(json.dumps(self.__compact_chunks(document), ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        encoded_document_id = document_id.encode("utf-8")
+        record = RECORD_HEADER.pack(len(encoded_document_id), len(data), zlib.crc32(encoded_document_id + data)) + encoded_document_id + data
+
+        with self.lock:
+            self.__append_record(compute_text_hash(document_id), record)
+
+    def read_document(self, document_id):
+        # Returns the document with the size of its JSON, or None for unknown ids
+        if self.json_documents_path is not None:
+            return self.__read_json_document(document_id)
+
+        id_hash = compute_text_hash(document_id)
+
+        with self.lock:
+            entry = self.pending_entries.get(id_hash)
+            if entry is not None:
+                self.__flush_write_buffer()
+            else:
+                position = np.searchsorted(self.index["idHash"], np.uint64(id_hash))
+                if position == len(self.index) or self.index["idHash"][position] != id_hash:
+                    return None
+                entry = (int(self.index["segmentNumber"][position]), int(self.index["offset"][position]), int(self.index["length"][position]))
+
+            record = self.__read_record(*entry)
+
+        id_length, data_length, _ = RECORD_HEADER.unpack_from(record)
+        if record[RECORD_HEADER.size:RECORD_HEADER.size + id_length].decode("utf-8") != document_id:
+            return None
+
+        document_content = zlib.decompress(record[RECORD_HEADER.size + id_length:RECORD_HEADER.size + id_length + data_length])
+
+        return self.__expand_chunks(json.loads(document_content)), len(document_content)
+
+    def get_number_of_documents(self):
+        with self.lock:
+            if not self.pending_entries:
+                return len(self.index)
+
+            pending_id_hashes = np.fromiter(self.pending_entries.keys(), dtype=np.uint64, count=len(self.pending_entries))
+            return len(self.index) + int(np.count_nonzero(~np.isin(pending_id_hashes, self.index["idHash"])))
+
+    def get_statistics(self):
+        # Statistics of the saved store, documents written after the last save are not included
+        with self.lock:
+            return {
+                "numberOfDocuments": self.info["numberOfDocuments"],
+                "numberOfDocumentBytes": self.number_of_document_bytes,
+                "numberOfSegmentBytes": sum(segment["numberOfBytes"] for segment in self.info["segments"]),
+            }
+
+    def save(self):
+        with self.lock:
+            # Segments merged by the previous run are not referenced by any index that is still used
+            self.removable_segment_numbers = self.__remove_segment_files(self.removable_segment_numbers)
+
+            self.__flush_write_buffer()
+            index = self.__apply_pending_entries(self.index)
+
+            merged_segment_numbers = self.__choose_segments_to_merge(index)
+            if merged_segment_numbers:
+                index = self.__merge_segments(index, merged_segment_numbers)
+                self.obsolete_segment_numbers.extend(merged_segment_numbers)
+                for segment_number in merged_segment_numbers:
+                    self.__close_segment_view(segment_number)
+
+            # Index is saved before the info, records are always written before both, so saved state never points to missing records
+            self.persister.save_numpy_file(index, f"{self.base_path}/index.npy")
+            self.info = {
+                "segments": [{ "number": segment_number, "numberOfBytes": number_of_bytes } for segment_number, number_of_bytes in sorted(self.segment_sizes.items())],
+                "numberOfDocuments": len(index),
+                "numberOfDocumentBytes": self.number_of_document_bytes,
+                "obsoleteSegmentNumbers": self.removable_segment_numbers + self.obsolete_segment_numbers,
+            }
+            self.persister.save_text_file(json.dumps(self.info, indent=2), f"{self.base_path}/info.json")
+            self.index = index
+
+    def close(self):
+        with self.lock:
+            for segment_number in list(self.segment_views):
+                self.__close_segment_view(segment_number)
+
+    def __compact_chunks(self, document):
+        # Chunks are parts of the document text (with overlaps), so they are stored as [start, end] spans of the text instead of copies.
+        # Chunks that are not in the text as they are (e.g. a title chunk) keep their text.
+        text = document.get("text")
+        if not text or "chunks" not in document:
+            return document
+
+        compact_chunks = []
+        search_start = 0
+        for chunk in document["chunks"]:
+            indexed_data = chunk["indexedData"]
+            start = text.find(indexed_data, search_start) if indexed_data else -1
+            if start == -1:
+                # Splitters keep the order of chunks, but a chunk can be missed from the current position, e.g. after a title chunk
+                start = text.find(indexed_data) if indexed_data else -1
+            if start == -1:
+                compact_chunks.append(chunk)
+                continue
+
+            compact_chunks.append({ **{ key: value for key, value in chunk.items() if key != "indexedData" }, "span": [start, start + len(indexed_data)] })
+            search_start = start
+
+        return { **document, "chunks": compact_chunks }
+
+    def __expand_chunks(self, document):
+        if "chunks" not in document:
+            return document
+
+        text = document.get("text")
+        for chunk in document["chunks"]:
+            span = chunk.pop("span", None)
+            if span is not None:
+                chunk["indexedData"] = text[span[0]:span[1]]
+
+        return document
+
+    def __append_record(self, id_hash, record):
+        self.__prepare_for_writing()
+
+        active_segment_number = max(self.segment_sizes)
+        if self.segment_sizes[active_segment_number] > 0 and self.segment_sizes[active_segment_number] + len(record) > MAX_SEGMENT_BYTES:
+            self.__flush_write_buffer()
+            active_segment_number += 1
+            self.segment_sizes[active_segment_number] = 0
+            self.number_of_flushed_bytes = 0
+
+        self.pending_entries[id_hash] = (active_segment_number, self.segment_sizes[active_segment_number], len(record))
+        self.segment_sizes[active_segment_number] += len(record)
+        self.write_buffer += record
+
+        if len(self.write_buffer) >= WRITE_BUFFER_MAX_BYTES:
+            self.__flush_write_buffer()
+
+    def __prepare_for_writing(self):
+        if self.number_of_flushed_bytes is not None:
+            return
+
+        if not self.segment_sizes:
+            self.segment_sizes[0] = 0
+            self.number_of_flushed_bytes = 0
+            return
+
+        active_segment_number = max(self.segment_sizes)
+        self.number_of_flushed_bytes = self.segment_sizes[active_segment_number]
+        self.__recover_unsaved_records(active_segment_number)
+
+    def __recover_unsaved_records(self, segment_number):
+        # Records written after the last save by an interrupted run are complete documents, valid ones are kept and a torn tail is dropped
+        segment_path = self.__build_segment_path(segment_number)
+        if not self.persister.is_path_exists(segment_path):
+            return
+
+        with open(self.persister.get_full_path(segment_path), "rb") as file:
+            file.seek(self.segment_sizes[segment_number])
+            unsaved_data = file.read()
+
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(unsaved_data):
+            id_length, data_length, checksum = RECORD_HEADER.unpack_from(unsaved_data, offset)
+            record_length = RECORD_HEADER.size + id_length + data_length
+            record = unsaved_data[offset:offset + record_length]
+            if len(record) < record_length or zlib.crc32(record[RECORD_HEADER.size:]) != checksum:
+                break
+
+            document_id = record[RECORD_HEADER.size:RECORD_HEADER.size + id_length].decode("utf-8")
+            self.pending_entries[compute_text_hash(document_id)] = (segment_number, self.segment_sizes[segment_number] + offset, record_length)
+            offset += record_length
+
+        if offset < len(unsaved_data):
+            self.persister.save_bin_file_part(b"", segment_path, offset=self.segment_sizes[segment_number] + offset)
+
+        if self.pending_entries:
+            logging.info(f"Recovered {len(self.pending_entries)} documents written to {segment_path} after its last save")
+
+        self.segment_sizes[segment_number] += offset
+        self.number_of_flushed_bytes = self.segment_sizes[segment_number]
+
+    def __flush_write_buffer(self):
+        if not self.write_buffer:
+            return
+
+        self.persister.save_bin_file_part(bytes(self.write_buffer), self.__build_segment_path(max(self.segment_sizes)), offset=self.number_of_flushed_bytes)
+        self.number_of_flushed_bytes += len(self.write_buffer)
+        self.write_buffer = bytearray()
+
+    def __apply_pending_entries(self, index):
+        if not self.pending_entries:
+            return index
+
+        pending_index = np.zeros(len(self.pending_entries), dtype=INDEX_DTYPE)
+        pending_index["idHash"] = np.fromiter(self.pending_entries.keys(), dtype=np.uint64, count=len(self.pending_entries))
+        for position, (segment_number, offset, length) in enumerate(self.pending_entries.values()):
+            pending_index[position] = (pending_index["idHash"][position], segment_number, length, offset)
+        self.pending_entries = {}
+
+        # Replaced documents keep their old records in segments until those are merged
+        is_replaced = np.isin(index["idHash"], pending_index["idHash"])
+        self.number_of_document_bytes += int(pending_index["length"].sum()) - int(index["length"][is_replaced].sum())
+        index = np.concatenate([index[~is_replaced], pending_index])
+
+        return index[np.argsort(index["idHash"], kind="stable")]
+
+    def __choose_segments_to_merge(self, index):
+        active_segment_number = max(self.segment_sizes, default=None)
+        live_bytes = np.bincount(index["segmentNumber"], weights=index["length"], minlength=(active_segment_number or 0) + 1)
+
+        sealed_segment_numbers = [segment_number for segment_number in self.segment_sizes if segment_number != active_segment_number]
+        merged_segment_numbers = { segment_number for segment_number in sealed_segment_numbers
+                                   if live_bytes[segment_number] < (1 - MAX_REPLACED_BYTES_RATIO) * self.segment_sizes[segment_number] }
+
+        small_segment_numbers = [segment_number for segment_number in sealed_segment_numbers if self.segment_sizes[segment_number] < SMALL_SEGMENT_BYTES]
+        if len(small_segment_numbers) > MAX_NUMBER_OF_SMALL_SEGMENTS:
+            merged_segment_numbers.update(small_segment_numbers)
+
+        return sorted(merged_segment_numbers)
+
+    def __merge_segments(self, index, merged_segment_numbers):
+        merged_entries = index[np.isin(index["segmentNumber"], merged_segment_numbers)]
+        merged_entries = merged_entries[np.lexsort((merged_entries["offset"], merged_entries["segmentNumber"]))]
+
+        logging.info(f"Merging {len(merged_segment_numbers)} document store segments with {len(merged_entries)} documents")
+
+        # Live records are copied as they are, sequentially by segment and offset, without decompression
+        for entry in merged_entries:
+            self.__append_record(int(entry["idHash"]), self.__read_record(int(entry["segmentNumber"]), int(entry["offset"]), int(entry["length"])))
+        self.__flush_write_buffer()
+
+        for segment_number in merged_segment_numbers:
+            del self.segment_sizes[segment_number]
+
+        return self.__apply_pending_entries(index)
+
+    def __read_record(self, segment_number, offset, length):
+        segment_view = self.segment_views.get(segment_number)
+        if segment_view is None or len(segment_view) < offset + length:
+            # The active segment grows while it is written, so its view is mapped again when it is too short
+            self.__close_segment_view(segment_number)
+            with open(self.persister.get_full_path(self.__build_segment_path(segment_number)), "rb") as file:
+                segment_view = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.segment_views[segment_number] = segment_view
+
+        return segment_view[offset:offset + length]
+
+    def __close_segment_view(self, segment_number):
+        segment_view = self.segment_views.pop(segment_number, None)
+        if segment_view is not None:
+            segment_view.close()
+
+    def __remove_segment_files(self, segment_numbers):
+        # Returns segments that could not be removed (e.g. a file still mapped by a search process on Windows), they are tried again by the next save
+        kept_segment_numbers = []
+        for segment_number in segment_numbers:
+            try:
+                self.persister.remove_file(self.__build_segment_path(segment_number))
+            except OSError as error:
+                logging.warning(f"Obsolete document store segment {segment_number} could not be removed, it will be removed later: {error}")
+                kept_segment_numbers.append(segment_number)
+
+        return kept_segment_numbers
+
+    def __read_json_document(self, document_id):
+        document_path = f"{self.json_documents_path}/{document_id}.json"
+        if not self.persister.is_path_exists(document_path):
+            return None
+
+        document_content = self.persister.read_text_file(document_path)
+
+        return json.loads(document_content), len(document_content)
+
+    def __build_segment_path(self, segment_number):
+        return f"{self.base_path}/segment_{segment_number:06d}.bin"
+
+    @staticmethod
+    def __build_json_documents_path(collection_name):
+        return f"{collection_name}/documents"
+
+    @staticmethod
+    def __build_base_path(collection_name):
+        return f"{collection_name}/document_store"
\ No newline at end of file
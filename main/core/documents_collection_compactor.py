@@ -0,0 +1,41 @@
+import json
+import logging
+from datetime import datetime, timezone
+
+class DocumentCollectionCompactor:
+    def __init__(self,
+                 collection_name: str,
+                 document_indexers,
+                 persister):
+        self.collection_name = collection_name
+        self.document_indexers = document_indexers
+        self.persister = persister
+
+    def run(self):
+        if not self.persister.is_path_exists(self.collection_name):
+            raise Exception(f"Collection {self.collection_name} does not exist. Please create it first.")
+
+        compaction_results = []
+        is_collection_changed = False
+        for indexer in self.document_indexers:
+            number_of_removed_vectors = indexer.compact()
+            if number_of_removed_vectors > 0:
+                indexer.save(self.persister, f"{self.collection_name}/indexes/{indexer.get_name()}")
+                is_collection_changed = True
+
+            compaction_results.append({
+                "name": indexer.get_name(),
+                "numberOfRemovedVectors": number_of_removed_vectors,
+                "numberOfVectors": indexer.get_size(),
+            })
+
+        if is_collection_changed:
+            # Searchers load indexes again only when the update time of the collection changes
+            manifest = json.loads(self.persister.read_text_file(self.__build_manifest_path()))
+            manifest["updatedTime"] = datetime.now(timezone.utc).isoformat()
+            self.persister.save_text_file(json.dumps(manifest, indent=2, ensure_ascii=False), self.__build_manifest_path())
+
+        logging.info(f"Collection successfully compacted: \n{json.dumps(compaction_results, indent=2, ensure_ascii=False)}")
+
+    def __build_manifest_path(self):
+        return f"{self.collection_name}/manifest.json"
\ No newline at end of file
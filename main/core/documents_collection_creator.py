@@ -1,12 +1,24 @@
+import sys
 import json
+import time
+import threading
 from datetime import datetime, timezone
 from enum import Enum
-import numpy as np
 import logging
 
+import numpy as np
+
+from .index_document_mapping import IndexDocumentMapping
+from .embedding_store import EmbeddingStore
+from .document_store import DocumentStore
 from ..utils.progress_bar import wrap_generator_with_progress_bar
-from ..utils.progress_bar import wrap_iterator_with_progress_bar
-from ..utils.performance import log_execution_duration
+from ..utils.performance import log_execution_duration, reset_peak_rss, get_peak_rss_bytes
+from ..utils.pipeline import Pipeline, PipelineStage
+from ..utils.content_hash import UNKNOWN_HASH, compute_text_hash, compute_document_hash
+
+# Read and converted documents waiting for the next stage, enough to smooth out slow reads without holding much in memory
+DOCUMENTS_QUEUE_SIZE = 100
+CHECKPOINT_FILE_NAME = "checkpoint.json"
 
 class OPERATION_TYPE(Enum):
     CREATE = "create"
@@ -20,14 +32,29 @@ class DocumentCollectionCreator:
                  document_indexers,
                  persister,
                  operation_type: OPERATION_TYPE = OPERATION_TYPE.CREATE,
-                 indexing_batch_size=500_000):
+                 indexing_batch_size=10_000,
+                 indexing_batch_max_bytes=256 * 1024 * 1024,
+                 resume=False,
+                 checkpoint_interval_seconds=600):
         self.operation_type = operation_type
         self.collection_name = collection_name
         self.document_reader = document_reader
         self.document_converter = document_converter
         self.document_indexers = document_indexers
         self.persister = persister
+        # Batches are limited by number of chunks and by estimated memory of their texts and vectors, not by documents,
+        # since one big document (e.g. a PDF) can have more chunks than thousands of Jira tickets
         self.indexing_batch_size = indexing_batch_size
+        self.indexing_batch_max_bytes = indexing_batch_max_bytes
+        self.resume = resume
+        self.checkpoint_interval_seconds = checkpoint_interval_seconds
+        # The embedding stage reads existing chunks of updated documents while the indexing stage changes the mapping
+        self.index_document_mapping_lock = threading.Lock()
+        self.document_store = None
+
+    @staticmethod
+    def has_checkpoint(persister, collection_name):
+        return persister.is_path_exists(f"{collection_name}/{CHECKPOINT_FILE_NAME}")
 
     def run(self):
         if self.operation_type == OPERATION_TYPE.CREATE:
@@ -41,27 +68,28 @@ class DocumentCollectionCreator:
         raise ValueError(f"Unknown operation type: {self.operation_type}")
 
     def __create_collection(self):
-        self.persister.remove_folder(self.collection_name)
-        self.persister.create_folder(self.collection_name)
+        checkpoint = self.__load_checkpoint_to_resume()
+        if checkpoint is None:
+            self.persister.remove_folder(self.collection_name)
+            self.persister.create_folder(self.collection_name)
 
-        update_time = datetime.now(timezone.utc)
-        document_ids, number_of_expected_documents = log_execution_duration(lambda: self.__read_documents(),
-                                                                            identifier=f"Reading documents for collection: {self.collection_name}")
+        update_time = datetime.fromisoformat(checkpoint["updateTime"]) if checkpoint else datetime.now(timezone.utc)
+        last_modified_document_time, chunk_changes, document_statistics, number_of_documents, number_of_expected_documents = log_execution_duration(lambda: self.__index_documents(update_time, checkpoint, is_new_collection=True),
+                                                                                                                                                  identifier=f"Reading and indexing documents for collection: {self.collection_name}")
         
-        if len(document_ids) == 0:
+        if number_of_documents == 0:
             logging.warning(f"No documents found for collection creation, so it will be not created.")
             self.persister.remove_folder(self.collection_name)
             return
-    
-        last_modified_document_time, number_of_chunks = log_execution_duration(lambda: self.__index_documents_for_new_collection(document_ids),
-                                                                               identifier=f"Indexing documents for collection: {self.collection_name}")
         
         manifest = self.__create_manifest_file(update_time, 
                                                last_modified_document_time,
-                                               number_of_chunks)
+                                               chunk_changes,
+                                               document_statistics)
+        self.__remove_checkpoint()
         
-        if number_of_expected_documents != len(document_ids):
-            logging.warning(f"Expected number of documents: {number_of_expected_documents} does not match actual number of read documents: {len(document_ids)}. Usually it happens when an error occurs during document reading. Please check logs for more details.")
+        if number_of_expected_documents != number_of_documents:
+            logging.warning(f"Expected number of documents: {number_of_expected_documents} does not match actual number of read documents: {number_of_documents}. Usually it happens when an error occurs during document reading. Please check logs for more details.")
         
         logging.info(f"Collection successfully created: \n{json.dumps(manifest, indent=2, ensure_ascii=False)}")
 
@@ -70,143 +98,473 @@ class DocumentCollectionCreator:
             raise Exception(f"Collection {self.collection_name} does not exist. Please create it first.")
 
         manifest = json.loads(self.persister.read_text_file(self.__build_manifest_path()))
+        self.__migrate_legacy_collection_files()
+        checkpoint = self.__load_checkpoint_to_resume()
 
-        update_time = datetime.now(timezone.utc)
-        document_ids, number_of_expected_documents = log_execution_duration(lambda: self.__read_documents(),
-                                                                            identifier=f"Reading documents for collection: {self.collection_name}")
+        update_time = datetime.fromisoformat(checkpoint["updateTime"]) if checkpoint else datetime.now(timezone.utc)
+        last_modified_document_time, chunk_changes, document_statistics, number_of_documents, number_of_expected_documents = log_execution_duration(lambda: self.__index_documents(update_time, checkpoint, is_new_collection=False),
+                                                                                                                                                  identifier=f"Reading and indexing documents for collection: {self.collection_name}")
         
-        if len(document_ids) == 0:
+        if number_of_documents == 0:
             logging.warning(f"No documents found for collection update, so it will be not updated.")
+            self.__remove_checkpoint()
             return
-    
-        last_modified_document_time, number_of_chunks = log_execution_duration(lambda: self.__index_documents_for_existing_collection(document_ids),
-                                                                               identifier=f"Indexing documents for collection: {self.collection_name}")
         
         manifest = self.__create_manifest_file(update_time, 
                                                last_modified_document_time,
-                                               number_of_chunks,
+                                               chunk_changes,
+                                               document_statistics,
                                                existing_manifest=manifest)
+        self.__remove_checkpoint()
         
-        if number_of_expected_documents != len(document_ids):
-            logging.warning(f"Expected number of documents: {number_of_expected_documents} does not match actual number of read documents: {len(document_ids)}. Usually it happens when an error occurs during document reading. Please check logs for more details.")
+        if number_of_expected_documents != number_of_documents:
+            logging.warning(f"Expected number of documents: {number_of_expected_documents} does not match actual number of read documents: {number_of_documents}. Usually it happens when an error occurs during document reading. Please check logs for more details.")
         
         logging.info(f"Collection successfully updated: \n{json.dumps(manifest, indent=2, ensure_ascii=False)}")
 
-    def __read_documents(self):
-        document_ids = []
+    def __migrate_legacy_collection_files(self):
+        # Files of older versions are migrated only by runs that write the collection, searchers read them as they are
+        if IndexDocumentMapping.has_json_mapping(self.persister, self.collection_name):
+            IndexDocumentMapping.migrate_json_mapping(self.persister, self.collection_name)
+
+        if DocumentStore.has_json_documents(self.persister, self.collection_name):
+            is_migrated_now = DocumentStore.migrate_json_documents(self.persister, self.collection_name)
+
+            # Paths of migrated documents still point to their JSON files
+            index_document_mapping = IndexDocumentMapping.load(self.persister, self.collection_name)
+            index_document_mapping.set_document_paths(self.__build_document_path)
+            index_document_mapping.save(self.persister, self.collection_name)
+
+            # Searchers read the JSON files until they load the manifest of the run that migrated them, so they are removed by the next run
+            if not is_migrated_now:
+                DocumentStore.remove_json_documents(self.persister, self.collection_name)
+
+    def __index_documents(self, update_time, checkpoint, is_new_collection):
+        if is_new_collection and checkpoint is None:
+            index_document_mapping = IndexDocumentMapping.create_empty()
+            last_index_item_id = -1
+        else:
+            index_document_mapping = IndexDocumentMapping.load(self.persister, self.collection_name)
+            index_info = json.loads(self.persister.read_text_file(self.__build_index_info_path()))
+            last_index_item_id = index_info["lastIndexItemId"]
+        self.document_store = DocumentStore.load(self.persister, self.collection_name)
+
+        # State of documents that are completely indexed, it is what a checkpoint saves and a resumed run starts from
+        indexed_state = {
+            "updateTime": update_time,
+            "lastIndexItemId": last_index_item_id,
+            "lastModifiedDocumentTime": datetime.fromisoformat(checkpoint["lastModifiedDocumentTime"]) if checkpoint else None,
+            "numberOfDocuments": checkpoint["numberOfDocuments"] if checkpoint else 0,
+            "documentIds": list(checkpoint["documentIds"]) if checkpoint else [],
+            "chunkChanges": dict(checkpoint["chunkChanges"]) if checkpoint else { "numberOfUnchangedChunks": 0, "numberOfAddedChunks": 0, "numberOfRemovedChunks": 0 },
+            "documentStatistics": dict(checkpoint["documentStatistics"]) if checkpoint and "documentStatistics" in checkpoint else self.__create_empty_document_statistics(),
+            "lastCheckpointTime": time.time(),
+            # Indexes and mapping match the completely indexed documents only after the last batch of a group of documents
+            "hasPartiallyIndexedDocuments": False,
+        }
 
+        return self.__read_and_index_documents(index_document_mapping,
+                                               indexed_state,
+                                               remove_existing_documents=not is_new_collection)
+
+    def __read_and_index_documents(self, 
+                                   index_document_mapping, 
+                                   indexed_state,
+                                   remove_existing_documents):
+        indexers_by_model_name = self.__group_indexers_by_model_name()
+        embedding_stores = self.__create_embedding_stores(indexers_by_model_name)
+        vector_bytes_per_chunk = sum(4 * embedding_store.number_of_dimensions for embedding_store in embedding_stores.values())
         number_of_expected_documents = self.document_reader.get_number_of_documents()
-        for document in wrap_generator_with_progress_bar(self.document_reader.read_all_documents(), 
-                                                         number_of_expected_documents, 
-                                                         progress_bar_name="Reading documents"):
+        is_peak_rss_reset = reset_peak_rss()
+
+        # Documents indexed before the checkpoint of a resumed run are read again (readers can not continue from the middle),
+        # but are not embedded and indexed again
+        indexed_document_ids = set(indexed_state["documentIds"])
+        batching_state = { "lastIndexItemId": indexed_state["lastIndexItemId"], "documentIds": set() }
+
+        # Reading (network), converting (parsing) and embedding overlap instead of running one after another,
+        # bounded queues between stages make a fast stage wait for a slow one instead of piling up documents
+        pipeline = Pipeline([
+            PipelineStage("Reading",
+                          lambda _: wrap_generator_with_progress_bar(self.document_reader.read_all_documents(), 
+                                                                     number_of_expected_documents, 
+                                                                     progress_bar_name="Reading documents"),
+                          output_queue_size=DOCUMENTS_QUEUE_SIZE),
+            PipelineStage("Converting", self.__convert_documents, output_queue_size=DOCUMENTS_QUEUE_SIZE),
+            PipelineStage("Embedding",
+                          lambda converted_documents: self.__embed_batches((converted_document for converted_document in converted_documents 
+                                                                            if converted_document["id"] not in indexed_document_ids),
+                                                                           batching_state,
+                                                                           indexers_by_model_name,
+                                                                           index_document_mapping,
+                                                                           remove_existing_documents,
+                                                                           vector_bytes_per_chunk),
+                          output_queue_size=1),
+            PipelineStage("Indexing", lambda batches: self.__index_batches(batches, index_document_mapping, embedding_stores, indexed_state)),
+        ])
+        try:
+            pipeline.run()
+        except Exception:
+            # Stages after a failed one index what was already queued, so it is kept by a checkpoint for a resumed run,
+            # unless the indexing stage failed itself and left a batch half applied, or the embedding stage failed in the middle of documents
+            if pipeline.is_last_stage_completed and not indexed_state["hasPartiallyIndexedDocuments"]:
+                self.__save_checkpoint_after_failure(index_document_mapping, embedding_stores, indexed_state)
+            raise
+        pipeline.log_statistics()
+        self.__log_peak_rss(is_peak_rss_reset)
+
+        if indexed_state["numberOfDocuments"] == 0:
+            return None, None, None, 0, number_of_expected_documents
+
+        self.__save_indexing_state(index_document_mapping, embedding_stores, indexed_state)
+
+        return (indexed_state["lastModifiedDocumentTime"], 
+                indexed_state["chunkChanges"],
+                indexed_state["documentStatistics"],
+                indexed_state["numberOfDocuments"], 
+                number_of_expected_documents)
+
+    def __convert_documents(self, documents):
+        for document in documents:
             for converted_document in self.document_converter.convert(document):
-                document_path = f"{self.collection_name}/documents/{converted_document['id']}.json"
-                self.__save_json_file(converted_document, document_path)
-
-                document_ids.append(converted_document["id"])
-
-        return document_ids, number_of_expected_documents
+                # Documents are saved for search results, indexing gets them directly instead of reading them back
+                self.document_store.put(converted_document["id"], converted_document)
+
+                yield converted_document
+
+    def __embed_batches(self, 
+                        converted_documents, 
+                        batching_state, 
+                        indexers_by_model_name,
+                        index_document_mapping,
+                        remove_existing_documents,
+                        vector_bytes_per_chunk):
+        pending_documents = []
+        number_of_pending_chunks = 0
+        number_of_pending_bytes = 0
+        for converted_document in converted_documents:
+            pending_documents.append(converted_document)
+            number_of_pending_chunks += len(converted_document["chunks"])
+            number_of_pending_bytes += sum(self.__estimate_chunk_bytes(chunk, vector_bytes_per_chunk) for chunk in converted_document["chunks"])
+
+            if number_of_pending_chunks >= self.indexing_batch_size or number_of_pending_bytes >= self.indexing_batch_max_bytes:
+                yield from self.__create_batches(pending_documents, batching_state, indexers_by_model_name, index_document_mapping, remove_existing_documents, vector_bytes_per_chunk)
+                pending_documents = []
+                number_of_pending_chunks = 0
+                number_of_pending_bytes = 0
+
+        if pending_documents:
+            yield from self.__create_batches(pending_documents, batching_state, indexers_by_model_name, index_document_mapping, remove_existing_documents, vector_bytes_per_chunk)
+
+    def __create_batches(self, 
+                         documents, 
+                         batching_state, 
+                         indexers_by_model_name,
+                         index_document_mapping,
+                         remove_existing_documents,
+                         vector_bytes_per_chunk):
+        # The mapping is changed by the indexing stage together with indexes, so both are consistent at any checkpoint.
+        # Changes of all documents are applied with the first batch, before any of their new chunks is indexed.
+        existing_documents_chunks = self.__get_existing_documents_chunks(documents, index_document_mapping) if remove_existing_documents else {}
+
+        batch = self.__create_empty_batch()
+        last_modified_document_time = None
+        document_statistics = self.__create_empty_document_statistics()
+        for converted_document in documents:
+            modified_document_time = datetime.fromisoformat(converted_document["modifiedTime"])
+            if last_modified_document_time is None or last_modified_document_time < modified_document_time:
+                last_modified_document_time = modified_document_time
+
+            # A document read twice in one run is compared with the mapping before its first version is applied,
+            # so its second version replaces all its chunks instead
+            is_replaced = converted_document["id"] in batching_state["documentIds"]
+            batching_state["documentIds"].add(converted_document["id"])
+
+            existing_chunks = None if is_replaced else existing_documents_chunks.get(converted_document["id"])
+            document_change = self.__create_document_change(converted_document,
+                                                            existing_chunks,
+                                                            is_replaced,
+                                                            batching_state["lastIndexItemId"] + 1)
+            batch["documentChanges"].append(document_change)
+            self.__count_document(document_statistics, converted_document, document_change, existing_chunks)
+
+            # Only new and changed chunks are embedded. Chunks of a big document are split between batches, ids of its new chunks stay consecutive
+            for chunk_number in document_change["addedChunkNumbers"]:
+                chunk = converted_document["chunks"][chunk_number]
+                batching_state["lastIndexItemId"] += 1
+
+                batch["texts"].append(chunk["indexedData"])
+                batch["indexItemIds"].append(batching_state["lastIndexItemId"])
+                batch["numberOfBytes"] += self.__estimate_chunk_bytes(chunk, vector_bytes_per_chunk)
+
+                if len(batch["texts"]) >= self.indexing_batch_size or batch["numberOfBytes"] >= self.indexing_batch_max_bytes:
+                    yield self.__embed_batch(batch, indexers_by_model_name)
+                    batch = self.__create_empty_batch()
+
+        # Documents are completely indexed only with the last batch of their chunks, only after it a checkpoint can be saved
+        batch["completedDocuments"] = {
+            "documentIds": [converted_document["id"] for converted_document in documents],
+            "lastModifiedDocumentTime": last_modified_document_time,
+            "lastIndexItemId": batching_state["lastIndexItemId"],
+            "documentStatistics": document_statistics,
+        }
+        yield self.__embed_batch(batch, indexers_by_model_name)
+
+    def __get_existing_documents_chunks(self, documents, index_document_mapping):
+        with self.index_document_mapping_lock:
+            return index_document_mapping.get_documents_chunks([converted_document["id"] for converted_document in documents])
+
+    def __create_document_change(self, converted_document, existing_chunks, is_replaced, first_index_item_id):
+        chunk_hashes = [compute_text_hash(chunk["indexedData"]) for chunk in converted_document["chunks"]]
+        document_change = {
+            "id": converted_document["id"],
+            "url": converted_document["url"],
+            "path": self.__build_document_path(converted_document["id"]),
+            "documentHash": compute_document_hash(chunk_hashes),
+            "isReplaced": is_replaced,
+            "removedIndexItemIds": [],
+            "keptIndexItemIds": [],
+            "keptChunkNumbers": [],
+            "firstIndexItemId": first_index_item_id,
+            "addedChunkNumbers": [],
+            "addedChunkHashes": [],
+        }
 
-    def __index_documents_for_new_collection(self, document_ids):
-        index_mapping = {}
-        reverse_index_mapping = {}
-        last_index_item_id = -1
+        if existing_chunks is not None and existing_chunks["documentHash"] == document_change["documentHash"]:
+            # Indexed text did not change (e.g. only a status or a label of a Jira ticket did), all chunks are kept as they are
+            document_change["keptIndexItemIds"] = existing_chunks["indexItemIds"].tolist()
+            document_change["keptChunkNumbers"] = existing_chunks["chunkNumbers"].tolist()
+            return document_change
+
+        unused_index_item_ids_by_hash = {}
+        if existing_chunks is not None:
+            for index_item_id, chunk_hash in zip(existing_chunks["indexItemIds"].tolist(), existing_chunks["chunkHashes"].tolist()):
+                if chunk_hash != UNKNOWN_HASH:
+                    unused_index_item_ids_by_hash.setdefault(chunk_hash, []).append(index_item_id)
+
+        # A chunk that is still in the document keeps its item and vector even if it moved, only its chunk number changes
+        for chunk_number, chunk_hash in enumerate(chunk_hashes):
+            unused_index_item_ids = unused_index_item_ids_by_hash.get(chunk_hash)
+            if unused_index_item_ids:
+                document_change["keptIndexItemIds"].append(unused_index_item_ids.pop(0))
+                document_change["keptChunkNumbers"].append(chunk_number)
+            else:
+                document_change["addedChunkNumbers"].append(chunk_number)
+                document_change["addedChunkHashes"].append(chunk_hash)
+
+        if existing_chunks is not None:
+            kept_index_item_ids = set(document_change["keptIndexItemIds"])
+            document_change["removedIndexItemIds"] = [index_item_id for index_item_id in existing_chunks["indexItemIds"].tolist() 
+                                                      if index_item_id not in kept_index_item_ids]
+
+        return document_change
+
+    def __count_document(self, document_statistics, converted_document, document_change, existing_chunks):
+        document_statistics["numberOfReadDocuments"] += 1
+        document_statistics["numberOfReadTextBytes"] += len(converted_document["text"].encode("utf-8"))
+
+        if document_change["isReplaced"] or existing_chunks is not None:
+            is_unchanged = not document_change["isReplaced"] and existing_chunks["documentHash"] == document_change["documentHash"]
+            document_statistics["numberOfUnchangedDocuments" if is_unchanged else "numberOfChangedDocuments"] += 1
+        else:
+            document_statistics["numberOfNewDocuments"] += 1
+
+    def __create_empty_document_statistics(self):
+        return {
+            "numberOfReadDocuments": 0,
+            "numberOfNewDocuments": 0,
+            "numberOfChangedDocuments": 0,
+            "numberOfUnchangedDocuments": 0,
+            "numberOfReadTextBytes": 0,
+        }
 
-        return self.__add_documents_to_index(document_ids,
-                                      index_mapping,
-                                      reverse_index_mapping,
-                                      last_index_item_id)
+    def __create_empty_batch(self):
+        return {
+            "documentChanges": [],
+            "indexItemIds": [],
+            "texts": [],
+            "numberOfBytes": 0,
+            "completedDocuments": None,
+        }
 
-    def __index_documents_for_existing_collection(self, document_ids):
-        index_mapping = json.loads(self.persister.read_text_file(self.__build_index_mapping_path()))
-        reverse_index_mapping = json.loads(self.persister.read_text_file(self.__build_reverse_index_mapping_path()))
-        index_info = json.loads(self.persister.read_text_file(self.__build_index_info_path()))
-        last_index_item_id = index_info["lastIndexItemId"]
+    def __embed_batch(self, batch, indexers_by_model_name):
+        # Texts are embedded once per model and the vectors are shared by all indexers of the model
+        return {
+            **batch,
+            "indexersByModelName": indexers_by_model_name,
+            "vectorsByModelName": { model_name: model_indexers[0].embedder.embed(batch["texts"])
+                                    for model_name, model_indexers in indexers_by_model_name.items() } if batch["texts"] else {},
+        }
 
-        self.__remove_documents_from_index(document_ids, index_mapping, reverse_index_mapping)
+    def __estimate_chunk_bytes(self, chunk, vector_bytes_per_chunk):
+        return sys.getsizeof(chunk["indexedData"]) + vector_bytes_per_chunk
 
-        return self.__add_documents_to_index(document_ids,
-                                      index_mapping,
-                                      reverse_index_mapping,
-                                      last_index_item_id)
+    def __index_batches(self, batches, index_document_mapping, embedding_stores, indexed_state):
+        for batch in batches:
+            if batch["documentChanges"]:
+                removed_index_item_ids = self.__apply_document_changes(batch["documentChanges"], index_document_mapping, indexed_state)
+                if len(removed_index_item_ids) > 0:
+                    for indexer in self.document_indexers:
+                        indexer.remove_ids(removed_index_item_ids)
 
-    def __add_documents_to_index(self, 
-                          document_ids, 
-                          index_mapping, 
-                          reverse_index_mapping, 
-                          last_index_item_id):
+            for indexer in self.document_indexers:
+                if indexer.embedder is None and batch["texts"]:
+                    indexer.index_texts(batch["indexItemIds"], batch["texts"])
+
+            for model_name, vectors in batch["vectorsByModelName"].items():
+                embedding_stores[model_name].append(batch["indexItemIds"], vectors)
+
+                for indexer in batch["indexersByModelName"][model_name]:
+                    indexer.index_vectors(batch["indexItemIds"], vectors)
+
+            indexed_state["hasPartiallyIndexedDocuments"] = batch["completedDocuments"] is None
+            if batch["completedDocuments"] is not None:
+                self.__complete_documents(batch["completedDocuments"], indexed_state)
+                self.__save_checkpoint_if_needed(index_document_mapping, embedding_stores, indexed_state)
+
+            yield batch
+
+    def __apply_document_changes(self, document_changes, index_document_mapping, indexed_state):
+        removed_index_item_ids = []
+        chunk_changes = indexed_state["chunkChanges"]
+
+        with self.index_document_mapping_lock:
+            for document_change in document_changes:
+                if document_change["isReplaced"]:
+                    replaced_index_item_ids = index_document_mapping.remove_documents([document_change["id"]]).tolist()
+                    removed_index_item_ids.extend(replaced_index_item_ids)
+                    chunk_changes["numberOfRemovedChunks"] += len(replaced_index_item_ids)
+
+                removed_index_item_ids.extend(document_change["removedIndexItemIds"])
+                if document_change["keptIndexItemIds"]:
+                    index_document_mapping.update_chunk_numbers(document_change["keptIndexItemIds"], document_change["keptChunkNumbers"])
+
+                index_document_mapping.add_document(document_change["id"],
+                                                    document_change["url"],
+                                                    document_change["path"],
+                                                    document_change["documentHash"],
+                                                    first_index_item_id=document_change["firstIndexItemId"],
+                                                    chunk_numbers=document_change["addedChunkNumbers"],
+                                                    chunk_hashes=document_change["addedChunkHashes"])
+
+                chunk_changes["numberOfUnchangedChunks"] += len(document_change["keptIndexItemIds"])
+                chunk_changes["numberOfAddedChunks"] += len(document_change["addedChunkNumbers"])
+                chunk_changes["numberOfRemovedChunks"] += len(document_change["removedIndexItemIds"])
+
+            index_document_mapping.remove_index_items(removed_index_item_ids)
+
+        return np.asarray(removed_index_item_ids, dtype=np.int64)
+
+    def __complete_documents(self, completed_documents, indexed_state):
+        indexed_state["lastIndexItemId"] = completed_documents["lastIndexItemId"]
+        indexed_state["numberOfDocuments"] += len(completed_documents["documentIds"])
+        indexed_state["documentIds"].extend(completed_documents["documentIds"])
+        for statistic_name, value in completed_documents["documentStatistics"].items():
+            indexed_state["documentStatistics"][statistic_name] += value
+
+        last_modified_document_time = completed_documents["lastModifiedDocumentTime"]
+        if indexed_state["lastModifiedDocumentTime"] is None or indexed_state["lastModifiedDocumentTime"] < last_modified_document_time:
+            indexed_state["lastModifiedDocumentTime"] = last_modified_document_time
+
+    def __save_checkpoint_if_needed(self, index_document_mapping, embedding_stores, indexed_state):
+        if time.time() - indexed_state["lastCheckpointTime"] < self.checkpoint_interval_seconds:
+            return
 
-        last_modified_document_time = None
+        # Trained indexes that still collect training vectors would be trained too early by saving
+        if any(indexer.has_pending_vectors() for indexer in self.document_indexers):
+            return
 
-        for batch_document_ids in wrap_iterator_with_progress_bar(self.__batch_items(document_ids,
-                                                                                     self.indexing_batch_size), 
-                                                                  progress_bar_name="Indexing batches of batches"):
-            items_to_index = []
-            index_item_ids = []
+        log_execution_duration(lambda: self.__save_checkpoint(index_document_mapping, embedding_stores, indexed_state),
+                               identifier=f"Saving checkpoint after {indexed_state['numberOfDocuments']} documents of collection: {self.collection_name}")
+        indexed_state["lastCheckpointTime"] = time.time()
 
-            for document_id in batch_document_ids:
-                document_path = f"{self.collection_name}/documents/{document_id}.json"
+    def __save_checkpoint_after_failure(self, index_document_mapping, embedding_stores, indexed_state):
+        if indexed_state["numberOfDocuments"] == 0 or any(indexer.has_pending_vectors() for indexer in self.document_indexers):
+            return
 
-                converted_document = json.loads(self.persister.read_text_file(document_path))
+        log_execution_duration(lambda: self.__save_checkpoint(index_document_mapping, embedding_stores, indexed_state),
+                               identifier=f"Saving checkpoint after {indexed_state['numberOfDocuments']} documents of failed run of collection: {self.collection_name}")
 
-                modified_document_time = datetime.fromisoformat(converted_document["modifiedTime"])
-                if last_modified_document_time is None or last_modified_document_time < modified_document_time:
-                    last_modified_document_time = modified_document_time
+    def __save_checkpoint(self, index_document_mapping, embedding_stores, indexed_state):
+        self.__save_indexing_state(index_document_mapping, embedding_stores, indexed_state)
 
-                for chunk_number in range(0, len(converted_document["chunks"])):
-                    last_index_item_id += 1
+        # Saved last, so it never points to indexing state that was not completely saved
+        self.__save_json_file({
+            "operationType": self.operation_type.value,
+            "reader": self.document_reader.get_reader_details(),
+            "updateTime": indexed_state["updateTime"].isoformat(),
+            "lastModifiedDocumentTime": indexed_state["lastModifiedDocumentTime"].isoformat(),
+            "numberOfDocuments": indexed_state["numberOfDocuments"],
+            "documentIds": indexed_state["documentIds"],
+            "chunkChanges": indexed_state["chunkChanges"],
+            "documentStatistics": indexed_state["documentStatistics"],
+        }, self.__build_checkpoint_path())
+
+    def __save_indexing_state(self, index_document_mapping, embedding_stores, indexed_state):
+        # Saved first, so ids are never given again to other chunks even if saving of indexes is interrupted
+        index_info = { "lastIndexItemId": indexed_state["lastIndexItemId"], }
+        self.__save_json_file(index_info, self.__build_index_info_path())
 
-                    items_to_index.append(converted_document["chunks"][chunk_number]["indexedData"])
-                    index_item_ids.append(last_index_item_id)
+        for indexer in self.document_indexers:
+            indexer.save(self.persister, self.__build_index_base_path(indexer))
 
-                    index_mapping[last_index_item_id] = {
-                        "documentId": converted_document["id"],
-                        "documentUrl": converted_document["url"],
-                        "documentPath": document_path,
-                        "chunkNumber": chunk_number
-                    }
+        with self.index_document_mapping_lock:
+            index_document_mapping.save(self.persister, self.collection_name)
 
-                    if converted_document["id"] not in reverse_index_mapping:
-                        reverse_index_mapping[converted_document["id"]] = []
-                    reverse_index_mapping[converted_document["id"]].append(last_index_item_id)
+        # Saved last, so after an interrupted run the store can only miss items (filled with NaN), never claim extra ones
+        for embedding_store in embedding_stores.values():
+            embedding_store.save()
 
-            for indexer in self.document_indexers:
-                indexer.index_texts(index_item_ids, items_to_index)
+        self.document_store.save()
 
-        for indexer in self.document_indexers:
-            self.persister.save_bin_file(indexer.serialize(), f"{self.__build_index_base_path(indexer)}/indexer")
+    def __load_checkpoint_to_resume(self):
+        if not DocumentCollectionCreator.has_checkpoint(self.persister, self.collection_name):
+            if self.resume:
+                logging.warning(f"Collection {self.collection_name} has no checkpoint to resume from, all documents will be indexed.")
+            return None
 
-        index_info = { "lastIndexItemId": last_index_item_id, }
-        self.__save_json_file(index_info, self.__build_index_info_path())
-        self.__save_json_file(index_mapping, self.__build_index_mapping_path())
-        self.__save_json_file(reverse_index_mapping, self.__build_reverse_index_mapping_path())
+        if not self.resume:
+            # Indexes and mapping saved by the checkpoint are consistent, so an update can go on from them, it just indexes all documents again
+            logging.info(f"Collection {self.collection_name} has a checkpoint of an interrupted run, it is ignored since resuming was not requested.")
+            self.__remove_checkpoint()
+            return None
 
-        return last_modified_document_time, self.document_indexers[0].get_size()
+        checkpoint = json.loads(self.persister.read_text_file(self.__build_checkpoint_path()))
+        if checkpoint["operationType"] != self.operation_type.value or checkpoint["reader"] != self.document_reader.get_reader_details():
+            raise Exception(f"Checkpoint of collection {self.collection_name} was saved by another operation ({checkpoint['operationType']}) or reader, so it can not be resumed. Please run without resuming.")
 
-    def __remove_documents_from_index(self, document_ids, index_mapping, reverse_index_mapping):
-        for batch_document_ids in wrap_iterator_with_progress_bar(self.__batch_items(document_ids, 
-                                                                                     self.indexing_batch_size), 
-                                                                  progress_bar_name="Cleaning batches of batches"):
-            index_ids_to_remove = []
+        logging.info(f"Resuming {self.operation_type.value} of collection {self.collection_name} from a checkpoint with {checkpoint['numberOfDocuments']} indexed documents")
 
-            for document_id in batch_document_ids:
-                if document_id in reverse_index_mapping:
-                    document_index_ids_to_remove = reverse_index_mapping[document_id]
+        return checkpoint
 
-                    index_ids_to_remove.extend(document_index_ids_to_remove)
+    def __remove_checkpoint(self):
+        self.persister.remove_file(self.__build_checkpoint_path())
 
-                    for index_id in document_index_ids_to_remove:
-                        del index_mapping[str(index_id)]
-                    del reverse_index_mapping[document_id]
-        
-            for indexer in self.document_indexers:
-                indexer.remove_ids(np.array(index_ids_to_remove))
+    def __group_indexers_by_model_name(self):
+        indexers_by_model_name = {}
+        for indexer in self.document_indexers:
+            if indexer.embedder is not None:
+                indexers_by_model_name.setdefault(indexer.embedder.model_name, []).append(indexer)
+
+        return indexers_by_model_name
+
+    def __create_embedding_stores(self, indexers_by_model_name):
+        # Vectors are kept per model, so any index variant of the model can be rebuilt without embedding chunks again
+        return { model_name: EmbeddingStore(self.persister,
+                                            self.collection_name,
+                                            model_name,
+                                            model_indexers[0].embedder.get_number_of_dimensions())
+                 for model_name, model_indexers in indexers_by_model_name.items() }
+
+    def __log_peak_rss(self, is_peak_rss_reset):
+        peak_rss_bytes = get_peak_rss_bytes()
+        if peak_rss_bytes is None:
+            return
 
-    def __build_reverse_index_mapping_path(self):
-        return f"{self.collection_name}/indexes/reverse_index_document_mapping.json"
+        logging.info(f"Peak RSS {'of reading and indexing' if is_peak_rss_reset else 'since the process start'}: {peak_rss_bytes / (1024 * 1024):.1f} MB")
 
-    def __build_index_mapping_path(self):
-        return f"{self.collection_name}/indexes/index_document_mapping.json"
+    def __build_checkpoint_path(self):
+        return f"{self.collection_name}/{CHECKPOINT_FILE_NAME}"
 
     def __build_index_info_path(self):
         return f"{self.collection_name}/indexes/index_info.json"
@@ -214,17 +572,20 @@ class DocumentCollectionCreator:
     def __build_index_base_path(self, indexer):
         return f"{self.collection_name}/indexes/{indexer.get_name()}"
 
-    def __batch_items(self, items, batch_size):
-        return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    def __build_document_path(self, document_id):
+        # Location of the document in the document store, documents are not stored as separate files
+        return f"{self.collection_name}/document_store/{document_id}"
 
     def __create_manifest_file(self, 
                                update_time, 
                                last_modified_document_time, 
-                               number_of_chunks,
+                               chunk_changes,
+                               document_statistics,
                                existing_manifest=None):
         manifest_content = self.__create_manifest_content(update_time, 
                                                           last_modified_document_time,
-                                                          number_of_chunks,
+                                                          chunk_changes,
+                                                          document_statistics,
                                                           existing_manifest=existing_manifest)
 
         self.__save_json_file(manifest_content, self.__build_manifest_path())
@@ -237,27 +598,45 @@ class DocumentCollectionCreator:
     def __create_manifest_content(self,
                                   update_time, 
                                   last_modified_document_time,
-                                  number_of_chunks,
+                                  chunk_changes,
+                                  document_statistics,
                                   existing_manifest=None):
-        number_of_documents = len(self.persister.read_folder_files(f"{self.collection_name}/documents"))
+        # Counters are taken from the indexer and the store, which keep them up to date, so nothing is walked or scanned
+        # (counting chunk changes of the run instead would drift, e.g. after a run interrupted before its checkpoint was used)
+        document_store_statistics = self.document_store.get_statistics()
+        number_of_chunks = self.document_indexers[0].get_size()
+        last_run_statistics = { "reader": self.document_reader.get_reader_details()["type"], **document_statistics }
 
         if existing_manifest:
             return { **existing_manifest,
                 "updatedTime": update_time.isoformat(),
                 "lastModifiedDocumentTime": last_modified_document_time.isoformat(),
-                "numberOfDocuments": number_of_documents,
+                "numberOfDocuments": document_store_statistics["numberOfDocuments"],
                 "numberOfChunks": number_of_chunks,
+                "documentStore": document_store_statistics,
+                "lastRunStatistics": last_run_statistics,
+                "lastRunChunkChanges": chunk_changes,
             }
 
         return {
             "collectionName": self.collection_name,
             "updatedTime": update_time.isoformat(),
             "lastModifiedDocumentTime": last_modified_document_time.isoformat(),
-            "numberOfDocuments": number_of_documents,
+            "numberOfDocuments": document_store_statistics["numberOfDocuments"],
             "numberOfChunks": number_of_chunks,
+            "documentStore": document_store_statistics,
+            "lastRunStatistics": last_run_statistics,
+            "lastRunChunkChanges": chunk_changes,
             "reader": self.document_reader.get_reader_details(),
-            "indexers": [{ "name": indexer.get_name() } for indexer in self.document_indexers],
+            "indexers": [self.__create_indexer_manifest_content(indexer) for indexer in self.document_indexers],
         }
+
+    def __create_indexer_manifest_content(self, indexer):
+        build_report = indexer.get_build_report()
+        if build_report is None:
+            return { "name": indexer.get_name() }
+
+        return { "name": indexer.get_name(), "buildReport": build_report }
     
     def __save_json_file(self, content, file_path):
         self.persister.save_text_file(json.dumps(content, indent=2, ensure_ascii=False), file_path)
@@ -0,0 +1,70 @@
+import json
+import logging
+from datetime import datetime, timezone
+
+from .index_document_mapping import IndexDocumentMapping
+from .embedding_store import EmbeddingStore
+from ..utils.progress_bar import wrap_iterator_with_progress_bar
+
+class DocumentCollectionReindexer:
+    def __init__(self,
+                 collection_name: str,
+                 document_indexers,
+                 persister,
+                 reindexing_batch_size=100_000):
+        self.collection_name = collection_name
+        self.document_indexers = document_indexers
+        self.persister = persister
+        self.reindexing_batch_size = reindexing_batch_size
+
+    def run(self):
+        if not self.persister.is_path_exists(self.collection_name):
+            raise Exception(f"Collection {self.collection_name} does not exist. Please create it first.")
+
+        manifest = json.loads(self.persister.read_text_file(self.__build_manifest_path()))
+        index_item_ids = IndexDocumentMapping.load(self.persister, self.collection_name, mmap_mode="r").get_indexed_item_ids()
+
+        for indexer in self.document_indexers:
+            self.__reindex(indexer, index_item_ids)
+
+            # Rebuilt indexers keep their place in the manifest, new ones are added, so collection updates maintain them too
+            indexer_names = [existing_indexer["name"] for existing_indexer in manifest["indexers"]]
+            if indexer.get_name() in indexer_names:
+                manifest["indexers"][indexer_names.index(indexer.get_name())] = self.__create_indexer_manifest_content(indexer)
+            else:
+                manifest["indexers"].append(self.__create_indexer_manifest_content(indexer))
+
+        # Searchers load indexes again only when the update time of the collection changes
+        manifest["updatedTime"] = datetime.now(timezone.utc).isoformat()
+        self.persister.save_text_file(json.dumps(manifest, indent=2, ensure_ascii=False), self.__build_manifest_path())
+
+        logging.info(f"Collection successfully reindexed: \n{json.dumps(manifest, indent=2, ensure_ascii=False)}")
+
+    def __reindex(self, indexer, index_item_ids):
+        if indexer.embedder is None:
+            raise ValueError(f"Indexer {indexer.get_name()} does not use embeddings, so it can not be rebuilt from stored embeddings")
+
+        model_name = indexer.embedder.model_name
+        if not EmbeddingStore.is_exists(self.persister, self.collection_name, model_name):
+            raise Exception(f"Collection {self.collection_name} has no stored embeddings of {model_name}. Please create the collection with an indexer that uses this model first.")
+
+        embedding_store = EmbeddingStore(self.persister, self.collection_name, model_name, indexer.embedder.get_number_of_dimensions())
+        if not embedding_store.has_vectors(index_item_ids):
+            raise Exception(f"Stored embeddings of {model_name} do not cover all chunks of collection {self.collection_name} (it was probably indexed before embeddings were stored). Please recreate the collection.")
+
+        for batch_start in wrap_iterator_with_progress_bar(range(0, len(index_item_ids), self.reindexing_batch_size),
+                                                           progress_bar_name=f"Reindexing {indexer.get_name()}"):
+            batch_index_item_ids = index_item_ids[batch_start:batch_start + self.reindexing_batch_size]
+            indexer.index_vectors(batch_index_item_ids, embedding_store.get_vectors(batch_index_item_ids))
+
+        indexer.save(self.persister, f"{self.collection_name}/indexes/{indexer.get_name()}")
+
+    def __create_indexer_manifest_content(self, indexer):
+        build_report = indexer.get_build_report()
+        if build_report is None:
+            return { "name": indexer.get_name() }
+
+        return { "name": indexer.get_name(), "buildReport": build_report }
+
+    def __build_manifest_path(self):
+        return f"{self.collection_name}/manifest.json"
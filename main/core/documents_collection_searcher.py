@@ -1,19 +1,122 @@
 import json
+import logging
+
+import numpy as np
+
+from .index_document_mapping import IndexDocumentMapping, NO_DOCUMENT
+from .document_store import DocumentStore
+from ..utils.lru_cache import LruCache
 
 class DocumentCollectionSearcher:
-    def __init__(self, collection_name, indexer, persister):
+    def __init__(self, collection_name, load_indexers, persister, document_cache_max_size_bytes=256 * 1024 * 1024, rank_fusion_k=60):
         self.collection_name = collection_name
-        self.indexer = indexer
+        # Returns the indexer and the hybrid indexer (or None) of the current collection state. They are loaded together with
+        # the mapping on every collection update, ids of an old index would point to wrong chunks in a new mapping.
+        self.load_indexers = load_indexers
         self.persister = persister
+        self.rank_fusion_k = rank_fusion_k
+        self.document_cache = LruCache(max_size=document_cache_max_size_bytes)
+
+        self.indexer = None
+        self.hybrid_indexer = None
+        self.index_document_mapping = None
+        self.document_store = None
+        self.loaded_collection_updated_time = None
+        self.__reload_collection_state_if_updated()
 
-    def search(self, text, 
-               max_number_of_chunks=15, 
-               max_number_of_documents=None, 
-               include_text_content=False, 
-               include_all_chunks_content=False, 
+    def search(self, text,
+               max_number_of_chunks=15,
+               max_number_of_documents=None,
+               include_text_content=False,
+               include_all_chunks_content=False,
                include_matched_chunks_content=False):
+        self.__reload_collection_state_if_updated()
+
         scores, indexes = self.indexer.search(text, max_number_of_chunks)
+        scores, indexes = scores[0], indexes[0]
+
+        if self.hybrid_indexer is not None:
+            lexical_scores, lexical_indexes = self.hybrid_indexer.search(text, max_number_of_chunks)
+            scores, indexes = self.__fuse_rankings(indexes, lexical_indexes[0], max_number_of_chunks)
+
+        search_result = self.__build_search_result(scores, indexes, max_number_of_documents, include_text_content, include_all_chunks_content, include_matched_chunks_content)
+        logging.debug(f"Document cache statistics: {self.document_cache.get_statistics()}")
+
+        return search_result
+
+    def search_many(self, texts,
+                    max_number_of_chunks=15,
+                    max_number_of_documents=None,
+                    include_text_content=False,
+                    include_all_chunks_content=False,
+                    include_matched_chunks_content=False):
+        self.__reload_collection_state_if_updated()
+
+        if len(texts) == 0:
+            return []
+
+        scores, indexes = self.indexer.search_many(texts, max_number_of_chunks)
+        scores, indexes = self.__fuse_with_hybrid_rankings_if_needed(texts, scores, indexes, max_number_of_chunks)
+
+        return self.__build_search_results(scores, indexes, max_number_of_documents, include_text_content, include_all_chunks_content, include_matched_chunks_content)
+
+    def search_by_vectors(self, vectors,
+                          max_number_of_chunks=15,
+                          max_number_of_documents=None,
+                          include_text_content=False,
+                          include_all_chunks_content=False,
+                          include_matched_chunks_content=False,
+                          texts=None):
+        self.__reload_collection_state_if_updated()
+
+        if len(vectors) == 0:
+            return []
+
+        scores, indexes = self.indexer.search_by_vectors(vectors, max_number_of_chunks)
+        if texts is not None:
+            scores, indexes = self.__fuse_with_hybrid_rankings_if_needed(texts, scores, indexes, max_number_of_chunks)
+
+        return self.__build_search_results(scores, indexes, max_number_of_documents, include_text_content, include_all_chunks_content, include_matched_chunks_content)
+
+    def get_embedder(self):
+        return self.indexer.embedder
+
+    def __fuse_with_hybrid_rankings_if_needed(self, texts, scores, indexes, max_number_of_chunks):
+        if self.hybrid_indexer is None:
+            return scores, indexes
+
+        _, lexical_indexes = self.hybrid_indexer.search_many(texts, max_number_of_chunks)
 
+        fused_rankings = [self.__fuse_rankings(indexes[query_number], lexical_indexes[query_number], max_number_of_chunks)
+                          for query_number in range(0, len(texts))]
+
+        return [fused_scores for fused_scores, _ in fused_rankings], [fused_indexes for _, fused_indexes in fused_rankings]
+
+    def __fuse_rankings(self, vector_indexes, lexical_indexes, max_number_of_chunks):
+        # Reciprocal rank fusion, fused scores are "higher is better" unlike vector distances
+        fused_scores = {}
+        for ranked_indexes in [vector_indexes, lexical_indexes]:
+            rank = 0
+            for index in ranked_indexes:
+                if index == NO_DOCUMENT:
+                    continue
+
+                rank += 1
+                fused_scores[int(index)] = fused_scores.get(int(index), 0.0) + 1.0 / (self.rank_fusion_k + rank)
+
+        fused_ranking = sorted(fused_scores.items(), key=lambda item: item[1], reverse=True)[:max_number_of_chunks]
+
+        return (np.array([score for _, score in fused_ranking], dtype=np.float32),
+                np.array([index for index, _ in fused_ranking], dtype=np.int64))
+
+    def __build_search_results(self, scores, indexes, max_number_of_documents, include_text_content, include_all_chunks_content, include_matched_chunks_content):
+        search_results = [self.__build_search_result(scores[query_number], indexes[query_number], max_number_of_documents, include_text_content, include_all_chunks_content, include_matched_chunks_content)
+                          for query_number in range(0, len(indexes))]
+        logging.debug(f"Document cache statistics: {self.document_cache.get_statistics()}")
+
+        return search_results
+
+    def __build_search_result(self, scores, indexes, max_number_of_documents, include_text_content, include_all_chunks_content, include_matched_chunks_content):
         results = self.__build_results(scores, indexes, include_text_content, include_all_chunks_content, include_matched_chunks_content)
         if max_number_of_documents:
             results = results[:max_number_of_documents]
@@ -21,46 +124,82 @@ class DocumentCollectionSearcher:
         return {
             "collectionName": self.collection_name,
             "indexerName": self.indexer.get_name(),
+            **({ "hybridIndexerName": self.hybrid_indexer.get_name() } if self.hybrid_indexer is not None else {}),
             "results": results,
         }
 
+    def get_document_cache_statistics(self):
+        return self.document_cache.get_statistics()
+
+    def __reload_collection_state_if_updated(self):
+        manifest = json.loads(self.persister.read_text_file(f"{self.collection_name}/manifest.json"))
+
+        if manifest["updatedTime"] == self.loaded_collection_updated_time:
+            return
+
+        if self.loaded_collection_updated_time is not None:
+            logging.info(f"Collection {self.collection_name} was updated at {manifest['updatedTime']}, reloading indexes, index document mapping and clearing document cache")
+            self.document_cache.clear()
+
+        self.indexer, self.hybrid_indexer = self.load_indexers()
+        self.index_document_mapping = IndexDocumentMapping.load(self.persister, self.collection_name, mmap_mode="r")
+        # Segments of the previous store stay mapped until they are closed, a long-running searcher would collect them on every update
+        if self.document_store is not None:
+            self.document_store.close()
+        self.document_store = DocumentStore.load(self.persister, self.collection_name)
+        self.loaded_collection_updated_time = manifest["updatedTime"]
+
     def __build_results(self, scores, indexes, include_text_content, include_all_chunks_content, include_matched_chunks_content):
-        indexes_base_path = f"{self.collection_name}/indexes"
-        index_document_mapping = json.loads(self.persister.read_text_file(f"{indexes_base_path}/index_document_mapping.json"))
+        document_ordinals, chunk_numbers = self.index_document_mapping.lookup(indexes)
 
         result = {}
 
-        for result_number in range(0, len(indexes[0])):
-            mapping = index_document_mapping[str(indexes[0][result_number])]                   
+        for result_number in range(0, len(document_ordinals)):
+            document_ordinal = int(document_ordinals[result_number])
+            if document_ordinal == NO_DOCUMENT:
+                continue
+
+            chunk_number = int(chunk_numbers[result_number])
+            document_id = self.index_document_mapping.get_document_id(document_ordinal)
 
-            if mapping["documentId"] not in result:
-                result[mapping["documentId"]] = {
-                    "id": mapping["documentId"],
-                    "url": mapping["documentUrl"],
-                    "path": mapping["documentPath"],
-                    "matchedChunks": [self.__build_chunk_result(mapping, scores, result_number, include_matched_chunks_content)]
+            if document_id not in result:
+                result[document_id] = {
+                    "id": document_id,
+                    "url": self.index_document_mapping.get_document_url(document_ordinal),
+                    "path": self.index_document_mapping.get_document_path(document_ordinal),
+                    "matchedChunks": [self.__build_chunk_result(document_id, chunk_number, scores, result_number, include_matched_chunks_content)]
                 }
 
                 if include_all_chunks_content or include_text_content:
-                    document = self.__get_document(mapping["documentPath"])
+                    document = self.__get_document(document_id)
 
                     if include_all_chunks_content:
-                        result[mapping["documentId"]]["allChunks"] = document["chunks"]
+                        result[document_id]["allChunks"] = document["chunks"]
 
                     if include_text_content:
-                        result[mapping["documentId"]]["text"] = document["text"]
+                        result[document_id]["text"] = document["text"]
 
             else:
-                result[mapping["documentId"]]["matchedChunks"].append(self.__build_chunk_result(mapping, scores, result_number, include_matched_chunks_content))
-            
+                result[document_id]["matchedChunks"].append(self.__build_chunk_result(document_id, chunk_number, scores, result_number, include_matched_chunks_content))
+
         return list(result.values())
 
-    def __build_chunk_result(self, mapping, scores, result_number, include_matched_chunks_content):
+    def __build_chunk_result(self, document_id, chunk_number, scores, result_number, include_matched_chunks_content):
         return {
-            "chunkNumber": mapping["chunkNumber"],
-            "score":  float(scores[0][result_number]),
-            **({ "content": self.__get_document(mapping["documentPath"])["chunks"][mapping["chunkNumber"]] } if include_matched_chunks_content else {})
+            "chunkNumber": chunk_number,
+            "score":  float(scores[result_number]),
+            **({ "content": self.__get_document(document_id)["chunks"][chunk_number] } if include_matched_chunks_content else {})
         }
 
-    def __get_document(self, documentPath):
-        return json.loads(self.persister.read_text_file(documentPath))
\ No newline at end of file
+    def __get_document(self, document_id):
+        document = self.document_cache.get(document_id)
+
+        if document is None:
+            document_with_size = self.document_store.read_document(document_id)
+            if document_with_size is None:
+                raise Exception(f"Document {document_id} is not found in the document store of collection {self.collection_name}")
+
+            document, document_size = document_with_size
+            self.document_cache.put(document_id, document, size=document_size)
+
+        return document
@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+
+class EmbeddingStore:
+    def __init__(self, persister, collection_name, model_name, number_of_dimensions):
+        self.persister = persister
+        self.base_path = EmbeddingStore.__build_base_path(collection_name, model_name)
+
+        if persister.is_path_exists(f"{self.base_path}/info.json"):
+            self.info = json.loads(persister.read_text_file(f"{self.base_path}/info.json"))
+        else:
+            self.info = {
+                "modelName": model_name,
+                "numberOfDimensions": number_of_dimensions,
+                "firstIndexItemId": None,
+                "numberOfItems": 0,
+            }
+
+        if self.info["numberOfDimensions"] != number_of_dimensions:
+            raise ValueError(f"Embeddings of {model_name} are stored with {self.info['numberOfDimensions']} dimensions, but the embedder has {number_of_dimensions}")
+
+        self.number_of_dimensions = number_of_dimensions
+        self.vectors = None
+
+    @staticmethod
+    def is_exists(persister, collection_name, model_name):
+        return persister.is_path_exists(f"{EmbeddingStore.__build_base_path(collection_name, model_name)}/info.json")
+
+    def append(self, index_item_ids, vectors):
+        if len(index_item_ids) == 0:
+            return
+
+        index_item_ids = np.asarray(index_item_ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(index_item_ids), self.number_of_dimensions)
+
+        if self.info["firstIndexItemId"] is None:
+            # Collections created before the store keep vectors only in indexes, so the store starts from the first new item
+            self.info["firstIndexItemId"] = int(index_item_ids[0])
+
+        next_index_item_id = self.info["firstIndexItemId"] + self.info["numberOfItems"]
+        if index_item_ids[0] < next_index_item_id or np.any(np.diff(index_item_ids) != 1):
+            raise ValueError(f"Embeddings are append-only and have to be added for consecutive index item ids starting from {next_index_item_id}")
+
+        # Items that were never embedded (e.g. ids skipped by an interrupted run) are filled with NaN
+        missing_vectors = np.full((int(index_item_ids[0]) - next_index_item_id, self.number_of_dimensions), np.nan, dtype=np.float32)
+
+        # Rows beyond the saved number of items are left from an interrupted run and are overwritten
+        self.persister.save_bin_file_part(missing_vectors.tobytes() + vectors.tobytes(),
+                                          f"{self.base_path}/vectors.f32",
+                                          offset=self.info["numberOfItems"] * self.number_of_dimensions * 4)
+
+        self.info["numberOfItems"] += len(missing_vectors) + len(vectors)
+        self.vectors = None
+
+    def save(self):
+        self.persister.save_text_file(json.dumps(self.info, indent=2), f"{self.base_path}/info.json")
+
+    def has_vectors(self, index_item_ids):
+        positions = np.asarray(index_item_ids, dtype=np.int64) - (self.info["firstIndexItemId"] or 0)
+        if len(positions) == 0:
+            return True
+
+        if self.info["firstIndexItemId"] is None or positions.min() < 0 or positions.max() >= self.info["numberOfItems"]:
+            return False
+
+        return not np.isnan(self.__get_vectors()[positions, 0]).any()
+
+    def get_vectors(self, index_item_ids):
+        positions = np.asarray(index_item_ids, dtype=np.int64) - self.info["firstIndexItemId"]
+
+        return np.asarray(self.__get_vectors()[positions])
+
+    def get_number_of_items(self):
+        return self.info["numberOfItems"]
+
+    def __get_vectors(self):
+        if self.vectors is None:
+            self.vectors = np.memmap(self.persister.get_full_path(f"{self.base_path}/vectors.f32"),
+                                     dtype=np.float32,
+                                     mode="r",
+                                     shape=(self.info["numberOfItems"], self.number_of_dimensions))
+
+        return self.vectors
+
+    @staticmethod
+    def __build_base_path(collection_name, model_name):
+        return f"{collection_name}/embeddings/{model_name.replace('/', '__')}"
@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+
+class FederatedCollectionsSearcher:
+    def __init__(self, collection_searchers, max_number_of_workers=None, rank_fusion_k=60):
+        self.collection_searchers = collection_searchers
+        self.rank_fusion_k = rank_fusion_k
+        self.executor = ThreadPoolExecutor(max_workers=max_number_of_workers or len(collection_searchers),
+                                           thread_name_prefix="collection-search")
+
+        # Collections indexed with the same model share one query embedding, lexical ones (e.g. BM25) search by texts
+        self.searchers_by_model = {}
+        self.lexical_searchers = []
+        for collection_searcher in collection_searchers:
+            if collection_searcher.get_embedder() is None:
+                self.lexical_searchers.append(collection_searcher)
+            else:
+                self.searchers_by_model.setdefault(collection_searcher.get_embedder().model_name, []).append(collection_searcher)
+
+    def search(self, text,
+               max_number_of_chunks=15,
+               max_number_of_documents=None,
+               include_text_content=False,
+               include_all_chunks_content=False,
+               include_matched_chunks_content=False):
+        return self.search_many([text],
+                                max_number_of_chunks=max_number_of_chunks,
+                                max_number_of_documents=max_number_of_documents,
+                                include_text_content=include_text_content,
+                                include_all_chunks_content=include_all_chunks_content,
+                                include_matched_chunks_content=include_matched_chunks_content)[0]
+
+    def search_many(self, texts,
+                    max_number_of_chunks=15,
+                    max_number_of_documents=None,
+                    include_text_content=False,
+                    include_all_chunks_content=False,
+                    include_matched_chunks_content=False):
+        if len(texts) == 0:
+            return []
+
+        searchers_with_futures = []
+        for searchers in self.searchers_by_model.values():
+            vectors = searchers[0].get_embedder().embed(texts)
+
+            for collection_searcher in searchers:
+                searchers_with_futures.append((collection_searcher, self.executor.submit(collection_searcher.search_by_vectors,
+                                                                                         vectors,
+                                                                                         max_number_of_chunks=max_number_of_chunks,
+                                                                                         include_text_content=include_text_content,
+                                                                                         include_all_chunks_content=include_all_chunks_content,
+                                                                                         include_matched_chunks_content=include_matched_chunks_content,
+                                                                                         texts=texts)))
+
+        for collection_searcher in self.lexical_searchers:
+            searchers_with_futures.append((collection_searcher, self.executor.submit(collection_searcher.search_many,
+                                                                                     texts,
+                                                                                     max_number_of_chunks=max_number_of_chunks,
+                                                                                     include_text_content=include_text_content,
+                                                                                     include_all_chunks_content=include_all_chunks_content,
+                                                                                     include_matched_chunks_content=include_matched_chunks_content)))
+
+        collections_search_results = [future.result() for _, future in searchers_with_futures]
+
+        return [self.__merge_search_results([collection_search_results[query_number] for collection_search_results in collections_search_results],
+                                            max_number_of_documents)
+                for query_number in range(0, len(texts))]
+
+    def __merge_search_results(self, search_results, max_number_of_documents):
+        # Reciprocal rank fusion, scores of collections are not comparable (distances of different models, BM25 scores, fused ranks),
+        # so results are ranked by their position in the results of their collection
+        results = []
+        fused_scores = []
+        for search_result in search_results:
+
+            for rank, result in enumerate(search_result["results"], start=1):
+                results.append({
+                    "collectionName": search_result["collectionName"],
+                    "indexerName": search_result["indexerName"],
+                    **result,
+                })
+                fused_scores.append(1.0 / (self.rank_fusion_k + rank))
+
+        results = [result for _, _, result in sorted(zip(fused_scores, range(0, -len(results), -1), results), reverse=True)]
+        if max_number_of_documents:
+            results = results[:max_number_of_documents]
+
+        return {
+            "collectionNames": [search_result["collectionName"] for search_result in search_results],
+            "results": results,
+        }
@@ -0,0 +1,269 @@
+import json
+import logging
+
+import numpy as np
+
+from ..utils.string_table import StringTable
+from ..utils.content_hash import UNKNOWN_HASH
+
+NO_DOCUMENT = -1
+
+class IndexDocumentMapping:
+    def __init__(self, document_ordinals, chunk_numbers, chunk_hashes, document_ids, document_urls, document_paths, document_hashes):
+        self.document_ordinals = document_ordinals
+        self.chunk_numbers = chunk_numbers
+        self.chunk_hashes = chunk_hashes
+        self.document_ids = document_ids
+        self.document_urls = document_urls
+        self.document_paths = document_paths
+        self.document_hashes = document_hashes
+
+        self.appended_document_ordinals = []
+        self.appended_chunk_numbers = []
+        self.appended_chunk_hashes = []
+        self.document_ordinal_by_id = None
+
+    @staticmethod
+    def create_empty():
+        return IndexDocumentMapping(np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint64), [], [], [], [])
+
+    @staticmethod
+    def load(persister, collection_name, mmap_mode=None):
+        base_path = IndexDocumentMapping.__build_base_path(collection_name)
+
+        # Mappings of older versions are read as they are, only runs that write the collection migrate them
+        if IndexDocumentMapping.has_json_mapping(persister, collection_name):
+            return IndexDocumentMapping.from_json_mapping(json.loads(persister.read_text_file(IndexDocumentMapping.__build_json_mapping_path(collection_name))))
+
+        document_ordinals = persister.read_numpy_file(f"{base_path}/document_ordinals.npy", mmap_mode=mmap_mode)
+        document_ids = StringTable.load(persister, f"{base_path}/document_ids", mmap_mode=mmap_mode)
+
+        return IndexDocumentMapping(document_ordinals,
+                                    persister.read_numpy_file(f"{base_path}/chunk_numbers.npy", mmap_mode=mmap_mode),
+                                    IndexDocumentMapping.__read_hashes(persister, f"{base_path}/chunk_hashes.npy", len(document_ordinals), mmap_mode),
+                                    document_ids,
+                                    StringTable.load(persister, f"{base_path}/document_urls", mmap_mode=mmap_mode),
+                                    StringTable.load(persister, f"{base_path}/document_paths", mmap_mode=mmap_mode),
+                                    IndexDocumentMapping.__read_hashes(persister, f"{base_path}/document_hashes.npy", len(document_ids), mmap_mode))
+
+    @staticmethod
+    def has_json_mapping(persister, collection_name):
+        return (not persister.is_path_exists(f"{IndexDocumentMapping.__build_base_path(collection_name)}/document_ordinals.npy")
+                and persister.is_path_exists(IndexDocumentMapping.__build_json_mapping_path(collection_name)))
+
+    @staticmethod
+    def migrate_json_mapping(persister, collection_name):
+        index_mapping_path = IndexDocumentMapping.__build_json_mapping_path(collection_name)
+
+        logging.info(f"Migrating {index_mapping_path} to the binary index document mapping format")
+
+        index_document_mapping = IndexDocumentMapping.from_json_mapping(json.loads(persister.read_text_file(index_mapping_path)))
+        index_document_mapping.save(persister, collection_name)
+
+        # Search processes read the JSON mapping only when they load the collection, after the save they load the binary one
+        persister.remove_file(index_mapping_path)
+        persister.remove_file(f"{collection_name}/indexes/reverse_index_document_mapping.json")
+
+    @staticmethod
+    def from_json_mapping(index_document_mapping):
+        number_of_items = max((int(index_item_id) for index_item_id in index_document_mapping), default=-1) + 1
+
+        document_ordinals = np.full(number_of_items, NO_DOCUMENT, dtype=np.int32)
+        chunk_numbers = np.zeros(number_of_items, dtype=np.int32)
+        document_ordinal_by_id = {}
+        document_ids = []
+        document_urls = []
+        document_paths = []
+
+        for index_item_id, mapping in index_document_mapping.items():
+            document_ordinal = document_ordinal_by_id.get(mapping["documentId"])
+            if document_ordinal is None:
+                document_ordinal = len(document_ids)
+                document_ordinal_by_id[mapping["documentId"]] = document_ordinal
+                document_ids.append(mapping["documentId"])
+                document_urls.append(mapping["documentUrl"])
+                document_paths.append(mapping["documentPath"])
+
+            document_ordinals[int(index_item_id)] = document_ordinal
+            chunk_numbers[int(index_item_id)] = mapping["chunkNumber"]
+
+        return IndexDocumentMapping(document_ordinals,
+                                    chunk_numbers,
+                                    np.full(number_of_items, UNKNOWN_HASH, dtype=np.uint64),
+                                    document_ids,
+                                    document_urls,
+                                    document_paths,
+                                    [UNKNOWN_HASH] * len(document_ids))
+
+    def save(self, persister, collection_name):
+        self.__consolidate_appended_items()
+
+        used_document_ordinals = np.unique(self.document_ordinals[self.document_ordinals != NO_DOCUMENT])
+        compacted_ordinal_by_ordinal = np.full(len(self.document_ids), NO_DOCUMENT, dtype=np.int32)
+        compacted_ordinal_by_ordinal[used_document_ordinals] = np.arange(len(used_document_ordinals), dtype=np.int32)
+
+        compacted_document_ordinals = np.full(len(self.document_ordinals), NO_DOCUMENT, dtype=np.int32)
+        known_items = self.document_ordinals != NO_DOCUMENT
+        compacted_document_ordinals[known_items] = compacted_ordinal_by_ordinal[self.document_ordinals[known_items]]
+
+        base_path = IndexDocumentMapping.__build_base_path(collection_name)
+        persister.save_numpy_file(compacted_document_ordinals, f"{base_path}/document_ordinals.npy")
+        persister.save_numpy_file(np.asarray(self.chunk_numbers, dtype=np.int32), f"{base_path}/chunk_numbers.npy")
+        persister.save_numpy_file(np.asarray(self.chunk_hashes, dtype=np.uint64), f"{base_path}/chunk_hashes.npy")
+        persister.save_numpy_file(np.asarray(self.document_hashes, dtype=np.uint64)[used_document_ordinals], f"{base_path}/document_hashes.npy")
+        for column, strings in [("document_ids", self.document_ids),
+                                ("document_urls", self.document_urls),
+                                ("document_paths", self.document_paths)]:
+            StringTable.from_strings([strings[ordinal] for ordinal in used_document_ordinals]).save(persister, f"{base_path}/{column}")
+
+    def add_document(self, document_id, document_url, document_path, document_hash, first_index_item_id, chunk_numbers, chunk_hashes):
+        # Adds items of the given chunks with consecutive ids, an updated document keeps items of its unchanged chunks
+        document_ordinal = self.__get_document_ordinal_by_id().get(document_id)
+        if document_ordinal is None:
+            document_ordinal = len(self.document_ids)
+            self.document_ordinal_by_id[document_id] = document_ordinal
+            self.__make_document_table_mutable()
+            self.document_ids.append(document_id)
+            self.document_urls.append(document_url)
+            self.document_paths.append(document_path)
+            self.document_hashes.append(document_hash)
+        elif (self.document_urls[document_ordinal] != document_url 
+              or self.document_paths[document_ordinal] != document_path 
+              or self.document_hashes[document_ordinal] != document_hash):
+            self.__make_document_table_mutable()
+            self.document_urls[document_ordinal] = document_url
+            self.document_paths[document_ordinal] = document_path
+            self.document_hashes[document_ordinal] = document_hash
+
+        if len(chunk_numbers) == 0:
+            return
+
+        number_of_missing_items = first_index_item_id - self.get_number_of_items()
+        self.appended_document_ordinals.extend([NO_DOCUMENT] * number_of_missing_items + [document_ordinal] * len(chunk_numbers))
+        self.appended_chunk_numbers.extend([0] * number_of_missing_items + list(chunk_numbers))
+        self.appended_chunk_hashes.extend([UNKNOWN_HASH] * number_of_missing_items + list(chunk_hashes))
+
+    def remove_documents(self, document_ids):
+        self.__consolidate_appended_items()
+
+        document_ordinal_by_id = self.__get_document_ordinal_by_id()
+        document_ordinals_to_remove = [document_ordinal_by_id[document_id] for document_id in document_ids if document_id in document_ordinal_by_id]
+
+        index_item_ids_to_remove = np.flatnonzero(np.isin(self.document_ordinals, document_ordinals_to_remove)).astype(np.int64)
+        self.remove_index_items(index_item_ids_to_remove)
+
+        return index_item_ids_to_remove
+
+    def remove_index_items(self, index_item_ids):
+        self.__consolidate_appended_items()
+
+        if not self.document_ordinals.flags.writeable:
+            self.document_ordinals = np.array(self.document_ordinals)
+        self.document_ordinals[np.asarray(index_item_ids, dtype=np.int64)] = NO_DOCUMENT
+
+    def update_chunk_numbers(self, index_item_ids, chunk_numbers):
+        self.__consolidate_appended_items()
+
+        if not self.chunk_numbers.flags.writeable:
+            self.chunk_numbers = np.array(self.chunk_numbers)
+        self.chunk_numbers[np.asarray(index_item_ids, dtype=np.int64)] = chunk_numbers
+
+    def get_documents_chunks(self, document_ids):
+        # One pass over all items for many documents, an update looks up its documents in batches
+        self.__consolidate_appended_items()
+
+        document_ordinal_by_id = self.__get_document_ordinal_by_id()
+        document_ordinals = [document_ordinal_by_id[document_id] for document_id in document_ids if document_id in document_ordinal_by_id]
+
+        index_item_ids = np.flatnonzero(np.isin(self.document_ordinals, document_ordinals)).astype(np.int64)
+        # Stable sort by document keeps items of every document in the order of their ids
+        index_item_ids = index_item_ids[np.argsort(self.document_ordinals[index_item_ids], kind="stable")]
+        item_document_ordinals = self.document_ordinals[index_item_ids]
+
+        documents_chunks = {}
+        for document_ordinal in document_ordinals:
+            start, end = np.searchsorted(item_document_ordinals, [document_ordinal, document_ordinal + 1])
+            document_index_item_ids = index_item_ids[start:end]
+            documents_chunks[self.document_ids[document_ordinal]] = {
+                "documentHash": int(self.document_hashes[document_ordinal]),
+                "indexItemIds": document_index_item_ids,
+                "chunkNumbers": np.asarray(self.chunk_numbers[document_index_item_ids]),
+                "chunkHashes": np.asarray(self.chunk_hashes[document_index_item_ids]),
+            }
+
+        return documents_chunks
+
+    def lookup(self, index_item_ids):
+        self.__consolidate_appended_items()
+
+        index_item_ids = np.asarray(index_item_ids, dtype=np.int64)
+        known_items = (index_item_ids >= 0) & (index_item_ids < len(self.document_ordinals))
+
+        document_ordinals = np.full(len(index_item_ids), NO_DOCUMENT, dtype=np.int32)
+        chunk_numbers = np.zeros(len(index_item_ids), dtype=np.int32)
+        document_ordinals[known_items] = self.document_ordinals[index_item_ids[known_items]]
+        chunk_numbers[known_items] = self.chunk_numbers[index_item_ids[known_items]]
+
+        return document_ordinals, chunk_numbers
+
+    def get_indexed_item_ids(self):
+        self.__consolidate_appended_items()
+
+        return np.flatnonzero(self.document_ordinals != NO_DOCUMENT).astype(np.int64)
+
+    def get_number_of_items(self):
+        return len(self.document_ordinals) + len(self.appended_document_ordinals)
+
+    def get_document_id(self, document_ordinal):
+        return self.document_ids[document_ordinal]
+
+    def get_document_url(self, document_ordinal):
+        return self.document_urls[document_ordinal]
+
+    def get_document_path(self, document_ordinal):
+        return self.document_paths[document_ordinal]
+
+    def set_document_paths(self, build_document_path):
+        # Paths of all documents are built again from their ids, e.g. after documents moved to another storage
+        self.__make_document_table_mutable()
+        self.document_paths = [build_document_path(document_id) for document_id in self.document_ids]
+
+    def __get_document_ordinal_by_id(self):
+        if self.document_ordinal_by_id is None:
+            self.document_ordinal_by_id = { self.document_ids[ordinal]: ordinal for ordinal in range(0, len(self.document_ids)) }
+
+        return self.document_ordinal_by_id
+
+    def __make_document_table_mutable(self):
+        if isinstance(self.document_ids, StringTable):
+            self.document_ids = self.document_ids.to_list()
+            self.document_urls = self.document_urls.to_list()
+            self.document_paths = self.document_paths.to_list()
+            self.document_hashes = self.document_hashes.tolist()
+
+    def __consolidate_appended_items(self):
+        if len(self.appended_document_ordinals) == 0:
+            return
+
+        self.document_ordinals = np.concatenate([self.document_ordinals, np.array(self.appended_document_ordinals, dtype=np.int32)])
+        self.chunk_numbers = np.concatenate([self.chunk_numbers, np.array(self.appended_chunk_numbers, dtype=np.int32)])
+        self.chunk_hashes = np.concatenate([self.chunk_hashes, np.array(self.appended_chunk_hashes, dtype=np.uint64)])
+        self.appended_document_ordinals = []
+        self.appended_chunk_numbers = []
+        self.appended_chunk_hashes = []
+
+    @staticmethod
+    def __read_hashes(persister, file_path, number_of_hashes, mmap_mode):
+        # Collections indexed before hashes were stored have unknown hashes, their chunks are embedded again on the next update
+        if not persister.is_path_exists(file_path):
+            return np.full(number_of_hashes, UNKNOWN_HASH, dtype=np.uint64)
+
+        return persister.read_numpy_file(file_path, mmap_mode=mmap_mode)
+
+    @staticmethod
+    def __build_json_mapping_path(collection_name):
+        return f"{collection_name}/indexes/index_document_mapping.json"
+
+    @staticmethod
+    def __build_base_path(collection_name):
+        return f"{collection_name}/indexes/index_document_mapping"
@@ -0,0 +1,22 @@
+from main.indexes.embeddings.cached_embedder import CachedEmbedder
+from main.indexes.embeddings.persistent_embedding_cache import PersistentEmbeddingCache
+
+def wrap_embedders_with_chunk_embedding_cache(indexers, max_size_bytes):
+    # One cache for all collections, so the same chunk text is embedded once per model even if it is in several collections
+    persistent_cache = PersistentEmbeddingCache(path="./data/caches/chunk_embeddings.sqlite", max_size_bytes=max_size_bytes)
+
+    cached_embedders = {}
+    for indexer in indexers:
+        if indexer.embedder is None:
+            continue
+
+        if indexer.embedder.model_name not in cached_embedders:
+            # Chunks are embedded exactly as they are, the in-memory cache is not needed since chunks rarely repeat within a job
+            cached_embedders[indexer.embedder.model_name] = CachedEmbedder(indexer.embedder,
+                                                                           max_number_of_items=0,
+                                                                           persistent_cache=persistent_cache,
+                                                                           normalize_text=False,
+                                                                           cache_name="Chunk embedding",
+                                                                           log_every_number_of_calls=1)
+
+        indexer.embedder = cached_embedders[indexer.embedder.model_name]
\ No newline at end of file
@@ -0,0 +1,31 @@
+import json
+
+from main.core.documents_collection_compactor import DocumentCollectionCompactor
+from main.indexes.indexer_factory import load_indexer
+from main.persisters.disk_persister import DiskPersister
+
+from main.utils.performance import log_execution_duration
+
+def create_collection_compactor(collection_name, indexers=None):
+    return log_execution_duration(
+        lambda: __create_collection_compactor(collection_name, indexers),
+        identifier=f"Preparing collection compactor"
+    )
+
+def __create_collection_compactor(collection_name, indexers):
+    disk_persister = DiskPersister(base_path="./data/collections")
+
+    if not disk_persister.is_path_exists(collection_name):
+        raise Exception(f"Collection {collection_name} does not exist")
+
+    manifest = json.loads(disk_persister.read_text_file(f"{collection_name}/manifest.json"))
+    indexer_names = [indexer["name"] for indexer in manifest["indexers"]]
+    for indexer_name in indexers or []:
+        if indexer_name not in indexer_names:
+            raise ValueError(f"Collection {collection_name} has no indexer {indexer_name}, available indexers: {indexer_names}")
+
+    document_indexers = [load_indexer(indexer_name, collection_name, disk_persister) for indexer_name in (indexers or indexer_names)]
+
+    return DocumentCollectionCompactor(collection_name=collection_name,
+                                       document_indexers=document_indexers,
+                                       persister=disk_persister)
\ No newline at end of file
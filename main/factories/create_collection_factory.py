@@ -1,17 +1,22 @@
 from main.sources.document_cache_reader_decorator import CacheReaderDecorator
 from main.core.documents_collection_creator import DocumentCollectionCreator, OPERATION_TYPE
-from main.indexes.indexer_factory import create_indexer
+from main.indexes.indexer_factory import create_indexer, load_indexer
+from main.factories.chunk_embedding_cache_factory import wrap_embedders_with_chunk_embedding_cache
+from main.factories.embedding_pool_factory import start_embedding_pools
 from main.persisters.disk_persister import DiskPersister
 
 from main.utils.performance import log_execution_duration
 
-def create_collection_creator(collection_name, indexers, document_reader, document_converter, use_cache=True):
+def create_collection_creator(collection_name, indexers, document_reader, document_converter, use_cache=True, embedding_cache_size_bytes=2 * 1024 * 1024 * 1024,
+                              number_of_embedding_workers=0, number_of_threads_per_embedding_worker=None, resume=False):
     return log_execution_duration(
-        lambda: __create_collection_creator(collection_name, indexers, document_reader, document_converter, use_cache),
+        lambda: __create_collection_creator(collection_name, indexers, document_reader, document_converter, use_cache, embedding_cache_size_bytes,
+                                            number_of_embedding_workers, number_of_threads_per_embedding_worker, resume),
         identifier=f"Preparing collection creator"
     )
 
-def __create_collection_creator(collection_name, indexers, document_reader, document_converter, use_cache):
+def __create_collection_creator(collection_name, indexers, document_reader, document_converter, use_cache, embedding_cache_size_bytes,
+                                number_of_embedding_workers, number_of_threads_per_embedding_worker, resume):
     if use_cache:
         cache_disk_persister = DiskPersister(base_path="./data/caches")
         result_document_reader = CacheReaderDecorator(reader=document_reader,
@@ -19,13 +24,22 @@ def __create_collection_creator(collection_name, indexers, document_reader, docu
     else:
         result_document_reader = document_reader
 
-    document_indexers = [create_indexer(indexer_name) for indexer_name in indexers]
-
     disk_persister = DiskPersister(base_path="./data/collections")
 
+    # A resumed creation continues from indexes saved by the last checkpoint
+    if resume and DocumentCollectionCreator.has_checkpoint(disk_persister, collection_name):
+        document_indexers = [load_indexer(indexer_name, collection_name, disk_persister) for indexer_name in indexers]
+    else:
+        document_indexers = [create_indexer(indexer_name) for indexer_name in indexers]
+    if number_of_embedding_workers > 0:
+        start_embedding_pools(document_indexers, number_of_embedding_workers, number_of_threads_per_embedding_worker)
+    if embedding_cache_size_bytes > 0:
+        wrap_embedders_with_chunk_embedding_cache(document_indexers, embedding_cache_size_bytes)
+
     return DocumentCollectionCreator(collection_name=collection_name, 
                                      document_reader=result_document_reader, 
                                      document_converter=document_converter,
                                      document_indexers=document_indexers,
                                      persister=disk_persister,
-                                     operation_type=OPERATION_TYPE.CREATE)
\ No newline at end of file
+                                     operation_type=OPERATION_TYPE.CREATE,
+                                     resume=resume)
\ No newline at end of file
@@ -0,0 +1,10 @@
+import logging
+
+from main.indexes.embeddings.sentence_embeder import SentenceEmbedder
+
+def start_embedding_pools(indexers, number_of_workers, number_of_threads_per_worker=None):
+    for indexer in indexers:
+        if isinstance(indexer.embedder, SentenceEmbedder):
+            indexer.embedder.start_pool(number_of_workers, number_of_threads_per_worker)
+        elif indexer.embedder is not None:
+            logging.warning(f"Embedding workers are supported only for sentence-transformers models, {indexer.get_name()} embeds in process")
\ No newline at end of file
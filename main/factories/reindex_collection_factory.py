@@ -0,0 +1,20 @@
+from main.core.documents_collection_reindexer import DocumentCollectionReindexer
+from main.indexes.indexer_factory import create_indexer
+from main.persisters.disk_persister import DiskPersister
+
+from main.utils.performance import log_execution_duration
+
+def create_collection_reindexer(collection_name, indexers):
+    return log_execution_duration(
+        lambda: __create_collection_reindexer(collection_name, indexers),
+        identifier=f"Preparing collection reindexer"
+    )
+
+def __create_collection_reindexer(collection_name, indexers):
+    document_indexers = [create_indexer(indexer_name) for indexer_name in indexers]
+
+    disk_persister = DiskPersister(base_path="./data/collections")
+
+    return DocumentCollectionReindexer(collection_name=collection_name,
+                                       document_indexers=document_indexers,
+                                       persister=disk_persister)
\ No newline at end of file
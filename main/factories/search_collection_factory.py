@@ -1,20 +1,95 @@
 from main.persisters.disk_persister import DiskPersister
 from main.indexes.indexer_factory import load_indexer
+from main.indexes.embeddings.cached_embedder import CachedEmbedder
+from main.indexes.embeddings.persistent_embedding_cache import PersistentEmbeddingCache
 from main.core.documents_collection_searcher import DocumentCollectionSearcher
+from main.core.federated_collections_searcher import FederatedCollectionsSearcher
 
 from main.utils.performance import log_execution_duration
 
-def create_collection_searcher(collection_name, index_name):
+def create_collection_searcher(collection_name,
+                               index_name,
+                               document_cache_max_size_bytes=256 * 1024 * 1024,
+                               query_embedding_cache_size=1000,
+                               persist_query_embeddings=False,
+                               hybrid_index_name=None,
+                               nprobe=None,
+                               ef_search=None,
+                               refine_factor=None):
     return log_execution_duration(
-        lambda: __create_collection_searcher(collection_name, index_name),
+        lambda: __create_collection_searchers([collection_name],
+                                              index_name,
+                                              document_cache_max_size_bytes,
+                                              query_embedding_cache_size,
+                                              persist_query_embeddings,
+                                              hybrid_index_name,
+                                              nprobe,
+                                              ef_search,
+                                              refine_factor)[0],
         identifier=f"Preparing collection searcher"
     )
 
-def __create_collection_searcher(collection_name, index_name):
+def create_federated_collections_searcher(collection_names,
+                                          index_name,
+                                          document_cache_max_size_bytes=256 * 1024 * 1024,
+                                          query_embedding_cache_size=1000,
+                                          persist_query_embeddings=False,
+                                          hybrid_index_name=None,
+                                          nprobe=None,
+                                          ef_search=None,
+                                          refine_factor=None):
+    return log_execution_duration(
+        lambda: FederatedCollectionsSearcher(__create_collection_searchers(collection_names,
+                                                                           index_name,
+                                                                           document_cache_max_size_bytes,
+                                                                           query_embedding_cache_size,
+                                                                           persist_query_embeddings,
+                                                                           hybrid_index_name,
+                                                                           nprobe,
+                                                                           ef_search,
+                                                                           refine_factor)),
+        identifier=f"Preparing federated searcher for collections: {', '.join(collection_names)}"
+    )
+
+def __create_collection_searchers(collection_names, index_name, document_cache_max_size_bytes, query_embedding_cache_size, persist_query_embeddings, hybrid_index_name, nprobe, ef_search, refine_factor):
     disk_persister = DiskPersister(base_path="./data/collections")
 
-    indexer = load_indexer(index_name, collection_name, disk_persister)
-    
-    return DocumentCollectionSearcher(collection_name=collection_name, 
-                                      indexer=indexer, 
-                                      persister=disk_persister)
+    # Cached embedders are shared by collections of the same model and kept when indexers are loaded again after collection updates
+    persistent_cache = PersistentEmbeddingCache(path="./data/caches/query_embeddings.sqlite") if persist_query_embeddings else None
+    cached_embedders = {}
+
+    # Searchers load indexers again when their collection is updated, so indexes always match the loaded mapping
+    def load_indexers(collection_name):
+        indexer, hybrid_indexer = __load_search_indexers(collection_name, index_name, hybrid_index_name, disk_persister, nprobe, ef_search, refine_factor)
+        if query_embedding_cache_size > 0 or persist_query_embeddings:
+            __wrap_embedder_with_cache(indexer, cached_embedders, query_embedding_cache_size, persistent_cache)
+
+        return indexer, hybrid_indexer
+
+    return [DocumentCollectionSearcher(collection_name=collection_name,
+                                       load_indexers=lambda collection_name=collection_name: load_indexers(collection_name),
+                                       persister=disk_persister,
+                                       document_cache_max_size_bytes=document_cache_max_size_bytes)
+            for collection_name in collection_names]
+
+def __load_search_indexers(collection_name, index_name, hybrid_index_name, disk_persister, nprobe, ef_search, refine_factor):
+    # Searchers only read indexes, so they are memory-mapped where the index type allows and share the page cache between processes
+    indexer = load_indexer(index_name, collection_name, disk_persister, mmap=True)
+    if nprobe is not None or ef_search is not None or refine_factor is not None:
+        indexer.set_search_parameters(nprobe=nprobe, ef_search=ef_search, refine_factor=refine_factor)
+
+    hybrid_indexer = load_indexer(hybrid_index_name, collection_name, disk_persister) if hybrid_index_name else None
+
+    return indexer, hybrid_indexer
+
+def __wrap_embedder_with_cache(indexer, cached_embedders, query_embedding_cache_size, persistent_cache):
+    if indexer.embedder is None:
+        return
+
+    if indexer.embedder.model_name not in cached_embedders:
+        cached_embedders[indexer.embedder.model_name] = CachedEmbedder(indexer.embedder,
+                                                                       max_number_of_items=query_embedding_cache_size,
+                                                                       persistent_cache=persistent_cache,
+                                                                       cache_name="Query embedding")
+
+    indexer.embedder = cached_embedders[indexer.embedder.model_name]
\ No newline at end of file
@@ -14,17 +14,27 @@ from main.sources.confluence.confluence_cloud_document_converter import Confluen
 from main.sources.files.files_document_reader import FilesDocumentReader
 from main.sources.files.files_document_converter import FilesDocumentConverter
 from main.indexes.indexer_factory import load_indexer
+from main.factories.chunk_embedding_cache_factory import wrap_embedders_with_chunk_embedding_cache
+from main.factories.embedding_pool_factory import start_embedding_pools
 from main.core.documents_collection_creator import DocumentCollectionCreator, OPERATION_TYPE
 
 from main.utils.performance import log_execution_duration
 
-def create_collection_updater(collection_name):
+def create_collection_updater(collection_name,
+                              embedding_cache_size_bytes=2 * 1024 * 1024 * 1024,
+                              number_of_embedding_workers=0,
+                              number_of_threads_per_embedding_worker=None,
+                              resume=False):
     return log_execution_duration(
-        lambda: __create_collection_updater(collection_name),
+        lambda: __create_collection_updater(collection_name,
+                                            embedding_cache_size_bytes,
+                                            number_of_embedding_workers,
+                                            number_of_threads_per_embedding_worker,
+                                            resume),
         identifier=f"Preparing collection updater"
     )
 
-def __create_collection_updater(collection_name):
+def __create_collection_updater(collection_name, embedding_cache_size_bytes, number_of_embedding_workers, number_of_threads_per_embedding_worker, resume):
     disk_persister = DiskPersister(base_path="./data/collections")
 
     if not disk_persister.is_path_exists(collection_name):
@@ -35,13 +45,18 @@ def __create_collection_updater(collection_name):
     document_reader, document_converter = __create_reader_and_converter(manifest)
 
     document_indexers = [load_indexer(indexer["name"], collection_name, disk_persister) for indexer in manifest['indexers']]
+    if number_of_embedding_workers > 0:
+        start_embedding_pools(document_indexers, number_of_embedding_workers, number_of_threads_per_embedding_worker)
+    if embedding_cache_size_bytes > 0:
+        wrap_embedders_with_chunk_embedding_cache(document_indexers, embedding_cache_size_bytes)
 
     return DocumentCollectionCreator(collection_name=collection_name,
                                      document_reader=document_reader, 
                                      document_converter=document_converter, 
                                      document_indexers=document_indexers,
                                      persister=disk_persister,
-                                     operation_type=OPERATION_TYPE.UPDATE)
+                                     operation_type=OPERATION_TYPE.UPDATE,
+                                     resume=resume)
 
 
 def __calculate_update_time(manifest):
@@ -0,0 +1,142 @@
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+
+import numpy as np
+
+from ...utils.lru_cache import LruCache
+
+class CachedEmbedder:
+    def __init__(self, embedder, max_number_of_items=10_000, persistent_cache=None, normalize_text=True, cache_name="Embedding", log_every_number_of_calls=100):
+        """
+        Initialize the CachedEmbedder that wraps another embedder with an LRU cache.
+
+        Embeddings are cached by (model name, text). Texts that are not cached are
+        embedded by the wrapped embedder in one call.
+
+        Args:
+            embedder: Embedder to wrap (SentenceEmbedder, OllamaEmbedder, etc.).
+            max_number_of_items (int): Max number of embeddings kept in memory, 0 disables the in-memory cache.
+            persistent_cache (PersistentEmbeddingCache, optional): Store that keeps embeddings between runs.
+            normalize_text (bool): If True, whitespace and Unicode form are normalized before caching and embedding.
+            cache_name (str): Name used in logs.
+            log_every_number_of_calls (int): Statistics are logged at INFO level after the first call and then after every that many calls
+                (1 logs every call), other calls are logged at DEBUG level.
+        """
+        self.embedder = embedder
+        self.model_name = embedder.model_name
+        self.memory_cache = LruCache(max_size=max_number_of_items) if max_number_of_items > 0 else None
+        self.persistent_cache = persistent_cache
+        self.normalize_text = normalize_text
+        self.cache_name = cache_name
+        self.log_every_number_of_calls = log_every_number_of_calls
+
+        self.lock = threading.Lock()
+        self.number_of_calls = 0
+        self.hits = 0
+        self.misses = 0
+        self.embedding_duration = 0.0
+
+    def embed(self, text):
+        """
+        Generate embeddings, reusing cached ones where possible.
+
+        Args:
+            text (str or list of str): Text or texts to embed.
+
+        Returns:
+            numpy.ndarray: One vector for a single text, a matrix with one row per text for a list.
+        """
+        texts = [self.__normalize(item) for item in ([text] if isinstance(text, str) else text)]
+        keys = [hashlib.sha256(item.encode("utf-8")).hexdigest() for item in texts]
+
+        vectors_by_key = {}
+        for key in set(keys):
+            vector = self.memory_cache.get(key) if self.memory_cache is not None else None
+            if vector is not None:
+                vectors_by_key[key] = vector
+
+        if self.persistent_cache is not None:
+            persisted_vectors_by_key = self.persistent_cache.get_many(self.model_name, [key for key in set(keys) if key not in vectors_by_key])
+            self.__put_to_memory_cache(persisted_vectors_by_key)
+            vectors_by_key.update(persisted_vectors_by_key)
+
+        missed_text_by_key = {}
+        for key, item in zip(keys, texts):
+            if key not in vectors_by_key:
+                missed_text_by_key[key] = item
+
+        if missed_text_by_key:
+            embedded_vectors_by_key = self.__embed_missed_texts(missed_text_by_key, single_text=isinstance(text, str))
+            self.__put_to_memory_cache(embedded_vectors_by_key)
+            if self.persistent_cache is not None:
+                self.persistent_cache.put_many(self.model_name, embedded_vectors_by_key)
+            vectors_by_key.update(embedded_vectors_by_key)
+
+        number_of_hits = len(texts) - len(missed_text_by_key)
+        with self.lock:
+            self.hits += number_of_hits
+            self.misses += len(missed_text_by_key)
+            self.number_of_calls += 1
+            # Statistics are logged periodically, so calls with only misses are reported too, but search queries do not flood the log
+            is_logged_call = (self.number_of_calls - 1) % self.log_every_number_of_calls == 0
+
+        if len(texts) > 0:
+            statistics = self.get_statistics()
+            logging.log(logging.INFO if is_logged_call else logging.DEBUG,
+                        f"{self.cache_name} cache: {number_of_hits} of {len(texts)} texts served from cache, "
+                        f"hit rate {statistics['hitRate']:.1%} in {self.number_of_calls} calls, saved about {statistics['savedEmbeddingSeconds']:.3f} seconds of embedding in total")
+
+        if isinstance(text, str):
+            return vectors_by_key[keys[0]]
+
+        if len(keys) == 0:
+            return np.zeros((0, self.get_number_of_dimensions()), dtype=np.float32)
+
+        return np.array([vectors_by_key[key] for key in keys], dtype=np.float32).reshape(len(keys), -1)
+
+    def get_number_of_dimensions(self):
+        return self.embedder.get_number_of_dimensions()
+
+    def get_statistics(self):
+        with self.lock:
+            number_of_requests = self.hits + self.misses
+            average_embedding_seconds = self.embedding_duration / self.misses if self.misses > 0 else 0.0
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / number_of_requests if number_of_requests > 0 else 0.0,
+                "embeddingSeconds": self.embedding_duration,
+                "savedEmbeddingSeconds": self.hits * average_embedding_seconds,
+            }
+
+    def __embed_missed_texts(self, missed_text_by_key, single_text):
+        missed_keys = list(missed_text_by_key.keys())
+
+        start_time = time.time()
+        if single_text:
+            missed_vectors = [self.embedder.embed(missed_text_by_key[missed_keys[0]])]
+        else:
+            missed_vectors = self.embedder.embed([missed_text_by_key[key] for key in missed_keys])
+        duration = time.time() - start_time
+
+        with self.lock:
+            self.embedding_duration += duration
+
+        return { key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missed_keys, missed_vectors) }
+
+    def __put_to_memory_cache(self, vectors_by_key):
+        if self.memory_cache is None:
+            return
+
+        for key, vector in vectors_by_key.items():
+            self.memory_cache.put(key, vector)
+
+    def __normalize(self, text):
+        if not self.normalize_text:
+            return text
+
+        return " ".join(unicodedata.normalize("NFC", text).split())
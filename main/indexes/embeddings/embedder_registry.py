@@ -0,0 +1,26 @@
+import threading
+
+from .sentence_embeder import SentenceEmbedder
+from .ollama_embeder import OllamaEmbedder
+
+embedders = {}
+embedders_lock = threading.Lock()
+
+def get_sentence_embedder(model_name):
+    return __get_or_create_embedder(("sentence", model_name), lambda: SentenceEmbedder(model_name=model_name))
+
+def get_onnx_sentence_embedder(model_name, quantize=False):
+    # Imported here, so the ONNX Runtime dependencies are needed only when ONNX models are used
+    from .onnx_sentence_embeder import OnnxSentenceEmbedder
+
+    return __get_or_create_embedder(("onnx", model_name, quantize), lambda: OnnxSentenceEmbedder(model_name=model_name, quantize=quantize))
+
+def get_ollama_embedder():
+    return __get_or_create_embedder(("ollama", None), lambda: OllamaEmbedder())
+
+def __get_or_create_embedder(key, create_embedder):
+    with embedders_lock:
+        if key not in embedders:
+            embedders[key] = create_embedder()
+
+        return embedders[key]
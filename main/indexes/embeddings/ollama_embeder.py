@@ -1,17 +1,35 @@
 import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+
+RETRIED_STATUS_CODES = [429, 503]
 
 class OllamaEmbedder:
-    def __init__(self, model_name=None):
+    def __init__(self, model_name=None, batch_size=None, max_concurrent_requests=None, max_retries=6, initial_retry_delay=0.5, max_retry_delay=30.0, timeout=300):
         """
         Initialize the OllamaEmbedder with environment variables for configuration.
 
         The following environment variables can be set:
         - OLLAMA_HOST: The host for the Ollama API (default: http://localhost:11434)
         - OLLAMA_MODEL: The embedding model to use (default: nomic-embed-text)
+        - OLLAMA_BATCH_SIZE: Max number of texts sent in one request (default: 64)
+        - OLLAMA_MAX_CONCURRENT_REQUESTS: Max number of requests sent in parallel (default: 4)
 
         Args:
             model_name (str, optional): The model name to override the environment variable.
+            batch_size (int, optional): The batch size to override the environment variable.
+            max_concurrent_requests (int, optional): The max number of parallel requests to override the environment variable.
+            max_retries (int): Max number of retries of a request rejected by an overloaded server (429 or 503 status).
+            initial_retry_delay (float): Delay in seconds before the first retry, it doubles with every next retry.
+            max_retry_delay (float): Max delay in seconds between retries.
+            timeout (float): Timeout of one request in seconds.
         """
         # Get the model name from environment variable or use the provided one or default
         self.model_name = model_name or os.getenv("OLLAMA_MODEL", "nomic-embed-text")
@@ -19,41 +37,85 @@ class OllamaEmbedder:
         # Get the API host from environment variable or use default
         self.api_url = os.getenv("OLLAMA_HOST", "http://localhost:11434") + "/api/embed"
 
+        self.batch_size = batch_size or int(os.getenv("OLLAMA_BATCH_SIZE", "64"))
+        self.max_concurrent_requests = max_concurrent_requests or int(os.getenv("OLLAMA_MAX_CONCURRENT_REQUESTS", "4"))
+        self.max_retries = max_retries
+        self.initial_retry_delay = initial_retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.timeout = timeout
+
+        # One keep-alive connection per concurrent request, so batches do not pay for new TCP connections
+        self.session = requests.Session()
+        self.session.mount(self.api_url, HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrent_requests))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent_requests, thread_name_prefix="ollama-embedder")
+
+        self.lock = threading.Lock()
+        self.number_of_dimensions = None
+
     def embed(self, text):
         """
-        Generate embeddings for the given text using Ollama's API.
+        Generate embeddings for the given text or texts using Ollama's API.
+
+        Texts are split into sub-batches of `batch_size` texts that are sent in parallel
+        (at most `max_concurrent_requests` at a time), vectors are returned in the order of texts.
 
         Args:
-            text (str): The input text to generate embeddings for.
+            text (str or list of str): The input text or texts to generate embeddings for.
 
         Returns:
-            list of float: The embedding vector.
+            numpy.ndarray: One vector for a single text, a matrix with one row per text for a list.
         """
-        response = requests.post(
-            self.api_url,
-            json={
-                "model": self.model_name,
-                "prompt": text
-            }
-        )
+        if isinstance(text, str):
+            return self.__embed_batch([text])[0]
 
-        if response.status_code != 200:
-            raise Exception(f"Error from Ollama API: {response.status_code} - {response.text}")
+        if len(text) == 0:
+            return np.zeros((0, self.get_number_of_dimensions()), dtype=np.float32)
 
-        result = response.json()
-        return result.get("embedding", [])
+        batches = [text[i:i + self.batch_size] for i in range(0, len(text), self.batch_size)]
+        if len(batches) == 1:
+            return self.__embed_batch(batches[0])
+
+        return np.concatenate(list(self.executor.map(self.__embed_batch, batches)))
 
     def get_number_of_dimensions(self):
         """
         Get the number of dimensions for the embeddings.
 
-        For Ollama API, we'll assume a fixed dimensionality based on the model.
-        In a real implementation, this might be dynamically determined.
+        Dimensions depend on the model, so they are taken from the embedding of a probe text
+        on the first call and reused afterwards.
 
         Returns:
             int: The number of dimensions in the embedding vectors.
         """
-        # This is a placeholder. In a real implementation, you might
-        # query the API for the model's dimensionality or have it configured.
-        # For example purposes, we are using 768 dimensions for nomic-embed-text model.
-        return 768
\ No newline at end of file
+        with self.lock:
+            if self.number_of_dimensions is None:
+                self.number_of_dimensions = len(self.__embed_batch(["dimensions probe"])[0])
+
+            return self.number_of_dimensions
+
+    def __embed_batch(self, texts):
+        for attempt in range(0, self.max_retries + 1):
+            response = self.session.post(self.api_url, json={ "model": self.model_name, "input": texts }, timeout=self.timeout)
+
+            if response.status_code in RETRIED_STATUS_CODES and attempt < self.max_retries:
+                delay = self.__get_retry_delay(response, attempt)
+                logging.warning(f"Ollama API is overloaded ({response.status_code}), retrying a batch of {len(texts)} texts in {delay:.1f} seconds")
+                time.sleep(delay)
+                continue
+
+            if response.status_code != 200:
+                raise Exception(f"Error from Ollama API: {response.status_code} - {response.text}")
+
+            embeddings = response.json().get("embeddings", [])
+            if len(embeddings) != len(texts):
+                raise Exception(f"Ollama API returned {len(embeddings)} embeddings for {len(texts)} texts")
+
+            return np.asarray(embeddings, dtype=np.float32)
+
+    def __get_retry_delay(self, response, attempt):
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            return min(float(retry_after), self.max_retry_delay)
+
+        # Jitter spreads retries of parallel requests, so they do not hit the server at the same moment again
+        return min(self.initial_retry_delay * 2 ** attempt, self.max_retry_delay) * random.uniform(0.5, 1.0)
\ No newline at end of file
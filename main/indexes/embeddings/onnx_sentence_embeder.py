@@ -0,0 +1,101 @@
+import os
+import json
+import shutil
+import logging
+import platform
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from .sentence_embeder import SentenceEmbedder
+from .token_budget_batching import DEFAULT_TOKEN_BUDGET
+
+ONNX_MODELS_CACHE_PATH = "./data/caches/onnx_models"
+EXPORT_INFO_FILE_NAME = "export_info.json"
+# Min cosine similarity between ONNX and PyTorch embeddings of the same text
+MIN_COSINE_SIMILARITY = 0.999
+MIN_QUANTIZED_COSINE_SIMILARITY = 0.98
+TOLERANCE_CHECK_TEXTS = [
+    "How to configure the build pipeline for a new service?",
+    "Release notes",
+    "The deployment failed with a timeout while waiting for the database migration to finish, so the release was rolled back and the incident was escalated to the on-call engineer.",
+    "JIRA-1234: Login page returns 500 error after password reset",
+    "Meeting notes: sprint planning, capacity, risks and action items for the next two weeks.",
+    "Архітектура системи та основні компоненти",
+    "def calculate_total(items): return sum(item.price for item in items)",
+    "Onboarding checklist for new team members: accounts, repositories, access to environments, code review rules and on-call rotation.",
+]
+
+class OnnxSentenceEmbedder(SentenceEmbedder):
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", quantize=False, token_budget=DEFAULT_TOKEN_BUDGET):
+        """
+        Initialize the OnnxSentenceEmbedder that runs a sentence-transformers model with ONNX Runtime.
+
+        The model is exported to ONNX (and optionally quantized to int8 with dynamic quantization)
+        on first use and cached locally, so next runs load the exported files directly. Right after
+        the export, embeddings are compared with ones of the PyTorch model and the export is rejected
+        if they differ more than the tolerance.
+
+        Args:
+            model_name (str): Name of the sentence-transformers model.
+            quantize (bool): If True, weights are quantized to int8.
+            token_budget (int): Max number of tokens (including padding) in one embedding batch.
+        """
+        self.base_model_name = model_name
+        self.quantize = quantize
+        # Vectors differ from ones of the PyTorch model, so caches and stored embeddings keep them separately
+        self.model_name = f"{model_name}@onnx-int8" if quantize else f"{model_name}@onnx"
+        self.token_budget = token_budget
+        self.pool = None
+
+        model_path = os.path.join(ONNX_MODELS_CACHE_PATH, self.model_name.replace("/", "__"))
+        if not os.path.exists(os.path.join(model_path, EXPORT_INFO_FILE_NAME)):
+            self.__export_model(model_path)
+
+        export_info = self.__read_export_info(model_path)
+        self.model = SentenceTransformer(model_path, backend="onnx", model_kwargs={ "file_name": export_info["fileName"] })
+
+    def start_pool(self, number_of_workers, number_of_threads_per_worker=None):
+        # ONNX Runtime already runs one inference on all CPU cores, and workers load PyTorch models by name
+        logging.warning(f"Embedding workers are not used for ONNX model {self.model_name}, it embeds in process")
+
+    def __export_model(self, model_path):
+        logging.info(f"Exporting {self.base_model_name} to ONNX{' with int8 quantization' if self.quantize else ''} into {model_path}")
+
+        shutil.rmtree(model_path, ignore_errors=True)
+        model = SentenceTransformer(self.base_model_name, backend="onnx", device="cpu")
+        model.save_pretrained(model_path)
+
+        file_name = "onnx/model.onnx"
+        if self.quantize:
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            quantization_config = "arm64" if platform.machine().lower() in ["arm64", "aarch64"] else "avx2"
+            export_dynamic_quantized_onnx_model(model, quantization_config, model_path, file_suffix="qint8")
+            file_name = "onnx/model_qint8.onnx"
+
+        min_cosine_similarity = self.__check_tolerance(model_path, file_name)
+
+        # Written last, so an interrupted export is started again on the next run
+        with open(os.path.join(model_path, EXPORT_INFO_FILE_NAME), "w", encoding="utf-8") as file:
+            json.dump({ "modelName": self.base_model_name, "fileName": file_name, "minCosineSimilarity": min_cosine_similarity }, file, indent=2)
+
+    def __check_tolerance(self, model_path, file_name):
+        onnx_vectors = SentenceTransformer(model_path, backend="onnx", model_kwargs={ "file_name": file_name }).encode(TOLERANCE_CHECK_TEXTS)
+        torch_vectors = SentenceTransformer(self.base_model_name, device="cpu").encode(TOLERANCE_CHECK_TEXTS)
+
+        cosine_similarities = np.sum(onnx_vectors * torch_vectors, axis=1) / (np.linalg.norm(onnx_vectors, axis=1) * np.linalg.norm(torch_vectors, axis=1))
+        min_cosine_similarity = float(cosine_similarities.min())
+
+        tolerance = MIN_QUANTIZED_COSINE_SIMILARITY if self.quantize else MIN_COSINE_SIMILARITY
+        if min_cosine_similarity < tolerance:
+            shutil.rmtree(model_path, ignore_errors=True)
+            raise ValueError(f"ONNX embeddings of {self.model_name} differ from PyTorch ones: min cosine similarity is {min_cosine_similarity:.4f}, expected at least {tolerance}")
+
+        logging.info(f"ONNX embeddings of {self.model_name} match PyTorch ones: min cosine similarity is {min_cosine_similarity:.4f}")
+
+        return min_cosine_similarity
+
+    def __read_export_info(self, model_path):
+        with open(os.path.join(model_path, EXPORT_INFO_FILE_NAME), "r", encoding="utf-8") as file:
+            return json.load(file)
\ No newline at end of file
@@ -0,0 +1,119 @@
+import os
+import time
+import sqlite3
+import threading
+
+import numpy as np
+
+class PersistentEmbeddingCache:
+    def __init__(self, path, max_size_bytes=1024 * 1024 * 1024):
+        """
+        Initialize the PersistentEmbeddingCache backed by an SQLite file.
+
+        Embeddings are stored as float32 blobs keyed by (model name, key). When the
+        total size of stored embeddings exceeds max_size_bytes, the least recently
+        used embeddings are evicted.
+
+        Args:
+            path (str): Path to the SQLite file, parent folders are created if needed.
+            max_size_bytes (int): Max total size of stored embeddings.
+        """
+        directory_path = os.path.dirname(path)
+        if directory_path and not os.path.exists(directory_path):
+            os.makedirs(directory_path)
+
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS embeddings (
+                                       model TEXT NOT NULL,
+                                       key TEXT NOT NULL,
+                                       vector BLOB NOT NULL,
+                                       last_used REAL NOT NULL,
+                                       PRIMARY KEY (model, key))""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.connection.commit()
+
+        self.size_bytes = self.connection.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model_name, keys):
+        """
+        Read stored embeddings and mark them as recently used.
+
+        Args:
+            model_name (str): Name of the model the embeddings were produced by.
+            keys (list of str): Keys to look up.
+
+        Returns:
+            dict: Key to float32 vector for every key that is stored.
+        """
+        if len(keys) == 0:
+            return {}
+
+        found_vectors = {}
+        with self.lock:
+            for keys_batch in self.__batch_items(keys, 500):
+                rows = self.connection.execute(f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({','.join('?' * len(keys_batch))})",
+                                               [model_name, *keys_batch]).fetchall()
+                for key, vector in rows:
+                    found_vectors[key] = np.frombuffer(vector, dtype=np.float32)
+
+            if found_vectors:
+                now = time.time()
+                self.connection.executemany("UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                                            [(now, model_name, key) for key in found_vectors])
+                self.connection.commit()
+
+        return found_vectors
+
+    def put_many(self, model_name, vectors_by_key):
+        """
+        Store embeddings and evict the least recently used ones if the size limit is exceeded.
+
+        Args:
+            model_name (str): Name of the model the embeddings were produced by.
+            vectors_by_key (dict): Key to vector.
+        """
+        if len(vectors_by_key) == 0:
+            return
+
+        now = time.time()
+        rows = [(model_name, key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in vectors_by_key.items()]
+
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO embeddings (model, key, vector, last_used) VALUES (?, ?, ?, ?)", rows)
+            self.connection.commit()
+
+            self.size_bytes += sum(len(row[2]) for row in rows)
+            if self.size_bytes > self.max_size_bytes:
+                self.__evict_least_recently_used()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def __evict_least_recently_used(self):
+        self.size_bytes = self.connection.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        target_size_bytes = int(self.max_size_bytes * 0.9)
+
+        while self.size_bytes > target_size_bytes:
+            rows = self.connection.execute("SELECT model, key, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 1000").fetchall()
+            if not rows:
+                break
+
+            rows_to_evict = []
+            for model, key, vector_size in rows:
+                rows_to_evict.append((model, key))
+                self.size_bytes -= vector_size
+                if self.size_bytes <= target_size_bytes:
+                    break
+
+            self.connection.executemany("DELETE FROM embeddings WHERE model = ? AND key = ?", rows_to_evict)
+
+        self.connection.commit()
+
+    def __batch_items(self, items, batch_size):
+        return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
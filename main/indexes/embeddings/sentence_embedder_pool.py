@@ -0,0 +1,119 @@
+import os
+import queue
+import atexit
+import logging
+import multiprocessing
+
+import numpy as np
+
+from .token_budget_batching import encode_with_token_budget, merge_statistics, DEFAULT_TOKEN_BUDGET
+
+class SentenceEmbedderPool:
+    def __init__(self, model_name, number_of_workers, number_of_threads_per_worker=None, chunk_size=256, token_budget=DEFAULT_TOKEN_BUDGET):
+        self.model_name = model_name
+        self.number_of_workers = number_of_workers
+        # Each worker gets its share of cores, so workers do not oversubscribe CPU with PyTorch intra-op threads
+        self.number_of_threads_per_worker = number_of_threads_per_worker or max(1, (os.cpu_count() or 1) // number_of_workers)
+        self.chunk_size = chunk_size
+        self.token_budget = token_budget
+
+        self.workers = []
+        self.input_queue = None
+        self.output_queue = None
+        # Tasks and results carry the number of the call, results left by a call that failed are never taken by the next one
+        self.call_number = 0
+
+    def embed(self, texts):
+        self.__start_workers_if_needed()
+
+        # Chunks of texts with similar lengths let workers form token budget batches with little padding
+        sorted_positions = np.argsort([-len(text) for text in texts], kind="stable")
+        chunks = [sorted_positions[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        self.call_number += 1
+        for chunk_number, chunk_positions in enumerate(chunks):
+            self.input_queue.put((self.call_number, chunk_number, [texts[position] for position in chunk_positions], self.token_budget))
+
+        # Results of all chunks are taken even after an error, so none of them is left in the queue
+        vectors = None
+        statistics_list = []
+        first_error = None
+        number_of_results = 0
+        while number_of_results < len(chunks):
+            call_number, chunk_number, chunk_vectors, chunk_statistics, error = self.__get_worker_result()
+            if call_number != self.call_number:
+                continue
+
+            number_of_results += 1
+            if error is not None:
+                first_error = first_error or error
+                continue
+
+            if vectors is None:
+                vectors = np.zeros((len(texts), chunk_vectors.shape[1]), dtype=np.float32)
+            vectors[chunks[chunk_number]] = chunk_vectors
+            statistics_list.append(chunk_statistics)
+
+        if first_error is not None:
+            raise RuntimeError(f"Embedding worker for {self.model_name} failed: {first_error}")
+
+        return vectors, merge_statistics(statistics_list)
+
+    def close(self):
+        for _ in self.workers:
+            self.input_queue.put(None)
+
+        for worker in self.workers:
+            worker.join()
+
+        self.workers = []
+
+    def __start_workers_if_needed(self):
+        if self.workers:
+            return
+
+        # Spawned workers do not inherit PyTorch state (and its thread pools) of the parent process
+        context = multiprocessing.get_context("spawn")
+        self.input_queue = context.Queue()
+        self.output_queue = context.Queue()
+
+        logging.info(f"Starting {self.number_of_workers} embedding workers for {self.model_name} with {self.number_of_threads_per_worker} threads each")
+
+        # Spawned processes import the parent's main script again, so scripts that embed with workers
+        # keep their code under `if __name__ == "__main__"` (as the collection create and update adapters do)
+        for _ in range(0, self.number_of_workers):
+            worker = context.Process(target=run_embedding_worker,
+                                     args=(self.model_name, self.number_of_threads_per_worker, self.input_queue, self.output_queue),
+                                     daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+        atexit.register(self.close)
+
+    def __get_worker_result(self):
+        while True:
+            try:
+                return self.output_queue.get(timeout=5)
+            except queue.Empty:
+                # A worker killed by the OS (e.g. out of memory) never returns its chunk, so waiting further is pointless
+                if not all(worker.is_alive() for worker in self.workers):
+                    raise RuntimeError(f"Embedding worker for {self.model_name} exited unexpectedly")
+
+
+def run_embedding_worker(model_name, number_of_threads, input_queue, output_queue):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(number_of_threads)
+    model = SentenceTransformer(model_name, device="cpu")
+
+    while True:
+        task = input_queue.get()
+        if task is None:
+            return
+
+        call_number, chunk_number, texts, token_budget = task
+        try:
+            vectors, statistics = encode_with_token_budget(model, texts, token_budget)
+            output_queue.put((call_number, chunk_number, vectors, statistics, None))
+        except Exception as error:
+            output_queue.put((call_number, chunk_number, None, None, repr(error)))
\ No newline at end of file
@@ -1,12 +1,47 @@
+import time
+import logging
+
 from sentence_transformers import SentenceTransformer
 
+from .sentence_embedder_pool import SentenceEmbedderPool
+from .token_budget_batching import encode_with_token_budget, DEFAULT_TOKEN_BUDGET
+
+# Throughput is logged only for indexing sized calls, not for search queries
+MIN_NUMBER_OF_TEXTS_TO_LOG = 1000
+
 class SentenceEmbedder:
-    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", token_budget=DEFAULT_TOKEN_BUDGET):
         self.model_name = model_name
         self.model = SentenceTransformer(model_name)
+        self.token_budget = token_budget
+        self.pool = None
 
     def embed(self, text):
-        return self.model.encode(text)
+        if isinstance(text, str):
+            return self.model.encode(text)
+
+        start_time = time.time()
+        # Small batches (e.g. search queries) are faster in process than a round trip to workers
+        if self.pool is not None and len(text) > self.pool.chunk_size:
+            vectors, statistics = self.pool.embed(text)
+        else:
+            vectors, statistics = encode_with_token_budget(self.model, text, self.token_budget)
+
+        if len(text) >= MIN_NUMBER_OF_TEXTS_TO_LOG:
+            self.__log_throughput(statistics, time.time() - start_time)
+
+        return vectors
     
     def get_number_of_dimensions(self):
         return self.model.get_sentence_embedding_dimension()
+
+    def start_pool(self, number_of_workers, number_of_threads_per_worker=None):
+        if self.pool is None:
+            self.pool = SentenceEmbedderPool(self.model_name, number_of_workers, number_of_threads_per_worker, token_budget=self.token_budget)
+
+    def __log_throughput(self, statistics, duration):
+        # Only measured numbers are logged, sentence_embedder_benchmark_cmd_adapter.py measures throughput of fixed size batches for comparison
+        number_of_tokens = max(1, statistics["numberOfTokens"])
+        logging.info(f"Embedded {statistics['numberOfTexts']} texts with {self.model_name} in {duration:.1f} seconds: "
+                     f"{statistics['numberOfTexts'] / max(duration, 1e-9):.1f} texts/s, {statistics['numberOfTokens'] / max(duration, 1e-9):.0f} tokens/s, "
+                     f"padding overhead {statistics['numberOfPaddedTokens'] / number_of_tokens - 1:.1%}")
\ No newline at end of file
@@ -0,0 +1,61 @@
+import numpy as np
+
+DEFAULT_TOKEN_BUDGET = 16_384
+MAX_BATCH_SIZE = 1024
+
+def encode_with_token_budget(model, texts, token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Encode texts in batches formed by a budget of padded tokens instead of a fixed number of texts.
+
+    Texts are sorted by token length, so a batch of short texts (e.g. title chunks) is large
+    and a batch of long texts is small, and little compute is spent on padding. Vectors are
+    returned in the original order of texts.
+
+    Args:
+        model (SentenceTransformer): Model to encode texts with.
+        texts (list of str): Texts to encode.
+        token_budget (int): Max number of tokens (including padding) in one batch.
+
+    Returns:
+        tuple: (vectors, statistics) where statistics has numbers of texts, tokens and padded tokens.
+    """
+    if len(texts) == 0:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32), create_empty_statistics()
+
+    token_lengths = np.array([len(input_ids) for input_ids in model.tokenizer(texts,
+                                                                             truncation=True,
+                                                                             max_length=model.max_seq_length)["input_ids"]])
+    sorted_positions = np.argsort(-token_lengths, kind="stable")
+
+    vectors = None
+    number_of_padded_tokens = 0
+    batch_start = 0
+    while batch_start < len(sorted_positions):
+        # Texts are sorted from the longest, so the first text of a batch defines the padded length of all its texts
+        batch_size = max(1, min(MAX_BATCH_SIZE, token_budget // max(1, int(token_lengths[sorted_positions[batch_start]]))))
+        batch_positions = sorted_positions[batch_start:batch_start + batch_size]
+
+        batch_vectors = np.asarray(model.encode([texts[position] for position in batch_positions], batch_size=len(batch_positions)), dtype=np.float32)
+        if vectors is None:
+            vectors = np.zeros((len(texts), batch_vectors.shape[1]), dtype=np.float32)
+        vectors[batch_positions] = batch_vectors
+
+        number_of_padded_tokens += int(token_lengths[batch_positions[0]]) * len(batch_positions)
+        batch_start += len(batch_positions)
+
+    return vectors, {
+        "numberOfTexts": len(texts),
+        "numberOfTokens": int(token_lengths.sum()),
+        "numberOfPaddedTokens": number_of_padded_tokens,
+    }
+
+def create_empty_statistics():
+    return { "numberOfTexts": 0, "numberOfTokens": 0, "numberOfPaddedTokens": 0 }
+
+def merge_statistics(statistics_list):
+    merged_statistics = create_empty_statistics()
+    for statistics in statistics_list:
+        for key in merged_statistics:
+            merged_statistics[key] += statistics[key]
+
+    return merged_statistics
\ No newline at end of file
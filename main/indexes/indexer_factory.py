@@ -1,40 +1,45 @@
-from .indexers.faiss_indexer import FaissIndexer
+from .indexers.faiss_indexer import FaissIndexer, INDEX_TYPES as FAISS_INDEX_TYPES
 from .indexers.qdrant_indexer import QdrantIndexer
-from .embeddings.sentence_embeder import SentenceEmbedder
-from .embeddings.ollama_embeder import OllamaEmbedder
+from .indexers.bm25_indexer import Bm25Indexer
+from .embeddings.embedder_registry import get_sentence_embedder, get_onnx_sentence_embedder, get_ollama_embedder
+
+FAISS_INDEXER_PREFIX = "indexer_FAISS_"
+SENTENCE_EMBEDDER_MODELS = {
+    "all-MiniLM-L6-v2": "sentence-transformers/all-MiniLM-L6-v2",
+    "all-mpnet-base-v2": "sentence-transformers/all-mpnet-base-v2",
+    "multi-qa-distilbert-cos-v1": "sentence-transformers/multi-qa-distilbert-cos-v1",
+}
+ONNX_EMBEDDER_SUFFIX = "-onnx"
+QUANTIZED_ONNX_EMBEDDER_SUFFIX = "-onnx-int8"
 
 def create_indexer(indexer_name):
-    # Handle Ollama embeddings for FAISS indexers
-    if indexer_name == "indexer_FAISS_IndexFlatL2__embeddings_ollama":
-        return FaissIndexer(indexer_name, OllamaEmbedder())
+    if indexer_name == "indexer_BM25":
+        return Bm25Indexer(indexer_name)
+
+    if indexer_name.startswith(FAISS_INDEXER_PREFIX):
+        index_type, embedder = __parse_faiss_indexer_name(indexer_name)
+        return FaissIndexer(indexer_name, embedder, index_type=index_type)
 
     # Handle Ollama embeddings for Qdrant indexers
     if indexer_name == "indexer_Qdrant__embeddings_ollama":
-        return QdrantIndexer(indexer_name, OllamaEmbedder())
-
-    # Existing FAISS indexer options
-    if indexer_name == "indexer_FAISS_IndexFlatL2__embeddings_all-MiniLM-L6-v2":
-        return FaissIndexer(indexer_name, SentenceEmbedder(model_name="sentence-transformers/all-MiniLM-L6-v2"))
-
-    if indexer_name == "indexer_FAISS_IndexFlatL2__embeddings_all-mpnet-base-v2":
-        return FaissIndexer(indexer_name, SentenceEmbedder(model_name="sentence-transformers/all-mpnet-base-v2"))
-
-    if indexer_name == "indexer_FAISS_IndexFlatL2__embeddings_multi-qa-distilbert-cos-v1":
-        return FaissIndexer(indexer_name, SentenceEmbedder(model_name="sentence-transformers/multi-qa-distilbert-cos-v1"))
+        return QdrantIndexer(indexer_name, get_ollama_embedder())
 
     # Existing Qdrant indexer options
     if indexer_name == "indexer_Qdrant__embeddings_all-MiniLM-L6-v2":
-        return QdrantIndexer(indexer_name, SentenceEmbedder(model_name="sentence-transformers/all-MiniLM-L6-v2"))
+        return QdrantIndexer(indexer_name, get_sentence_embedder("sentence-transformers/all-MiniLM-L6-v2"))
 
     if indexer_name == "indexer_Qdrant__embeddings_all-mpnet-base-v2":
-        return QdrantIndexer(indexer_name, SentenceEmbedder(model_name="sentence-transformers/all-mpnet-base-v2"))
+        return QdrantIndexer(indexer_name, get_sentence_embedder("sentence-transformers/all-mpnet-base-v2"))
 
     if indexer_name == "indexer_Qdrant__embeddings_multi-qa-distilbert-cos-v1":
-        return QdrantIndexer(indexer_name, SentenceEmbedder(model_name="sentence-transformers/multi-qa-distilbert-cos-v1"))
+        return QdrantIndexer(indexer_name, get_sentence_embedder("sentence-transformers/multi-qa-distilbert-cos-v1"))
 
     raise ValueError(f"Unknown indexer name: {indexer_name}")
 
-def load_indexer(indexer_name, collection_name, persister):
+def load_indexer(indexer_name, collection_name, persister, mmap=False):
+    if indexer_name == "indexer_BM25":
+        return Bm25Indexer(indexer_name, persister.read_bin_file(f"{collection_name}/indexes/{indexer_name}/indexer"))
+
     # Check if it's a Qdrant indexer
     if indexer_name.startswith("indexer_Qdrant__"):
         # For Qdrant, we need to check if it's a disk-based or Qdrant-based persistence
@@ -52,10 +57,10 @@ def load_indexer(indexer_name, collection_name, persister):
                 embedder_model = "sentence-transformers/multi-qa-distilbert-cos-v1"
             elif "ollama" in indexer_name:
                 # Handle Ollama embeddings
-                return QdrantIndexer(indexer_name, OllamaEmbedder())
+                return QdrantIndexer(indexer_name, get_ollama_embedder())
 
             if embedder_model:
-                indexer = QdrantIndexer(indexer_name, SentenceEmbedder(model_name=embedder_model))
+                indexer = QdrantIndexer(indexer_name, get_sentence_embedder(embedder_model))
                 # Manually set the vectors in the indexer (simulated loading)
                 # Note: In a real implementation, you would need to handle vector loading appropriately
                 return indexer
@@ -64,22 +69,27 @@ def load_indexer(indexer_name, collection_name, persister):
         # This is just a placeholder - in a real implementation, you would need to handle
         # loading from disk appropriately for Qdrant indexers
 
-    # Handle FAISS indexers
-    if indexer_name == "indexer_FAISS_IndexFlatL2__embeddings_all-MiniLM-L6-v2":
-        serialized_index = persister.read_bin_file(f"{collection_name}/indexes/{indexer_name}/indexer")
-        return FaissIndexer(indexer_name, SentenceEmbedder(model_name="sentence-transformers/all-MiniLM-L6-v2"), serialized_index)
+    # Handle FAISS indexers, e.g. indexer_FAISS_HNSW__embeddings_all-MiniLM-L6-v2
+    if indexer_name.startswith(FAISS_INDEXER_PREFIX):
+        index_type, embedder = __parse_faiss_indexer_name(indexer_name)
+        return FaissIndexer.load(indexer_name, embedder, persister, f"{collection_name}/indexes/{indexer_name}", index_type=index_type, mmap=mmap)
+
+    raise ValueError(f"Unknown indexer name: {indexer_name}")
+
+def __parse_faiss_indexer_name(indexer_name):
+    index_type, separator, embedder_name = indexer_name[len(FAISS_INDEXER_PREFIX):].partition("__embeddings_")
+    if not separator or index_type not in FAISS_INDEX_TYPES:
+        raise ValueError(f"Unknown indexer name: {indexer_name}")
 
-    if indexer_name == "indexer_FAISS_IndexFlatL2__embeddings_all-mpnet-base-v2":
-        serialized_index = persister.read_bin_file(f"{collection_name}/indexes/{indexer_name}/indexer")
-        return FaissIndexer(indexer_name, SentenceEmbedder(model_name="sentence-transformers/all-mpnet-base-v2"), serialized_index)
+    if embedder_name == "ollama":
+        return index_type, get_ollama_embedder()
 
-    if indexer_name == "indexer_FAISS_IndexFlatL2__embeddings_multi-qa-distilbert-cos-v1":
-        serialized_index = persister.read_bin_file(f"{collection_name}/indexes/{indexer_name}/indexer")
-        return FaissIndexer(indexer_name, SentenceEmbedder(model_name="sentence-transformers/multi-qa-distilbert-cos-v1"), serialized_index)
+    if embedder_name in SENTENCE_EMBEDDER_MODELS:
+        return index_type, get_sentence_embedder(SENTENCE_EMBEDDER_MODELS[embedder_name])
 
-    # Handle FAISS indexers with Ollama embeddings
-    if indexer_name == "indexer_FAISS_IndexFlatL2__embeddings_ollama":
-        serialized_index = persister.read_bin_file(f"{collection_name}/indexes/{indexer_name}/indexer")
-        return FaissIndexer(indexer_name, OllamaEmbedder(), serialized_index)
+    # The same models run with ONNX Runtime, e.g. indexer_FAISS_IndexFlatL2__embeddings_all-MiniLM-L6-v2-onnx-int8
+    for suffix, quantize in [(QUANTIZED_ONNX_EMBEDDER_SUFFIX, True), (ONNX_EMBEDDER_SUFFIX, False)]:
+        if embedder_name.endswith(suffix) and embedder_name[:-len(suffix)] in SENTENCE_EMBEDDER_MODELS:
+            return index_type, get_onnx_sentence_embedder(SENTENCE_EMBEDDER_MODELS[embedder_name[:-len(suffix)]], quantize=quantize)
 
     raise ValueError(f"Unknown indexer name: {indexer_name}")
@@ -0,0 +1,264 @@
+import re
+import math
+from array import array
+from collections import Counter
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[-.:/#]\w+)*")
+COMPOUND_TOKEN_SEPARATOR_PATTERN = re.compile(r"[-.:/#]")
+NO_DOCUMENT_LENGTH = -1
+
+class Bm25Indexer:
+    """
+    Bm25Indexer class for lexical search with the Okapi BM25 ranking function.
+
+    This class implements the same interface as the FAISS indexer but ranks chunks
+    by exact term matches, so identifiers like Jira keys (PROJ-1234), error codes
+    and class names are found reliably. It does not use an embedding model.
+
+    Postings are kept as compact NumPy arrays (one concatenated array of item ids
+    and one of term frequencies, plus per-term offsets). Postings added after
+    loading are kept in small per-term arrays and merged on serialization; removed
+    items are filtered out during search and dropped on serialization.
+    """
+
+    def __init__(self, name, serialized_index=None, k1=1.2, b=0.75):
+        """
+        Initialize the Bm25Indexer.
+
+        Args:
+            name (str): Name of the indexer.
+            serialized_index (dict, optional): Result of serialize() to load the index from.
+            k1 (float): BM25 term frequency saturation parameter.
+            b (float): BM25 document length normalization parameter.
+        """
+        self.name = name
+        self.embedder = None
+
+        if serialized_index is not None:
+            self.k1 = serialized_index["k1"]
+            self.b = serialized_index["b"]
+            self.term_offsets = { term: (serialized_index["postingOffsets"][position], serialized_index["postingOffsets"][position + 1])
+                                  for position, term in enumerate(serialized_index["terms"]) }
+            self.posting_ids = serialized_index["postingIds"]
+            self.posting_frequencies = serialized_index["postingFrequencies"]
+            self.document_lengths = serialized_index["documentLengths"]
+        else:
+            self.k1 = k1
+            self.b = b
+            self.term_offsets = {}
+            self.posting_ids = np.zeros(0, dtype=np.int64)
+            self.posting_frequencies = np.zeros(0, dtype=np.int32)
+            self.document_lengths = np.zeros(0, dtype=np.int32)
+
+        self.added_postings = {}
+        self.number_of_documents = int(np.count_nonzero(self.document_lengths != NO_DOCUMENT_LENGTH))
+        self.total_length = int(self.document_lengths[self.document_lengths != NO_DOCUMENT_LENGTH].sum())
+
+    def get_name(self):
+        """Get the name of the indexer."""
+        return self.name
+
+    def index_texts(self, ids, texts):
+        """
+        Add texts to the inverted index.
+
+        Args:
+            ids (list): List of IDs for the texts.
+            texts (list): List of texts to be indexed.
+        """
+        if len(ids) == 0:
+            return
+
+        self.__make_sure_document_lengths_capacity(int(max(ids)) + 1)
+
+        for id_, text in zip(ids, texts):
+            tokens = tokenize(text)
+
+            self.document_lengths[id_] = len(tokens)
+            self.number_of_documents += 1
+            self.total_length += len(tokens)
+
+            for term, frequency in Counter(tokens).items():
+                if term not in self.added_postings:
+                    self.added_postings[term] = (array('q'), array('i'))
+                self.added_postings[term][0].append(int(id_))
+                self.added_postings[term][1].append(frequency)
+
+    def remove_ids(self, ids):
+        """
+        Remove texts by their IDs from the index.
+
+        Args:
+            ids (list): List of IDs to be removed.
+        """
+        for id_ in ids:
+            if id_ < len(self.document_lengths) and self.document_lengths[id_] != NO_DOCUMENT_LENGTH:
+                self.number_of_documents -= 1
+                self.total_length -= int(self.document_lengths[id_])
+                self.document_lengths[id_] = NO_DOCUMENT_LENGTH
+
+    def serialize(self):
+        """
+        Serialize the index into a dict of compact NumPy arrays.
+
+        Postings of removed items are dropped.
+        """
+        terms = []
+        posting_offsets = [0]
+        posting_ids = []
+        posting_frequencies = []
+
+        for term in set(self.term_offsets.keys()) | set(self.added_postings.keys()):
+            term_posting_ids, term_posting_frequencies = self.__get_postings(term)
+            if len(term_posting_ids) == 0:
+                continue
+
+            terms.append(term)
+            posting_ids.append(term_posting_ids)
+            posting_frequencies.append(term_posting_frequencies)
+            posting_offsets.append(posting_offsets[-1] + len(term_posting_ids))
+
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "terms": terms,
+            "postingOffsets": np.array(posting_offsets, dtype=np.int64),
+            "postingIds": np.concatenate(posting_ids) if posting_ids else np.zeros(0, dtype=np.int64),
+            "postingFrequencies": np.concatenate(posting_frequencies) if posting_frequencies else np.zeros(0, dtype=np.int32),
+            "documentLengths": self.document_lengths,
+        }
+
+    def save(self, persister, base_path):
+        """
+        Save the serialized index into the "indexer" file of the base path.
+
+        Args:
+            persister: Persister to write the file with.
+            base_path (str): Folder of the indexer inside the collection.
+        """
+        persister.save_bin_file(self.serialize(), f"{base_path}/indexer")
+
+    def search(self, text, number_of_results=10):
+        """
+        Search for chunks that best match the terms of the text.
+
+        Args:
+            text (str): Text query.
+            number_of_results (int): Number of top results to return.
+
+        Returns:
+            tuple: (scores, ids) arrays with one row, higher scores are better.
+        """
+        if self.number_of_documents == 0:
+            return np.zeros((1, 0), dtype=np.float32), np.zeros((1, 0), dtype=np.int64)
+
+        average_document_length = self.total_length / self.number_of_documents
+
+        matched_ids = []
+        matched_scores = []
+        for term in set(tokenize(text)):
+            term_posting_ids, term_posting_frequencies = self.__get_postings(term)
+            if len(term_posting_ids) == 0:
+                continue
+
+            inverse_document_frequency = math.log(1 + (self.number_of_documents - len(term_posting_ids) + 0.5) / (len(term_posting_ids) + 0.5))
+            frequencies = term_posting_frequencies.astype(np.float32)
+            document_lengths = self.document_lengths[term_posting_ids].astype(np.float32)
+
+            matched_ids.append(term_posting_ids)
+            matched_scores.append(inverse_document_frequency * frequencies * (self.k1 + 1) /
+                                  (frequencies + self.k1 * (1 - self.b + self.b * document_lengths / average_document_length)))
+
+        if not matched_ids:
+            return np.zeros((1, 0), dtype=np.float32), np.zeros((1, 0), dtype=np.int64)
+
+        unique_ids, positions = np.unique(np.concatenate(matched_ids), return_inverse=True)
+        scores = np.bincount(positions, weights=np.concatenate(matched_scores)).astype(np.float32)
+
+        number_of_results = min(number_of_results, len(unique_ids))
+        top_positions = np.argpartition(-scores, number_of_results - 1)[:number_of_results]
+        top_positions = top_positions[np.argsort(-scores[top_positions], kind="stable")]
+
+        return np.expand_dims(scores[top_positions], axis=0), np.expand_dims(unique_ids[top_positions], axis=0)
+
+    def search_many(self, texts, number_of_results=10):
+        """
+        Search for several text queries.
+
+        Returns:
+            tuple: (scores, ids) lists with one array of scores and one array of IDs per text.
+        """
+        results = [self.search(text, number_of_results) for text in texts]
+
+        return [scores[0] for scores, _ in results], [ids[0] for _, ids in results]
+
+    def search_by_vectors(self, vectors, number_of_results=10):
+        raise ValueError(f"Indexer {self.name} is lexical and can not search by vectors")
+
+    def has_pending_vectors(self):
+        """Texts are indexed right away, nothing waits for training."""
+        return False
+
+    def compact(self):
+        """Postings of removed texts are dropped on every save, so there is nothing to compact."""
+        return 0
+
+    def get_build_report(self):
+        """Inverted index needs no training or tuning, so there is no build report."""
+        return None
+
+    def get_size(self):
+        """
+        Get the number of indexed texts.
+
+        Returns:
+            int: Number of indexed texts.
+        """
+        return self.number_of_documents
+
+    def __get_postings(self, term):
+        term_posting_ids = []
+        term_posting_frequencies = []
+
+        if term in self.term_offsets:
+            start, end = self.term_offsets[term]
+            term_posting_ids.append(self.posting_ids[start:end])
+            term_posting_frequencies.append(self.posting_frequencies[start:end])
+
+        if term in self.added_postings:
+            term_posting_ids.append(np.frombuffer(self.added_postings[term][0], dtype=np.int64))
+            term_posting_frequencies.append(np.frombuffer(self.added_postings[term][1], dtype=np.int32))
+
+        if not term_posting_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+
+        term_posting_ids = np.concatenate(term_posting_ids)
+        term_posting_frequencies = np.concatenate(term_posting_frequencies)
+        live_postings = self.document_lengths[term_posting_ids] != NO_DOCUMENT_LENGTH
+
+        return term_posting_ids[live_postings], term_posting_frequencies[live_postings]
+
+    def __make_sure_document_lengths_capacity(self, capacity):
+        if capacity <= len(self.document_lengths):
+            return
+
+        new_capacity = max(capacity, 2 * len(self.document_lengths))
+        document_lengths = np.full(new_capacity, NO_DOCUMENT_LENGTH, dtype=np.int32)
+        document_lengths[:len(self.document_lengths)] = self.document_lengths
+        self.document_lengths = document_lengths
+
+
+def tokenize(text):
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group(0)
+        tokens.append(token)
+
+        # Compound tokens like "proj-1234" or "java.lang.string" are also indexed by their parts
+        token_parts = COMPOUND_TOKEN_SEPARATOR_PATTERN.split(token)
+        if len(token_parts) > 1:
+            tokens.extend(token_parts)
+
+    return tokens
@@ -1,30 +1,466 @@
+import math
+import time
+import logging
+
 import faiss
 import numpy as np
 
+FLAT_INDEX_TYPE = "IndexFlatL2"
+IVF_INDEX_TYPES = ["IVFFlat", "IVFPQ"]
+# Quantized indexes keep compressed codes instead of float32 vectors, "PQRefine" re-ranks PQ candidates by an SQ8 copy
+QUANTIZED_INDEX_TYPES = ["SQfp16", "SQ8", "PQ", "PQRefine"]
+TRAINED_INDEX_TYPES = [*IVF_INDEX_TYPES, "SQ8", "PQ", "PQRefine"]
+REBUILT_ON_REMOVAL_INDEX_TYPES = ["HNSW", "PQRefine"]
+# FAISS can skip removed ids during search by an IDSelector for these index types, PQ ones do not support selectors
+TOMBSTONED_INDEX_TYPES = [FLAT_INDEX_TYPE, *IVF_INDEX_TYPES, "HNSW", "SQfp16", "SQ8"]
+INDEX_TYPES = [FLAT_INDEX_TYPE, *IVF_INDEX_TYPES, "HNSW", *QUANTIZED_INDEX_TYPES]
+
+DEFAULT_REFINE_FACTOR = 4
+
+MAX_NUMBER_OF_TRAINING_VECTORS = 200_000
+# Trained indexes collect this many vectors from indexing batches before training, so small batches still train them well
+MIN_NUMBER_OF_TRAINING_VECTORS = 100_000
+NUMBER_OF_EVALUATION_QUERIES = 100
+EVALUATION_NUMBER_OF_RESULTS = 10
+
+# Removed vectors are physically deleted only when this share of the index is removed, since deletion rewrites the index
+DEFAULT_COMPACTION_THRESHOLD = 0.2
+
+INDEX_FILE_NAME = "indexer.faiss"
+TOMBSTONES_FILE_NAME = "tombstones.npy"
+LEGACY_INDEX_FILE_NAME = "indexer"
+
 
 class FaissIndexer:
-    def __init__(self, name, embedder, serialized_index=None):
+    def __init__(self, name, embedder, serialized_index=None, index_type=FLAT_INDEX_TYPE, faiss_index=None, tombstones=None, compaction_threshold=DEFAULT_COMPACTION_THRESHOLD):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type: {index_type}")
+
         self.name = name
         self.embedder = embedder
-        if serialized_index is not None:
+        self.index_type = index_type
+        self.build_report = None
+        self.pending_vectors = []
+        self.pending_ids = []
+        # Bitmap of removed ids (bit i of byte i // 8), they stay in the index until compaction and are skipped by search
+        self.tombstones = np.zeros(0, dtype=np.uint8) if tombstones is None else np.array(tombstones, dtype=np.uint8)
+        self.number_of_tombstones = int(np.unpackbits(self.tombstones).sum())
+        self.compaction_threshold = compaction_threshold
+        self.tombstone_selector = None
+
+        if faiss_index is not None:
+            self.faiss_index = faiss_index
+        elif serialized_index is not None:
             self.faiss_index = faiss.deserialize_index(serialized_index)
+        elif index_type in TRAINED_INDEX_TYPES:
+            # Number of IVF lists and PQ bits depend on the amount of training vectors, so the index is created on first indexing
+            self.faiss_index = None
         else:
-            self.faiss_index = faiss.IndexIDMap(faiss.IndexFlatL2(embedder.get_number_of_dimensions()))
+            self.faiss_index = self.__create_untrained_index(embedder.get_number_of_dimensions())
+
+    @staticmethod
+    def load(name, embedder, persister, base_path, index_type=FLAT_INDEX_TYPE, mmap=False):
+        index_path = f"{base_path}/{INDEX_FILE_NAME}"
+        if not persister.is_path_exists(index_path):
+            # Collections created before native index files have the serialized index pickled
+            return FaissIndexer(name, embedder, persister.read_bin_file(f"{base_path}/{LEGACY_INDEX_FILE_NAME}"), index_type=index_type)
+
+        # FAISS memory-maps only IVF inverted lists, other index types are read into memory as usual.
+        # Memory-mapped inverted lists are read-only, so indexes that will be updated are loaded without mmap.
+        io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        faiss_index = faiss.read_index(persister.get_full_path(index_path), io_flags)
+
+        tombstones_path = f"{base_path}/{TOMBSTONES_FILE_NAME}"
+        tombstones = persister.read_numpy_file(tombstones_path) if persister.is_path_exists(tombstones_path) else None
+
+        return FaissIndexer(name, embedder, index_type=index_type, faiss_index=faiss_index, tombstones=tombstones)
 
     def get_name(self):
         return self.name
 
     def index_texts(self, ids, texts):
-        self.faiss_index.add_with_ids(self.embedder.embed(texts), ids)
+        self.index_vectors(ids, self.embedder.embed(texts))
+
+    def index_vectors(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+
+        if self.faiss_index is None:
+            self.pending_vectors.append(vectors)
+            self.pending_ids.append(ids)
+            if sum(len(pending_ids) for pending_ids in self.pending_ids) >= MIN_NUMBER_OF_TRAINING_VECTORS:
+                self.__add_pending_vectors()
+            return
+
+        self.__add_vectors(ids, vectors)
 
     def remove_ids(self, ids):
-        self.faiss_index.remove_ids(ids)
+        if len(ids) == 0:
+            return
+
+        if self.index_type in TOMBSTONED_INDEX_TYPES:
+            # Physical removal rewrites the whole index, so removed ids are only marked until compaction
+            self.__add_tombstones(np.asarray(ids, dtype=np.int64))
+            return
+
+        self.__add_pending_vectors()
+        if self.faiss_index is None:
+            return
+
+        self.__remove_ids_from_index(self.faiss_index, np.asarray(ids, dtype=np.int64))
+
+    def compact(self):
+        # Removes tombstoned vectors from the index, returns their number
+        if self.number_of_tombstones == 0:
+            return 0
+
+        self.__add_pending_vectors()
+        number_of_tombstones = self.number_of_tombstones
+        if self.faiss_index is not None:
+            self.__remove_ids_from_index(self.faiss_index, self.__get_tombstoned_ids())
+
+        self.tombstones = np.zeros(0, dtype=np.uint8)
+        self.number_of_tombstones = 0
+        self.tombstone_selector = None
+
+        logging.info(f"Compacted {self.name}: removed {number_of_tombstones} tombstoned vectors")
+
+        return number_of_tombstones
 
     def serialize(self):
-        return faiss.serialize_index(self.faiss_index)
+        faiss_index = self.__get_index_for_saving()
+        if self.number_of_tombstones == 0:
+            return faiss.serialize_index(faiss_index)
+
+        # Serialized index has no place for tombstones, so they are removed from a copy and the index itself is left as it is
+        faiss_index_copy = faiss.deserialize_index(faiss.serialize_index(faiss_index))
+        self.__remove_ids_from_index(faiss_index_copy, self.__get_tombstoned_ids())
+
+        return faiss.serialize_index(faiss_index_copy)
+
+    def save(self, persister, base_path):
+        faiss_index = self.__get_index_for_saving()
+        if self.get_tombstone_ratio() >= self.compaction_threshold:
+            self.compact()
+
+        # Tombstones are written before the index and removed after it, so an interrupted save never brings removed vectors back
+        tombstones_path = f"{base_path}/{TOMBSTONES_FILE_NAME}"
+        if self.number_of_tombstones > 0:
+            persister.save_numpy_file(self.tombstones, tombstones_path)
+        persister.save_file_with_writer(f"{base_path}/{INDEX_FILE_NAME}", lambda path: faiss.write_index(faiss_index, path))
+        if self.number_of_tombstones == 0:
+            persister.remove_file(tombstones_path)
+        persister.remove_file(f"{base_path}/{LEGACY_INDEX_FILE_NAME}")
 
     def search(self, text, number_of_results=10):
-        return self.faiss_index.search(np.expand_dims(self.embedder.embed(text), axis=0), number_of_results)
-    
+        return self.search_by_vectors(np.expand_dims(self.embedder.embed(text), axis=0), number_of_results)
+
+    def search_many(self, texts, number_of_results=10):
+        return self.search_by_vectors(self.embedder.embed(texts), number_of_results)
+
+    def search_by_vectors(self, vectors, number_of_results=10):
+        if self.faiss_index is None:
+            return self.__search_pending_vectors(np.asarray(vectors, dtype=np.float32), number_of_results)
+
+        return self.faiss_index.search(np.asarray(vectors, dtype=np.float32), number_of_results, params=self.__create_search_parameters())
+
+    def set_search_parameters(self, nprobe=None, ef_search=None, refine_factor=None):
+        if nprobe is not None:
+            if self.index_type not in IVF_INDEX_TYPES:
+                raise ValueError(f"'nprobe' is supported only by IVF indexes, but {self.name} is {self.index_type}")
+            self.__set_search_parameter("nprobe", nprobe)
+
+        if ef_search is not None:
+            if self.index_type != "HNSW":
+                raise ValueError(f"'efSearch' is supported only by HNSW indexes, but {self.name} is {self.index_type}")
+            self.__set_search_parameter("efSearch", ef_search)
+
+        if refine_factor is not None:
+            if self.index_type != "PQRefine":
+                raise ValueError(f"'refineFactor' is supported only by PQRefine indexes, but {self.name} is {self.index_type}")
+            self.__set_search_parameter("kFactor", refine_factor)
+
+    def get_build_report(self):
+        return self.build_report
+
+    def has_pending_vectors(self):
+        return len(self.pending_ids) > 0
+
     def get_size(self):
-        return self.faiss_index.ntotal
\ No newline at end of file
+        return ((self.faiss_index.ntotal if self.faiss_index is not None else 0) 
+                + sum(len(pending_ids) for pending_ids in self.pending_ids) 
+                - self.number_of_tombstones)
+
+    def get_tombstone_ratio(self):
+        number_of_vectors = self.get_size() + self.number_of_tombstones
+
+        return self.number_of_tombstones / number_of_vectors if number_of_vectors > 0 else 0.0
+
+    def __add_tombstones(self, ids):
+        number_of_bytes = int(ids.max()) // 8 + 1
+        if number_of_bytes > len(self.tombstones):
+            # Grows in steps, so appending chunks with growing ids does not reallocate the bitmap on every removal
+            tombstones = np.zeros(max(number_of_bytes, 2 * len(self.tombstones)), dtype=np.uint8)
+            tombstones[:len(self.tombstones)] = self.tombstones
+            self.tombstones = tombstones
+        elif not self.tombstones.flags.writeable:
+            self.tombstones = np.array(self.tombstones)
+
+        np.bitwise_or.at(self.tombstones, ids >> 3, np.left_shift(1, ids & 7).astype(np.uint8))
+        self.number_of_tombstones = int(np.unpackbits(self.tombstones).sum())
+        self.tombstone_selector = None
+
+    def __get_tombstoned_ids(self):
+        return np.flatnonzero(np.unpackbits(self.tombstones, bitorder="little")).astype(np.int64)
+
+    def __create_search_parameters(self):
+        if self.number_of_tombstones == 0:
+            return None
+
+        if self.tombstone_selector is None:
+            # The bitmap selector keeps a pointer to the array, so both are kept together
+            tombstoned_ids_selector = faiss.IDSelectorBitmap(len(self.tombstones), faiss.swig_ptr(self.tombstones))
+            self.tombstone_selector = (tombstoned_ids_selector, faiss.IDSelectorNot(tombstoned_ids_selector))
+
+        # Index types check the type of search parameters, and their own parameters would be overridden by defaults otherwise
+        if self.index_type == "HNSW":
+            search_parameters = faiss.SearchParametersHNSW()
+            search_parameters.efSearch = self.__get_search_parameter("efSearch")
+        elif self.index_type in IVF_INDEX_TYPES:
+            search_parameters = faiss.SearchParametersIVF()
+            search_parameters.nprobe = self.__get_search_parameter("nprobe")
+        else:
+            search_parameters = faiss.SearchParameters()
+        search_parameters.sel = self.tombstone_selector[1]
+
+        return search_parameters
+
+    def __search_pending_vectors(self, vectors, number_of_results):
+        # Trained indexes are created once enough vectors are collected (or on save), until then collected vectors are searched exactly,
+        # so searching does not train the index on a small sample
+        pending_index = faiss.IndexIDMap(faiss.IndexFlatL2(vectors.shape[1]))
+        if self.pending_ids:
+            pending_ids = np.concatenate(self.pending_ids)
+            pending_vectors = np.concatenate(self.pending_vectors)
+            is_not_tombstoned = ~np.isin(pending_ids, self.__get_tombstoned_ids())
+            pending_index.add_with_ids(pending_vectors[is_not_tombstoned], pending_ids[is_not_tombstoned])
+
+        return pending_index.search(vectors, number_of_results)
+
+    def __add_pending_vectors(self):
+        if not self.pending_ids:
+            return
+
+        vectors = np.concatenate(self.pending_vectors)
+        ids = np.concatenate(self.pending_ids)
+        self.pending_vectors = []
+        self.pending_ids = []
+
+        self.faiss_index = self.__create_trained_index(vectors)
+        self.__add_vectors(ids, vectors)
+
+    def __add_vectors(self, ids, vectors):
+        is_first_batch = self.faiss_index.ntotal == 0
+        self.faiss_index.add_with_ids(vectors, ids)
+
+        if is_first_batch and self.index_type != FLAT_INDEX_TYPE and len(vectors) > 0:
+            self.build_report = self.__build_report(vectors, ids)
+            logging.info(f"Build report for {self.name}: {self.build_report}")
+
+    def __get_index_for_saving(self):
+        # Collections smaller than the training sample are trained on everything they have
+        self.__add_pending_vectors()
+        if self.faiss_index is None:
+            self.faiss_index = self.__create_untrained_index(self.embedder.get_number_of_dimensions())
+
+        return self.faiss_index
+
+    def __create_untrained_index(self, number_of_dimensions):
+        if self.index_type == "HNSW":
+            hnsw_index = faiss.IndexHNSWFlat(number_of_dimensions, 32)
+            hnsw_index.hnsw.efConstruction = 80
+            hnsw_index.hnsw.efSearch = 64
+            return faiss.IndexIDMap(hnsw_index)
+
+        if self.index_type == "SQfp16":
+            return faiss.IndexIDMap(faiss.index_factory(number_of_dimensions, "SQfp16"))
+
+        # For trained indexes it happens only when nothing was indexed, so an index without training keeps the collection searchable
+        return faiss.IndexIDMap(faiss.IndexFlatL2(number_of_dimensions))
+
+    def __create_trained_index(self, vectors):
+        number_of_vectors, number_of_dimensions = vectors.shape
+
+        number_of_lists = max(1, min(int(4 * math.sqrt(number_of_vectors)), number_of_vectors // 39))
+        number_of_subquantizers = self.__choose_number_of_subquantizers(number_of_dimensions)
+        number_of_bits = max(1, min(8, int(math.log2(max(number_of_vectors, 2)))))
+        index_descriptions = {
+            "IVFFlat": f"IVF{number_of_lists},Flat",
+            "IVFPQ": f"IVF{number_of_lists},PQ{number_of_subquantizers}x{number_of_bits}",
+            "SQ8": "SQ8",
+            "PQ": f"PQ{number_of_subquantizers}x{number_of_bits}",
+            "PQRefine": f"PQ{number_of_subquantizers}x{number_of_bits},Refine(SQ8)",
+        }
+        index_description = index_descriptions[self.index_type]
+
+        faiss_index = faiss.index_factory(number_of_dimensions, index_description)
+
+        training_vectors = vectors
+        if number_of_vectors > MAX_NUMBER_OF_TRAINING_VECTORS:
+            sample_positions = np.random.default_rng(0).choice(number_of_vectors, MAX_NUMBER_OF_TRAINING_VECTORS, replace=False)
+            training_vectors = vectors[sample_positions]
+
+        logging.info(f"Training {index_description} index for {self.name} on {len(training_vectors)} sampled vectors")
+        faiss_index.train(training_vectors)
+
+        if self.index_type in IVF_INDEX_TYPES:
+            faiss.extract_index_ivf(faiss_index).nprobe = min(number_of_lists, 16)
+            return faiss_index
+
+        if self.index_type == "PQRefine":
+            faiss.downcast_index(faiss_index).k_factor = DEFAULT_REFINE_FACTOR
+
+        # IVF indexes store ids in inverted lists, flat code indexes need an id map
+        return faiss.IndexIDMap(faiss_index)
+
+    def __choose_number_of_subquantizers(self, number_of_dimensions):
+        # About 4 dimensions per one-byte code, the number of subquantizers has to divide the dimensionality
+        for number_of_subquantizers in range(max(1, number_of_dimensions // 4), 0, -1):
+            if number_of_dimensions % number_of_subquantizers == 0:
+                return number_of_subquantizers
+
+    def __remove_ids_from_index(self, faiss_index, ids):
+        if self.index_type in REBUILT_ON_REMOVAL_INDEX_TYPES:
+            self.__remove_ids_by_rebuilding(faiss_index, ids)
+            return
+
+        faiss_index.remove_ids(ids)
+
+    def __remove_ids_by_rebuilding(self, faiss_index, ids):
+        # HNSW graphs and refined indexes do not support removal, so the index is refilled with the vectors it stores.
+        # Reset keeps the trained quantizers; refined indexes are refilled from their SQ8 copy, which is close enough for re-encoding.
+        existing_ids = faiss.vector_to_array(faiss_index.id_map)
+        kept_positions = np.flatnonzero(~np.isin(existing_ids, ids))
+        if len(kept_positions) == len(existing_ids):
+            return
+
+        vectors = faiss_index.index.reconstruct_n(0, faiss_index.ntotal)
+
+        faiss_index.reset()
+        faiss_index.add_with_ids(vectors[kept_positions], existing_ids[kept_positions])
+
+    def __build_report(self, vectors, ids):
+        query_positions = np.random.default_rng(0).choice(len(vectors), min(NUMBER_OF_EVALUATION_QUERIES, len(vectors)), replace=False)
+        queries = vectors[query_positions]
+        number_of_results = min(EVALUATION_NUMBER_OF_RESULTS, len(vectors))
+
+        flat_index = faiss.IndexFlatL2(vectors.shape[1])
+        flat_index.add(vectors)
+        flat_latency, (_, exact_positions) = self.__measure_search(flat_index, queries, number_of_results)
+
+        parameter_name, parameter_values = self.__get_evaluated_search_parameter()
+
+        measurements = []
+        initial_parameter_value = self.__get_search_parameter(parameter_name) if parameter_name else None
+        for parameter_value in parameter_values:
+            if parameter_name:
+                self.__set_search_parameter(parameter_name, parameter_value)
+
+            latency, (_, approximate_ids) = self.__measure_search(self.faiss_index, queries, number_of_results)
+            measurements.append({
+                **({ parameter_name: parameter_value } if parameter_name else {}),
+                f"recallAt{number_of_results}": self.__calculate_recall(approximate_ids, ids[exact_positions]),
+                "latencyMsPerQuery": latency * 1000 / len(queries),
+            })
+
+        if parameter_name:
+            self.__set_search_parameter(parameter_name, initial_parameter_value)
+
+        # Ids are int64 for every index type: in the id map or in IVF inverted lists
+        bytes_per_vector = self.__calculate_code_size() + 8
+        flat_bytes_per_vector = 4 * vectors.shape[1] + 8
+
+        return {
+            "indexType": self.index_type,
+            "indexDescription": self.__describe_index(),
+            "numberOfEvaluatedVectors": len(vectors),
+            "numberOfQueries": len(queries),
+            "defaultSearchParameters": { parameter_name: initial_parameter_value } if parameter_name else {},
+            "bytesPerVector": bytes_per_vector,
+            "flatBytesPerVector": flat_bytes_per_vector,
+            "compressionRatio": flat_bytes_per_vector / bytes_per_vector,
+            "flatLatencyMsPerQuery": flat_latency * 1000 / len(queries),
+            "measurements": measurements,
+        }
+
+    def __get_evaluated_search_parameter(self):
+        if self.index_type == "HNSW":
+            return "efSearch", [16, 32, 64, 128, 256]
+
+        if self.index_type in IVF_INDEX_TYPES:
+            number_of_lists = faiss.extract_index_ivf(self.faiss_index).nlist
+            return "nprobe", sorted({ value for value in [1, 4, 16, 64, 256] if value <= number_of_lists } | { number_of_lists })
+
+        if self.index_type == "PQRefine":
+            return "kFactor", [1, 2, 4, 8, 16]
+
+        # Scalar quantized and plain PQ indexes scan all codes, so they have nothing to tune
+        return None, [None]
+
+    def __measure_search(self, index, queries, number_of_results):
+        start_time = time.time()
+        result = index.search(queries, number_of_results)
+        return time.time() - start_time, result
+
+    def __calculate_recall(self, approximate_ids, exact_ids):
+        matches = [len(set(approximate_row.tolist()) & set(exact_row.tolist())) for approximate_row, exact_row in zip(approximate_ids, exact_ids)]
+        return float(np.sum(matches) / exact_ids.size)
+
+    def __get_search_parameter(self, parameter_name):
+        if parameter_name == "efSearch":
+            return faiss.downcast_index(self.faiss_index.index).hnsw.efSearch
+
+        if parameter_name == "kFactor":
+            return faiss.downcast_index(self.faiss_index.index).k_factor
+
+        return faiss.extract_index_ivf(self.faiss_index).nprobe
+
+    def __set_search_parameter(self, parameter_name, parameter_value):
+        if parameter_name == "efSearch":
+            faiss.downcast_index(self.faiss_index.index).hnsw.efSearch = parameter_value
+        elif parameter_name == "kFactor":
+            faiss.downcast_index(self.faiss_index.index).k_factor = parameter_value
+        else:
+            faiss.extract_index_ivf(self.faiss_index).nprobe = parameter_value
+
+    def __calculate_code_size(self):
+        if self.index_type in IVF_INDEX_TYPES:
+            return faiss.extract_index_ivf(self.faiss_index).code_size
+
+        index = faiss.downcast_index(self.faiss_index.index)
+        if self.index_type == "HNSW":
+            # Besides the vectors HNSW keeps 4 byte neighbor ids of all graph levels
+            return index.storage.sa_code_size() + 4 * index.hnsw.neighbors.size() / self.faiss_index.ntotal
+
+        if self.index_type == "PQRefine":
+            return index.base_index.sa_code_size() + index.refine_index.sa_code_size()
+
+        return index.sa_code_size()
+
+    def __describe_index(self):
+        if self.index_type == "HNSW":
+            return f"HNSW{faiss.downcast_index(self.faiss_index.index).hnsw.nb_neighbors(1)},Flat"
+
+        if self.index_type in IVF_INDEX_TYPES:
+            ivf_index = faiss.extract_index_ivf(self.faiss_index)
+            return f"{self.index_type} with {ivf_index.nlist} lists"
+
+        index = faiss.downcast_index(self.faiss_index.index)
+        if self.index_type == "PQ":
+            return f"PQ{index.pq.M}x{index.pq.nbits}"
+
+        if self.index_type == "PQRefine":
+            pq = faiss.downcast_index(index.base_index).pq
+            return f"PQ{pq.M}x{pq.nbits},Refine(SQ8)"
+
+        return self.index_type
@@ -49,7 +49,16 @@ class QdrantIndexer:
             ids (list): List of IDs for the vectors.
             texts (list): List of texts to be embedded and indexed.
         """
-        vectors = self.embedder.embed(texts)
+        self.index_vectors(ids, self.embedder.embed(texts))
+
+    def index_vectors(self, ids, vectors):
+        """
+        Add already embedded vectors to the Qdrant collection.
+
+        Args:
+            ids (list): List of IDs for the vectors.
+            vectors (array): Vectors produced by the embedder of this indexer.
+        """
         points = [
             PointStruct(id=id_, vector=vector.tolist())
             for id_, vector in zip(ids, vectors)
@@ -79,6 +88,16 @@ class QdrantIndexer:
         """
         return self.collection_name
 
+    def save(self, persister, base_path):
+        """
+        Save the indexer state, vectors themselves are stored by the Qdrant server.
+
+        Args:
+            persister: Persister to write the file with.
+            base_path (str): Folder of the indexer inside the collection.
+        """
+        persister.save_bin_file(self.serialize(), f"{base_path}/indexer")
+
     def search(self, text, number_of_results=10):
         """
         Search for similar vectors in the Qdrant collection.
@@ -103,6 +122,57 @@ class QdrantIndexer:
 
         return np.array(distances), np.array(ids)
 
+    def search_many(self, texts, number_of_results=10):
+        """
+        Search for similar vectors for several texts embedded in one batch.
+
+        Args:
+            texts (list): Texts to be embedded and used for search.
+            number_of_results (int): Number of top results to return per text.
+
+        Returns:
+            tuple: (distances, ids) lists with one array of scores and one array
+                   of IDs per text.
+        """
+        return self.search_by_vectors(self.embedder.embed(texts), number_of_results)
+
+    def search_by_vectors(self, vectors, number_of_results=10):
+        """
+        Search for similar vectors for already embedded queries.
+
+        Args:
+            vectors: Query vectors, one row per query.
+            number_of_results (int): Number of top results to return per query.
+
+        Returns:
+            tuple: (distances, ids) lists with one array of scores and one array
+                   of IDs per query.
+        """
+        distances = []
+        ids = []
+        for vector in vectors:
+            search_result = self.client.search(
+                collection_name=self.collection_name,
+                query_vector=vector.tolist(),
+                limit=number_of_results
+            )
+            distances.append(np.array([result.score for result in search_result]))
+            ids.append(np.array([result.id for result in search_result]))
+
+        return distances, ids
+
+    def has_pending_vectors(self):
+        """Vectors are sent to Qdrant right away, nothing waits for training."""
+        return False
+
+    def compact(self):
+        """Qdrant removes deleted points by its own optimizer on the server, so there is nothing to compact."""
+        return 0
+
+    def get_build_report(self):
+        """Qdrant builds its index on the server, so there is no build report."""
+        return None
+
     def get_size(self):
         """
         Get the number of vectors in the Qdrant collection.
@@ -1,6 +1,7 @@
 import os
 import shutil
 import pickle
+import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.http.models import PointStruct
 
@@ -14,8 +15,11 @@ class DiskPersister:
 
         self.__make_sure_path_exists(path)
 
-        with open(path, 'w', encoding="utf-8") as file:
+        # Written next to the target and renamed, so an interrupted write never leaves a truncated manifest or info file
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'w', encoding="utf-8") as file:
             file.write(data)
+        os.replace(temporary_path, path)
 
     def read_text_file(self, file_path):
         path = os.path.join(self.base_path, file_path)
@@ -37,6 +41,46 @@ class DiskPersister:
         with open(path, 'rb') as file:
             return pickle.load(file)
 
+    def save_bin_file_part(self, data, file_path, offset):
+        path = os.path.join(self.base_path, file_path)
+
+        self.__make_sure_path_exists(path)
+
+        # Data is written from the offset and everything after it is dropped, so the file can be extended in place
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as file:
+            file.seek(offset)
+            file.write(data)
+            file.truncate()
+
+    def save_numpy_file(self, array, file_path):
+        path = os.path.join(self.base_path, file_path)
+
+        self.__make_sure_path_exists(path)
+
+        # Written next to the target and renamed, so processes that memory-mapped the old file keep a valid view
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'wb') as file:
+            np.save(file, array)
+        os.replace(temporary_path, path)
+
+    def save_file_with_writer(self, file_path, write_file):
+        path = os.path.join(self.base_path, file_path)
+
+        self.__make_sure_path_exists(path)
+
+        # Same as for numpy files, the old file stays valid for processes that memory-mapped it
+        temporary_path = f"{path}.tmp"
+        write_file(temporary_path)
+        os.replace(temporary_path, path)
+
+    def get_full_path(self, file_path):
+        return os.path.join(self.base_path, file_path)
+
+    def read_numpy_file(self, file_path, mmap_mode=None):
+        path = os.path.join(self.base_path, file_path)
+
+        return np.load(path, mmap_mode=mmap_mode)
+
     def create_folder(self, folder_name):
         directory_path = os.path.join(self.base_path, folder_name)
         os.makedirs(directory_path)
@@ -12,8 +12,9 @@ class CacheReaderDecorator:
 
         if self.persister.is_path_exists(cache_key) and self.persister.is_path_exists(f"{cache_key}_completed"):
             logging.info(f"Cache hit during 'read_all_documents' for {cache_key}")
-            for file_name in self.persister.read_folder_files(cache_key):
-                yield json.loads(self.persister.read_text_file(f"{cache_key}/{file_name}"))
+            # Documents are read in the order they were cached, by their indexes instead of a walk over the cache folder
+            for document_index in range(self.__read_number_of_cached_documents(cache_key)):
+                yield json.loads(self.persister.read_text_file(f"{cache_key}/{document_index}.json"))
         else:
             self.persister.remove_folder(cache_key)
             self.persister.create_folder(cache_key)
@@ -24,14 +25,14 @@ class CacheReaderDecorator:
 
                 yield document
             
-            self.persister.save_text_file("", f"{cache_key}_completed")
+            self.persister.save_text_file(json.dumps({ "numberOfDocuments": document_index + 1 }), f"{cache_key}_completed")
     
     def get_number_of_documents(self):
         cache_key = self.__build_cache_key()
         
         if self.persister.is_path_exists(cache_key) and self.persister.is_path_exists(f"{cache_key}_completed"):
             logging.info(f"Cache hit during 'get_number_of_documents' for {cache_key}")
-            return len(self.persister.read_folder_files(cache_key))
+            return self.__read_number_of_cached_documents(cache_key)
         else:
             return self.reader.get_number_of_documents()
 
@@ -44,6 +45,17 @@ class CacheReaderDecorator:
         self.persister.remove_folder(cache_key)
         self.persister.remove_file(f"{cache_key}_completed")
 
+    def __read_number_of_cached_documents(self, cache_key):
+        completed_content = self.persister.read_text_file(f"{cache_key}_completed")
+        if completed_content:
+            return json.loads(completed_content)["numberOfDocuments"]
+
+        # Caches completed by older versions have an empty file, they are counted once and the count is stored
+        number_of_documents = len(self.persister.read_folder_files(cache_key))
+        self.persister.save_text_file(json.dumps({ "numberOfDocuments": number_of_documents }), f"{cache_key}_completed")
+
+        return number_of_documents
+
     def __build_cache_key(self):
         hash_object = hashlib.sha256(json.dumps(self.reader.get_reader_details()).encode('utf-8')) 
         return hash_object.hexdigest()
\ No newline at end of file
@@ -0,0 +1,17 @@
+import hashlib
+
+import numpy as np
+
+# Hashes of content that was indexed before hashes were stored, it never matches a computed hash
+UNKNOWN_HASH = 0
+
+def compute_text_hash(text):
+    text_hash = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+    return text_hash or 1
+
+def compute_document_hash(chunk_hashes):
+    # Order of chunks is part of the document content, since chunk numbers point to positions in the document
+    document_hash = int.from_bytes(hashlib.blake2b(np.asarray(chunk_hashes, dtype=np.uint64).tobytes(), digest_size=8).digest(), "little")
+
+    return document_hash or 1
\ No newline at end of file
@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+
+class LruCache:
+    def __init__(self, max_size, size_func=lambda value: 1):
+        self.max_size = max_size
+        self.size_func = size_func
+
+        self.items = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.items.move_to_end(key)
+            return self.items[key][0]
+
+    def put(self, key, value, size=None):
+        item_size = size if size is not None else self.size_func(value)
+        if item_size > self.max_size:
+            return
+
+        with self.lock:
+            if key in self.items:
+                self.size -= self.items.pop(key)[1]
+
+            self.items[key] = (value, item_size)
+            self.size += item_size
+
+            while self.size > self.max_size:
+                _, (_, evicted_item_size) = self.items.popitem(last=False)
+                self.size -= evicted_item_size
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.size = 0
+
+    def get_statistics(self):
+        with self.lock:
+            number_of_requests = self.hits + self.misses
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / number_of_requests if number_of_requests > 0 else 0.0,
+                "numberOfItems": len(self.items),
+                "size": self.size,
+                "maxSize": self.max_size,
+            }
@@ -0,0 +1,105 @@
+import json
+import time
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+
+class OllamaStubServer:
+    def __init__(self, number_of_dimensions=768, request_latency=0.02, text_latency=0.002, max_parallel_requests=4):
+        """
+        Local HTTP server that imitates the Ollama embed API (POST /api/embed with a batch `input`).
+
+        Every request takes a fixed latency plus a latency per text, like a model server that has
+        per-request overhead and benefits from batches. Requests above `max_parallel_requests` are
+        rejected with 429 status, so clients have to back off.
+
+        Args:
+            number_of_dimensions (int): Number of dimensions of returned embeddings.
+            request_latency (float): Latency of one request in seconds.
+            text_latency (float): Latency of one text in a request in seconds.
+            max_parallel_requests (int): Max number of requests processed at the same time.
+        """
+        self.number_of_dimensions = number_of_dimensions
+        self.request_latency = request_latency
+        self.text_latency = text_latency
+        self.max_parallel_requests = max_parallel_requests
+
+        self.lock = threading.Lock()
+        self.number_of_active_requests = 0
+        self.number_of_requests = 0
+        self.number_of_rejected_requests = 0
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.__create_request_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    def get_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_statistics(self):
+        with self.lock:
+            return { "numberOfRequests": self.number_of_requests, "numberOfRejectedRequests": self.number_of_rejected_requests }
+
+    def embed(self, texts):
+        return [self.__embed_text(text) for text in texts]
+
+    def __embed_text(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+        return np.random.default_rng(seed).standard_normal(self.number_of_dimensions).round(6).tolist()
+
+    def __create_request_handler(self):
+        stub_server = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, Nagle's algorithm would delay every keep-alive response
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                texts = [body["input"]] if isinstance(body["input"], str) else body["input"]
+
+                with stub_server.lock:
+                    stub_server.number_of_requests += 1
+                    is_rejected = stub_server.number_of_active_requests >= stub_server.max_parallel_requests
+                    if is_rejected:
+                        stub_server.number_of_rejected_requests += 1
+                    else:
+                        stub_server.number_of_active_requests += 1
+
+                if is_rejected:
+                    self.__send_json(429, { "error": "server busy, please try again" })
+                    return
+
+                try:
+                    time.sleep(stub_server.request_latency + stub_server.text_latency * len(texts))
+                    self.__send_json(200, { "model": body["model"], "embeddings": stub_server.embed(texts) })
+                finally:
+                    with stub_server.lock:
+                        stub_server.number_of_active_requests -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def __send_json(self, status_code, content):
+                data = json.dumps(content).encode("utf-8")
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return RequestHandler
\ No newline at end of file
@@ -1,3 +1,4 @@
+import sys
 import time
 import logging
 
@@ -31,4 +32,32 @@ def log_execution_duration(func, identifier, enabled=True):
     if error is not None:
         raise error
 
-    return result
\ No newline at end of file
+    return result
+
+def reset_peak_rss():
+    # Linux resets the peak resident set size of the process on writing "5" to clear_refs, elsewhere the peak is kept since the process start
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def get_peak_rss_bytes():
+    try:
+        with open("/proc/self/status", "r") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # Max RSS is in kilobytes on Linux and in bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
\ No newline at end of file
@@ -0,0 +1,147 @@
+import time
+import queue
+import logging
+import threading
+
+END_OF_ITEMS = object()
+
+class PipelineStage:
+    def __init__(self, name, process, output_queue_size=1):
+        # Process is a function that takes an iterator of input items and yields output items
+        self.name = name
+        self.process = process
+        self.output_queue_size = output_queue_size
+
+        self.number_of_input_items = 0
+        self.number_of_output_items = 0
+        self.input_waiting_duration = 0.0
+        self.output_waiting_duration = 0.0
+        self.duration = 0.0
+
+    def get_statistics(self):
+        busy_duration = max(0.0, self.duration - self.input_waiting_duration - self.output_waiting_duration)
+
+        return {
+            "stage": self.name,
+            "numberOfInputItems": self.number_of_input_items,
+            "numberOfOutputItems": self.number_of_output_items,
+            "busySeconds": round(busy_duration, 2),
+            "waitingForInputSeconds": round(self.input_waiting_duration, 2),
+            "waitingForOutputSeconds": round(self.output_waiting_duration, 2),
+            "outputItemsPerBusySecond": round(self.number_of_output_items / busy_duration, 2) if busy_duration > 0 else None,
+        }
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = stages
+        # A failed stage stops only stages before it, stages after it still process items that are already queued
+        self.stop_events = [threading.Event() for _ in stages]
+        self.error_lock = threading.Lock()
+        self.error = None
+        self.is_last_stage_completed = False
+
+    def run(self):
+        """
+        Run every stage except the last one in its own thread, stages are connected by bounded queues.
+
+        A stage that produces items faster than the next one consumes them blocks on its full output
+        queue, so memory stays bounded. The last stage runs in the calling thread and its output items
+        are only counted. An error in a stage stops stages before it, input of stages after it ends as
+        usual once the items already queued are processed, and then the error is raised here.
+        """
+        input_queue = None
+        threads = []
+        for stage_number, stage in enumerate(self.stages[:-1]):
+            output_queue = queue.Queue(maxsize=stage.output_queue_size)
+            thread = threading.Thread(target=self.__run_stage, args=(stage_number, input_queue, output_queue), name=f"pipeline-{stage.name}", daemon=True)
+            thread.start()
+            threads.append(thread)
+            input_queue = output_queue
+
+        last_stage_number = len(self.stages) - 1
+        last_stage = self.stages[last_stage_number]
+        start_time = time.time()
+        try:
+            for _ in last_stage.process(self.__read_input_items(last_stage_number, input_queue)):
+                last_stage.number_of_output_items += 1
+            self.is_last_stage_completed = True
+        except Exception as error:
+            self.__fail(last_stage_number, error)
+            raise
+        finally:
+            last_stage.duration = time.time() - start_time
+            for stop_event in self.stop_events:
+                stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        if self.error is not None:
+            raise self.error
+
+    def log_statistics(self):
+        for stage in self.stages:
+            logging.info(f"Pipeline stage statistics: {stage.get_statistics()}")
+
+    def __run_stage(self, stage_number, input_queue, output_queue):
+        stage = self.stages[stage_number]
+        start_time = time.time()
+        try:
+            input_items = self.__read_input_items(stage_number, input_queue) if input_queue is not None else None
+            for item in stage.process(input_items):
+                stage.number_of_output_items += 1
+                if not self.__put(stage_number, output_queue, item):
+                    return
+        except Exception as error:
+            logging.error(f"Pipeline stage {stage.name} failed: {error}")
+            self.__fail(stage_number, error)
+        finally:
+            stage.duration = time.time() - start_time
+            self.__put(stage_number, output_queue, END_OF_ITEMS)
+
+    def __fail(self, stage_number, error):
+        # The first error is raised, errors of stages that drain queues after it are only logged
+        with self.error_lock:
+            if self.error is None:
+                self.error = error
+
+        for stop_event in self.stop_events[:stage_number]:
+            stop_event.set()
+
+    def __read_input_items(self, stage_number, input_queue):
+        stage = self.stages[stage_number]
+        while True:
+            waiting_start_time = time.time()
+            item = self.__get(stage_number, input_queue)
+            stage.input_waiting_duration += time.time() - waiting_start_time
+
+            if item is END_OF_ITEMS:
+                return
+
+            stage.number_of_input_items += 1
+            yield item
+
+    def __put(self, stage_number, output_queue, item):
+        stage = self.stages[stage_number]
+        waiting_start_time = time.time()
+        try:
+            # Waits in short steps, so a stage blocked by a full queue notices that it was stopped
+            while not self.stop_events[stage_number].is_set():
+                try:
+                    output_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+
+            return False
+        finally:
+            stage.output_waiting_duration += time.time() - waiting_start_time
+
+    def __get(self, stage_number, input_queue):
+        while not self.stop_events[stage_number].is_set():
+            try:
+                return input_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+        return END_OF_ITEMS
\ No newline at end of file
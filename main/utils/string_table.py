@@ -0,0 +1,34 @@
+import numpy as np
+
+class StringTable:
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @staticmethod
+    def from_strings(strings):
+        encoded_strings = [string.encode("utf-8") for string in strings]
+
+        offsets = np.zeros(len(encoded_strings) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(encoded_string) for encoded_string in encoded_strings], dtype=np.int64)
+        data = np.frombuffer(b"".join(encoded_strings), dtype=np.uint8)
+
+        return StringTable(offsets, data)
+
+    @staticmethod
+    def load(persister, base_path, mmap_mode=None):
+        return StringTable(persister.read_numpy_file(f"{base_path}.offsets.npy", mmap_mode=mmap_mode),
+                           persister.read_numpy_file(f"{base_path}.data.npy", mmap_mode=mmap_mode))
+
+    def save(self, persister, base_path):
+        persister.save_numpy_file(self.data, f"{base_path}.data.npy")
+        persister.save_numpy_file(self.offsets, f"{base_path}.offsets.npy")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        return self.data[self.offsets[position]:self.offsets[position + 1]].tobytes().decode("utf-8")
+
+    def to_list(self):
+        return [self[position] for position in range(0, len(self))]
@@ -0,0 +1,60 @@
+import os
+import time
+import argparse
+import logging
+
+from main.utils.logger import setup_root_logger
+from main.utils.ollama_stub_server import OllamaStubServer
+
+setup_root_logger()
+
+ap = argparse.ArgumentParser()
+ap.add_argument("-numberOfTexts", "--numberOfTexts", required=False, type=int, default=2000, help="Number of texts to embed in every benchmark run")
+ap.add_argument("-batchSize", "--batchSize", required=False, type=int, default=64, help="Max number of texts sent in one request")
+ap.add_argument("-maxConcurrentRequests", "--maxConcurrentRequests", required=False, type=int, default=4, help="Max number of requests sent in parallel")
+ap.add_argument("-ollamaHost", "--ollamaHost", required=False, default=None, help="Ollama host to benchmark, e.g. http://localhost:11434. If not passed, a local stub server that imitates the Ollama embed API is used.")
+ap.add_argument("-stubRequestLatency", "--stubRequestLatency", required=False, type=float, default=0.02, help="Stub server latency of one request in seconds")
+ap.add_argument("-stubTextLatency", "--stubTextLatency", required=False, type=float, default=0.002, help="Stub server latency of one text in a request in seconds")
+ap.add_argument("-stubMaxParallelRequests", "--stubMaxParallelRequests", required=False, type=int, default=4, help="Max number of requests the stub server processes at the same time, it responds with 429 to other ones")
+args = vars(ap.parse_args())
+
+stub_server = None
+if args['ollamaHost'] is None:
+    stub_server = OllamaStubServer(request_latency=args['stubRequestLatency'],
+                                   text_latency=args['stubTextLatency'],
+                                   max_parallel_requests=args['stubMaxParallelRequests']).start()
+    os.environ["OLLAMA_HOST"] = stub_server.get_url()
+else:
+    os.environ["OLLAMA_HOST"] = args['ollamaHost']
+
+# Imported after OLLAMA_HOST is set, since the embedder reads it on creation
+from main.indexes.embeddings.ollama_embeder import OllamaEmbedder
+
+texts = [f"Benchmark text number {i} about collection indexing, search and embeddings" for i in range(0, args['numberOfTexts'])]
+
+def run_benchmark(name, batch_size, max_concurrent_requests):
+    embedder = OllamaEmbedder(batch_size=batch_size, max_concurrent_requests=max_concurrent_requests)
+    number_of_dimensions = embedder.get_number_of_dimensions()
+
+    start_time = time.time()
+    vectors = embedder.embed(texts)
+    duration = time.time() - start_time
+
+    if vectors.shape != (len(texts), number_of_dimensions):
+        raise Exception(f"Unexpected shape of embeddings: {vectors.shape}")
+
+    logging.info(f"{name}: {len(texts)} texts in {duration:.2f} seconds, {len(texts) / duration:.1f} texts/s")
+
+    return vectors
+
+sequential_vectors = run_benchmark("One text per request, one request at a time", batch_size=1, max_concurrent_requests=1)
+batched_vectors = run_benchmark(f"Batches of {args['batchSize']} texts, up to {args['maxConcurrentRequests']} requests in parallel",
+                                batch_size=args['batchSize'],
+                                max_concurrent_requests=args['maxConcurrentRequests'])
+
+if not (sequential_vectors == batched_vectors).all():
+    raise Exception("Batched embeddings differ from sequential ones")
+
+if stub_server is not None:
+    logging.info(f"Stub server statistics: {stub_server.get_statistics()}")
+    stub_server.stop()
\ No newline at end of file
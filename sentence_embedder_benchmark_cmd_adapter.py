@@ -0,0 +1,54 @@
+import time
+import random
+import argparse
+import logging
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from main.utils.logger import setup_root_logger
+from main.indexes.indexer_factory import SENTENCE_EMBEDDER_MODELS
+from main.indexes.embeddings.token_budget_batching import encode_with_token_budget, DEFAULT_TOKEN_BUDGET
+
+setup_root_logger()
+
+ap = argparse.ArgumentParser()
+ap.add_argument("-model", "--model", required=False, default="all-MiniLM-L6-v2", choices=list(SENTENCE_EMBEDDER_MODELS.keys()), help="Sentence transformers model to benchmark")
+ap.add_argument("-numberOfTexts", "--numberOfTexts", required=False, type=int, default=2000, help="Number of texts to embed in every benchmark run")
+ap.add_argument("-shortTextsShare", "--shortTextsShare", required=False, type=float, default=0.5, help="Share of short texts (like titles), other texts are paragraphs of different lengths")
+ap.add_argument("-fixedBatchSize", "--fixedBatchSize", required=False, type=int, default=32, help="Number of texts in one batch of fixed size batching")
+ap.add_argument("-tokenBudget", "--tokenBudget", required=False, type=int, default=DEFAULT_TOKEN_BUDGET, help="Max number of tokens (including padding) in one batch of token budget batching")
+args = vars(ap.parse_args())
+
+model = SentenceTransformer(SENTENCE_EMBEDDER_MODELS[args['model']])
+
+# Chunks of real collections mix short texts (titles, labels) with long ones, it is where batching by tokens helps
+random_generator = random.Random(0)
+words = "collection indexing search embeddings document chunk query ticket page attachment comment status release".split()
+texts = [" ".join(random_generator.choices(words, k=random_generator.randint(3, 10) if random_generator.random() < args['shortTextsShare'] else random_generator.randint(30, 300)))
+         for _ in range(0, args['numberOfTexts'])]
+number_of_tokens = sum(len(input_ids) for input_ids in model.tokenizer(texts, truncation=True, max_length=model.max_seq_length)["input_ids"])
+
+def run_benchmark(name, embed):
+    # The first call loads kernels and allocates buffers, it is not measured
+    embed(texts[:10])
+
+    start_time = time.time()
+    vectors = embed(texts)
+    duration = time.time() - start_time
+
+    logging.info(f"{name}: {len(texts)} texts in {duration:.2f} seconds, {len(texts) / duration:.1f} texts/s, {number_of_tokens / duration:.0f} tokens/s")
+
+    return vectors, duration
+
+fixed_batch_vectors, fixed_batch_duration = run_benchmark(f"Fixed batches of {args['fixedBatchSize']} texts",
+                                                          lambda batch_texts: np.asarray(model.encode(batch_texts, batch_size=args['fixedBatchSize']), dtype=np.float32))
+token_budget_vectors, token_budget_duration = run_benchmark(f"Batches of up to {args['tokenBudget']} tokens",
+                                                            lambda batch_texts: encode_with_token_budget(model, batch_texts, args['tokenBudget'])[0])
+
+logging.info(f"Token budget batching is {fixed_batch_duration / token_budget_duration:.2f} times as fast as fixed batches")
+
+# Padding changes float rounding a little, but vectors have to stay the same otherwise
+max_difference = float(np.abs(fixed_batch_vectors - token_budget_vectors).max())
+if max_difference > 1e-3:
+    raise Exception(f"Embeddings of token budget batches differ from ones of fixed batches by {max_difference}")
\ No newline at end of file
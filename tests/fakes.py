@@ -0,0 +1,64 @@
+import hashlib
+
+import numpy as np
+
+NUMBER_OF_DIMENSIONS = 16
+
+class FakeEmbedder:
+    # Vectors are derived from text hashes, so equal texts have equal vectors and no model is needed
+    def __init__(self, model_name="fake-model"):
+        self.model_name = model_name
+        self.number_of_calls = 0
+        self.number_of_embedded_texts = 0
+
+    def embed(self, text):
+        self.number_of_calls += 1
+        if isinstance(text, str):
+            self.number_of_embedded_texts += 1
+            return self.__embed_text(text)
+
+        self.number_of_embedded_texts += len(text)
+        return np.array([self.__embed_text(item) for item in text], dtype=np.float32).reshape(len(text), NUMBER_OF_DIMENSIONS)
+
+    def get_number_of_dimensions(self):
+        return NUMBER_OF_DIMENSIONS
+
+    def __embed_text(self, text):
+        return np.frombuffer(hashlib.sha256(text.encode("utf-8")).digest(), dtype=np.uint8)[:NUMBER_OF_DIMENSIONS].astype(np.float32) / 255.0
+
+
+class FakeReader:
+    def __init__(self, documents, number_of_documents_before_error=None):
+        self.documents = documents
+        self.number_of_documents_before_error = number_of_documents_before_error
+
+    def read_all_documents(self):
+        for document_number, document in enumerate(self.documents):
+            if document_number == self.number_of_documents_before_error:
+                raise ConnectionError("Source is not available")
+            yield document
+
+    def get_number_of_documents(self):
+        return len(self.documents)
+
+    def get_reader_details(self):
+        return { "type": "fake" }
+
+
+class FakeConverter:
+    def convert(self, document):
+        return [{
+            "id": document["id"],
+            "url": f"https://example.com/{document['id']}",
+            "modifiedTime": document["modifiedTime"],
+            "text": "\n\n".join(document["parts"]),
+            "chunks": [{ "indexedData": part } for part in document["parts"]],
+        }]
+
+
+def create_documents(number_of_documents, number_of_parts=3, prefix="D"):
+    return [{
+        "id": f"{prefix}{document_number}",
+        "modifiedTime": f"2025-01-{1 + document_number % 28:02d}T00:00:00+00:00",
+        "parts": [f"part {part_number} of document {prefix}{document_number}" for part_number in range(0, number_of_parts)],
+    } for document_number in range(0, number_of_documents)]
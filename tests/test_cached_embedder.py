@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from main.indexes.embeddings.cached_embedder import CachedEmbedder
+from main.indexes.embeddings.persistent_embedding_cache import PersistentEmbeddingCache
+from tests.fakes import FakeEmbedder
+
+class CachedEmbedderTest(unittest.TestCase):
+    def test_cached_texts_are_not_embedded_again(self):
+        embedder = FakeEmbedder()
+        cached_embedder = CachedEmbedder(embedder)
+
+        first_vectors = cached_embedder.embed(["query one", "query two"])
+        second_vectors = cached_embedder.embed(["query two", "query one", "query three"])
+
+        self.assertEqual(embedder.number_of_embedded_texts, 3)
+        np.testing.assert_array_equal(second_vectors[:2], first_vectors[::-1])
+        np.testing.assert_array_equal(cached_embedder.embed("query three"), embedder.embed("query three"))
+
+        statistics = cached_embedder.get_statistics()
+        self.assertEqual((statistics["hits"], statistics["misses"]), (3, 3))
+        self.assertAlmostEqual(statistics["hitRate"], 0.5)
+
+    def test_texts_are_normalized_before_caching(self):
+        embedder = FakeEmbedder()
+        cached_embedder = CachedEmbedder(embedder)
+
+        cached_embedder.embed("query   one ")
+        cached_embedder.embed("query one")
+
+        self.assertEqual(embedder.number_of_embedded_texts, 1)
+
+    def test_least_recently_used_embeddings_are_evicted(self):
+        embedder = FakeEmbedder()
+        cached_embedder = CachedEmbedder(embedder, max_number_of_items=2)
+
+        for text in ["query one", "query two", "query one", "query three", "query one", "query two"]:
+            cached_embedder.embed(text)
+
+        # "query two" was evicted by "query three", "query one" was kept by being used
+        self.assertEqual(embedder.number_of_embedded_texts, 4)
+
+    def test_persistent_cache_keeps_embeddings_between_embedders(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        cache_path = os.path.join(temporary_directory.name, "embeddings.sqlite")
+
+        first_cache = PersistentEmbeddingCache(path=cache_path)
+        CachedEmbedder(FakeEmbedder(), persistent_cache=first_cache).embed(["query one", "query two"])
+        first_cache.close()
+
+        embedder = FakeEmbedder()
+        second_cache = PersistentEmbeddingCache(path=cache_path)
+        self.addCleanup(second_cache.close)
+        vectors = CachedEmbedder(embedder, persistent_cache=second_cache).embed(["query two", "query one"])
+
+        self.assertEqual(embedder.number_of_embedded_texts, 0)
+        np.testing.assert_array_equal(vectors, FakeEmbedder().embed(["query two", "query one"]))
+
+    def test_embeddings_of_other_models_are_not_reused(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        persistent_cache = PersistentEmbeddingCache(path=os.path.join(temporary_directory.name, "embeddings.sqlite"))
+        self.addCleanup(persistent_cache.close)
+
+        CachedEmbedder(FakeEmbedder("first-model"), persistent_cache=persistent_cache).embed(["query one"])
+        embedder = FakeEmbedder("second-model")
+        CachedEmbedder(embedder, persistent_cache=persistent_cache).embed(["query one"])
+
+        self.assertEqual(embedder.number_of_embedded_texts, 1)
+
+    def test_statistics_are_logged_at_info_level_periodically(self):
+        cached_embedder = CachedEmbedder(FakeEmbedder(), cache_name="Query embedding", log_every_number_of_calls=3)
+
+        with self.assertLogs(level="DEBUG") as logs:
+            for text in ["query one", "query two", "query one", "query three"]:
+                cached_embedder.embed(text)
+
+        info_messages = [record.getMessage() for record in logs.records if record.levelname == "INFO"]
+        # The first call is logged although it has only misses, then every third call
+        self.assertEqual(len(info_messages), 2)
+        self.assertIn("0 of 1 texts served from cache, hit rate 0.0% in 1 calls", info_messages[0])
+        self.assertIn("hit rate 25.0% in 4 calls", info_messages[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import json
+import tempfile
+import unittest
+
+from main.persisters.disk_persister import DiskPersister
+from main.core.documents_collection_creator import DocumentCollectionCreator, OPERATION_TYPE
+from main.core.documents_collection_searcher import DocumentCollectionSearcher
+from main.indexes.indexers.faiss_indexer import FaissIndexer
+from main.indexes.embeddings.cached_embedder import CachedEmbedder
+from main.indexes.embeddings.persistent_embedding_cache import PersistentEmbeddingCache
+from tests.fakes import FakeEmbedder, FakeReader, FakeConverter, create_documents
+
+INDEXER_NAME = "indexer_FAISS_IndexFlatL2__embeddings_fake-model"
+
+class FailingEmbedder(FakeEmbedder):
+    def __init__(self, number_of_calls_before_error):
+        super().__init__()
+        self.number_of_calls_before_error = number_of_calls_before_error
+
+    def embed(self, text):
+        if self.number_of_calls == self.number_of_calls_before_error:
+            raise ConnectionError("Embedding service is not available")
+
+        return super().embed(text)
+
+class DocumentCollectionCreatorResumeTest(unittest.TestCase):
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.persister = DiskPersister(base_path=temporary_directory.name)
+        self.documents = create_documents(60)
+
+    def test_interrupted_creation_is_resumed_from_checkpoint(self):
+        with self.assertRaises(ConnectionError):
+            self.__run("c", FakeReader(self.documents, number_of_documents_before_error=35), FakeEmbedder())
+
+        self.assertTrue(DocumentCollectionCreator.has_checkpoint(self.persister, "c"))
+        checkpoint = json.loads(self.persister.read_text_file("c/checkpoint.json"))
+        self.assertGreater(checkpoint["numberOfDocuments"], 0)
+
+        embedder = FakeEmbedder()
+        self.__run("c", FakeReader(self.documents), embedder, resume=True)
+
+        # Documents indexed before the checkpoint are read again, but not embedded again
+        self.assertEqual(embedder.number_of_embedded_texts, 3 * (len(self.documents) - checkpoint["numberOfDocuments"]))
+        self.assertFalse(DocumentCollectionCreator.has_checkpoint(self.persister, "c"))
+
+        manifest = json.loads(self.persister.read_text_file("c/manifest.json"))
+        self.assertEqual(manifest["numberOfDocuments"], 60)
+        self.assertEqual(manifest["numberOfChunks"], 180)
+
+        self.__run("reference", FakeReader(self.documents), FakeEmbedder())
+        for query in ["part 1 of document D7", "part 2 of document D50"]:
+            self.assertEqual(self.__search_ids("c", query), self.__search_ids("reference", query))
+
+    def test_checkpoint_is_ignored_without_resume(self):
+        with self.assertRaises(ConnectionError):
+            self.__run("c", FakeReader(self.documents, number_of_documents_before_error=35), FakeEmbedder())
+
+        embedder = FakeEmbedder()
+        self.__run("c", FakeReader(self.documents), embedder)
+
+        self.assertEqual(embedder.number_of_embedded_texts, 180)
+        self.assertFalse(DocumentCollectionCreator.has_checkpoint(self.persister, "c"))
+
+    def test_documents_read_before_reading_error_are_indexed_and_checkpointed(self):
+        embedder = FakeEmbedder()
+        with self.assertRaises(ConnectionError):
+            self.__run("c", FakeReader(self.documents, number_of_documents_before_error=35), embedder, checkpoint_interval_seconds=3600)
+
+        checkpoint = json.loads(self.persister.read_text_file("c/checkpoint.json"))
+        self.assertEqual(checkpoint["numberOfDocuments"], 35)
+        self.assertEqual(embedder.number_of_embedded_texts, 105)
+
+    def test_documents_embedded_before_embedding_error_are_checkpointed(self):
+        with self.assertRaises(ConnectionError):
+            self.__run("c", FakeReader(self.documents), FailingEmbedder(number_of_calls_before_error=2), checkpoint_interval_seconds=3600)
+
+        # Batches of 30 chunks hold 10 documents of 3 chunks
+        checkpoint = json.loads(self.persister.read_text_file("c/checkpoint.json"))
+        self.assertEqual(checkpoint["numberOfDocuments"], 20)
+
+    def test_no_checkpoint_is_saved_when_embedding_fails_in_the_middle_of_documents(self):
+        # Chunks of a document with 45 parts go to two batches
+        documents = create_documents(4, number_of_parts=45)
+
+        with self.assertRaises(ConnectionError):
+            self.__run("c", FakeReader(documents), FailingEmbedder(number_of_calls_before_error=1), checkpoint_interval_seconds=3600)
+
+        self.assertFalse(DocumentCollectionCreator.has_checkpoint(self.persister, "c"))
+
+    def __run(self, collection_name, reader, embedder, resume=False, checkpoint_interval_seconds=0):
+        indexers = [FaissIndexer.load(INDEXER_NAME, embedder, self.persister, f"{collection_name}/indexes/{INDEXER_NAME}")
+                    if resume else FaissIndexer(INDEXER_NAME, embedder)]
+
+        DocumentCollectionCreator(collection_name,
+                                  reader,
+                                  FakeConverter(),
+                                  indexers,
+                                  self.persister,
+                                  OPERATION_TYPE.CREATE,
+                                  indexing_batch_size=30,
+                                  resume=resume,
+                                  checkpoint_interval_seconds=checkpoint_interval_seconds).run()
+
+    def __search_ids(self, collection_name, query):
+        searcher = DocumentCollectionSearcher(collection_name,
+                                              lambda: (FaissIndexer.load(INDEXER_NAME, FakeEmbedder(), self.persister, f"{collection_name}/indexes/{INDEXER_NAME}"), None),
+                                              self.persister)
+
+        return [result["id"] for result in searcher.search(query, max_number_of_chunks=5)["results"]]
+
+
+class DocumentCollectionCreatorChunkEmbeddingCacheTest(unittest.TestCase):
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.persister = DiskPersister(base_path=temporary_directory.name)
+        self.persistent_cache = PersistentEmbeddingCache(path=os.path.join(temporary_directory.name, "chunk_embeddings.sqlite"))
+        self.addCleanup(self.persistent_cache.close)
+
+    def test_chunks_embedded_for_one_collection_are_not_embedded_for_another(self):
+        documents = create_documents(10)
+        first_embedder = FakeEmbedder()
+        self.__create("first", documents, first_embedder)
+
+        second_embedder = FakeEmbedder()
+        self.__create("second", documents + create_documents(2, prefix="N"), second_embedder)
+
+        self.assertEqual(first_embedder.number_of_embedded_texts, 30)
+        self.assertEqual(second_embedder.number_of_embedded_texts, 6)
+
+    def __create(self, collection_name, documents, embedder):
+        cached_embedder = CachedEmbedder(embedder, max_number_of_items=0, persistent_cache=self.persistent_cache, normalize_text=False, cache_name="Chunk embedding")
+
+        DocumentCollectionCreator(collection_name,
+                                  FakeReader(documents),
+                                  FakeConverter(),
+                                  [FaissIndexer(INDEXER_NAME, cached_embedder)],
+                                  self.persister,
+                                  OPERATION_TYPE.CREATE).run()
+
+
+if __name__ == "__main__":
+    unittest.main()
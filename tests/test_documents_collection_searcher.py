@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+
+from main.persisters.disk_persister import DiskPersister
+from main.core.documents_collection_creator import DocumentCollectionCreator, OPERATION_TYPE
+from main.core.documents_collection_searcher import DocumentCollectionSearcher
+from main.indexes.indexers.faiss_indexer import FaissIndexer
+from main.indexes.indexers.bm25_indexer import Bm25Indexer
+from tests.fakes import FakeEmbedder, FakeReader, FakeConverter, create_documents
+
+INDEXER_NAME = "indexer_FAISS_IndexFlatL2__embeddings_fake-model"
+HYBRID_INDEXER_NAME = "indexer_BM25"
+
+class DocumentCollectionSearcherHybridTest(unittest.TestCase):
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.persister = DiskPersister(base_path=temporary_directory.name)
+
+        DocumentCollectionCreator("c",
+                                  FakeReader(create_documents(10)),
+                                  FakeConverter(),
+                                  [FaissIndexer(INDEXER_NAME, FakeEmbedder()), Bm25Indexer(HYBRID_INDEXER_NAME)],
+                                  self.persister,
+                                  OPERATION_TYPE.CREATE).run()
+
+    def test_vector_and_lexical_rankings_are_fused_by_reciprocal_rank(self):
+        searcher = self.__create_searcher(is_hybrid=True)
+
+        results = searcher.search("part 1 of document D4", max_number_of_chunks=5)["results"]
+
+        # The chunk is the first one of both rankings, other chunks of the document are found only lexically
+        self.assertEqual(results[0]["id"], "D4")
+        self.assertAlmostEqual(results[0]["matchedChunks"][0]["score"], 2 / (searcher.rank_fusion_k + 1), places=6)
+        self.assertEqual(results[0]["matchedChunks"][0]["chunkNumber"], 1)
+        self.assertEqual({ chunk["chunkNumber"] for chunk in results[0]["matchedChunks"] }, { 0, 1, 2 })
+
+        # Fused scores are higher for better matches, unlike vector distances
+        best_scores = [max(chunk["score"] for chunk in result["matchedChunks"]) for result in results]
+        self.assertEqual(best_scores, sorted(best_scores, reverse=True))
+
+    def test_search_without_hybrid_indexer_returns_vector_distances(self):
+        results = self.__create_searcher(is_hybrid=False).search("part 1 of document D4", max_number_of_chunks=5)["results"]
+
+        self.assertEqual(results[0]["id"], "D4")
+        self.assertEqual(results[0]["matchedChunks"][0]["score"], 0.0)
+
+    def __create_searcher(self, is_hybrid):
+        def load_indexers():
+            indexer = FaissIndexer.load(INDEXER_NAME, FakeEmbedder(), self.persister, f"c/indexes/{INDEXER_NAME}")
+            hybrid_indexer = Bm25Indexer(HYBRID_INDEXER_NAME, self.persister.read_bin_file(f"c/indexes/{HYBRID_INDEXER_NAME}/indexer")) if is_hybrid else None
+
+            return indexer, hybrid_indexer
+
+        return DocumentCollectionSearcher("c", load_indexers, self.persister)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+
+import faiss
+import numpy as np
+
+from main.persisters.disk_persister import DiskPersister
+from main.indexes.indexers.faiss_indexer import FaissIndexer
+from tests.fakes import FakeEmbedder
+
+INDEXER_NAME = "indexer_FAISS_IndexFlatL2__embeddings_fake-model"
+
+class FaissIndexerTombstonesTest(unittest.TestCase):
+    def setUp(self):
+        self.embedder = FakeEmbedder()
+        self.texts = [f"text {text_number}" for text_number in range(0, 20)]
+        self.vectors = self.embedder.embed(self.texts)
+
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.persister = DiskPersister(base_path=temporary_directory.name)
+
+    def test_removed_ids_are_skipped_by_search(self):
+        for index_type in ["IndexFlatL2", "HNSW"]:
+            with self.subTest(index_type=index_type):
+                indexer = self.__create_indexer(index_type=index_type)
+
+                indexer.remove_ids(np.array([3]))
+
+                _, ids = indexer.search_by_vectors(self.vectors[3:4], 5)
+                self.assertNotIn(3, ids[0])
+                self.assertEqual(indexer.get_size(), 19)
+                self.assertEqual(indexer.faiss_index.ntotal, 20)
+
+    def test_tombstones_are_kept_by_save_and_load(self):
+        indexer = self.__create_indexer(compaction_threshold=1.0)
+        indexer.remove_ids(np.array([3, 7]))
+
+        indexer.save(self.persister, f"c/indexes/{INDEXER_NAME}")
+        loaded_indexer = FaissIndexer.load(INDEXER_NAME, self.embedder, self.persister, f"c/indexes/{INDEXER_NAME}")
+
+        _, ids = loaded_indexer.search_by_vectors(self.vectors[[3, 7]], 5)
+        self.assertNotIn(3, ids[0])
+        self.assertNotIn(7, ids[1])
+        self.assertEqual(loaded_indexer.get_size(), 18)
+        self.assertAlmostEqual(loaded_indexer.get_tombstone_ratio(), 0.1)
+
+    def test_save_compacts_index_when_threshold_is_reached(self):
+        indexer = self.__create_indexer(compaction_threshold=0.2)
+        indexer.remove_ids(np.arange(0, 4))
+
+        indexer.save(self.persister, f"c/indexes/{INDEXER_NAME}")
+
+        self.assertEqual(indexer.faiss_index.ntotal, 16)
+        self.assertEqual(indexer.number_of_tombstones, 0)
+        self.assertFalse(os.path.exists(self.persister.get_full_path(f"c/indexes/{INDEXER_NAME}/tombstones.npy")))
+
+    def test_compact_removes_tombstoned_vectors(self):
+        indexer = self.__create_indexer()
+        indexer.remove_ids(np.array([3, 7]))
+
+        self.assertEqual(indexer.compact(), 2)
+        self.assertEqual(indexer.faiss_index.ntotal, 18)
+        self.assertEqual(indexer.get_size(), 18)
+        self.assertEqual(indexer.compact(), 0)
+
+    def test_serialize_leaves_tombstoned_index_as_it_is(self):
+        indexer = self.__create_indexer()
+        indexer.remove_ids(np.array([3]))
+
+        serialized_index = faiss.deserialize_index(indexer.serialize())
+
+        self.assertEqual(serialized_index.ntotal, 19)
+        self.assertEqual(indexer.faiss_index.ntotal, 20)
+        self.assertEqual(indexer.number_of_tombstones, 1)
+
+    def __create_indexer(self, index_type="IndexFlatL2", compaction_threshold=0.5):
+        indexer = FaissIndexer(INDEXER_NAME, self.embedder, index_type=index_type, compaction_threshold=compaction_threshold)
+        indexer.index_vectors(np.arange(0, len(self.texts)), self.vectors)
+
+        return indexer
+
+
+class FaissIndexerPendingVectorsTest(unittest.TestCase):
+    def test_collected_vectors_of_trained_indexes_are_searched_before_training(self):
+        embedder = FakeEmbedder()
+        vectors = embedder.embed([f"text {text_number}" for text_number in range(0, 50)])
+
+        for index_type in ["IVFFlat", "IVFPQ", "SQ8", "PQ"]:
+            with self.subTest(index_type=index_type):
+                indexer = FaissIndexer(INDEXER_NAME, embedder, index_type=index_type)
+                _, ids = indexer.search_by_vectors(vectors[:1], 3)
+                self.assertEqual(ids.tolist(), [[-1, -1, -1]])
+
+                indexer.index_vectors(np.arange(0, len(vectors)), vectors)
+                _, ids = indexer.search_by_vectors(vectors[5:7], 1)
+
+                self.assertTrue(indexer.has_pending_vectors())
+                self.assertEqual(ids.tolist(), [[5], [6]])
+
+    def test_tombstoned_collected_vectors_are_skipped_by_search(self):
+        embedder = FakeEmbedder()
+        vectors = embedder.embed([f"text {text_number}" for text_number in range(0, 50)])
+        indexer = FaissIndexer(INDEXER_NAME, embedder, index_type="IVFFlat")
+        indexer.index_vectors(np.arange(0, len(vectors)), vectors)
+
+        indexer.remove_ids(np.array([5]))
+
+        _, ids = indexer.search_by_vectors(vectors[5:6], 3)
+        self.assertNotIn(5, ids[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import tempfile
+import unittest
+
+from main.persisters.disk_persister import DiskPersister
+from main.core.documents_collection_creator import DocumentCollectionCreator, OPERATION_TYPE
+from main.core.documents_collection_searcher import DocumentCollectionSearcher
+from main.core.federated_collections_searcher import FederatedCollectionsSearcher
+from main.indexes.indexers.faiss_indexer import FaissIndexer
+from main.indexes.indexers.bm25_indexer import Bm25Indexer
+from tests.fakes import FakeEmbedder, FakeReader, FakeConverter, create_documents
+
+VECTOR_INDEXER_NAME = "indexer_FAISS_IndexFlatL2__embeddings_fake-model"
+LEXICAL_INDEXER_NAME = "indexer_BM25"
+
+class FederatedCollectionsSearcherTest(unittest.TestCase):
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.persister = DiskPersister(base_path=temporary_directory.name)
+
+        self.__create_collection("vectors", FaissIndexer(VECTOR_INDEXER_NAME, FakeEmbedder()), prefix="V")
+        self.__create_collection("words", Bm25Indexer(LEXICAL_INDEXER_NAME), prefix="W")
+
+        self.vector_searcher = DocumentCollectionSearcher("vectors",
+                                                          lambda: (FaissIndexer.load(VECTOR_INDEXER_NAME, FakeEmbedder(), self.persister, f"vectors/indexes/{VECTOR_INDEXER_NAME}"), None),
+                                                          self.persister)
+        self.lexical_searcher = DocumentCollectionSearcher("words",
+                                                           lambda: (Bm25Indexer(LEXICAL_INDEXER_NAME, self.persister.read_bin_file(f"words/indexes/{LEXICAL_INDEXER_NAME}/indexer")), None),
+                                                           self.persister)
+
+    def test_results_of_collections_are_merged_by_their_ranks(self):
+        federated_searcher = FederatedCollectionsSearcher([self.vector_searcher, self.lexical_searcher])
+
+        results = federated_searcher.search("part 1 of document", max_number_of_chunks=6, max_number_of_documents=6)["results"]
+
+        # Distances of vector search and BM25 scores are not comparable, so results of the same rank follow each other
+        vector_ids = [result["id"] for result in self.vector_searcher.search("part 1 of document", max_number_of_chunks=6)["results"]][:3]
+        lexical_ids = [result["id"] for result in self.lexical_searcher.search("part 1 of document", max_number_of_chunks=6)["results"]][:3]
+        self.assertEqual([result["id"] for result in results],
+                         [document_id for rank_ids in zip(vector_ids, lexical_ids) for document_id in rank_ids])
+        self.assertEqual([result["collectionName"] for result in results[:2]], ["vectors", "words"])
+
+    def test_search_many_returns_results_of_every_query(self):
+        federated_searcher = FederatedCollectionsSearcher([self.vector_searcher, self.lexical_searcher])
+
+        search_results = federated_searcher.search_many(["part 0 of document V3", "part 2 of document W5"], max_number_of_chunks=3)
+
+        self.assertEqual([search_result["collectionNames"] for search_result in search_results], [["vectors", "words"]] * 2)
+        self.assertEqual(search_results[0]["results"][0]["id"], "V3")
+        self.assertIn("W5", [result["id"] for result in search_results[1]["results"][:2]])
+
+    def __create_collection(self, collection_name, indexer, prefix):
+        DocumentCollectionCreator(collection_name,
+                                  FakeReader(create_documents(10, prefix=prefix)),
+                                  FakeConverter(),
+                                  [indexer],
+                                  self.persister,
+                                  OPERATION_TYPE.CREATE).run()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import json
+import tempfile
+import unittest
+
+import faiss
+import numpy as np
+
+from main.persisters.disk_persister import DiskPersister
+from main.core.documents_collection_creator import DocumentCollectionCreator, OPERATION_TYPE
+from main.core.documents_collection_searcher import DocumentCollectionSearcher
+from main.core.index_document_mapping import IndexDocumentMapping
+from main.indexes.indexers.faiss_indexer import FaissIndexer
+from tests.fakes import FakeEmbedder, FakeReader, FakeConverter, create_documents
+
+INDEXER_NAME = "indexer_FAISS_IndexFlatL2__embeddings_fake-model"
+
+class LegacyCollectionMigrationTest(unittest.TestCase):
+    def setUp(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        self.base_path = temporary_directory.name
+        self.persister = DiskPersister(base_path=self.base_path)
+        self.documents = create_documents(10)
+        self.__create_legacy_collection("c", self.documents)
+
+    def test_searcher_reads_legacy_collection_without_changing_it(self):
+        files_before_search = self.__list_files()
+
+        result = self.__create_searcher().search("part 1 of document D4", max_number_of_chunks=1, include_matched_chunks_content=True)["results"][0]
+
+        self.assertEqual(result["id"], "D4")
+        self.assertEqual(result["path"], "c/documents/D4.json")
+        self.assertEqual(result["matchedChunks"][0]["content"]["indexedData"], "part 1 of document D4")
+        self.assertEqual(self.__list_files(), files_before_search)
+
+    def test_update_migrates_legacy_collection_and_rewrites_document_paths(self):
+        changed_document = { **self.documents[3], "modifiedTime": "2025-02-01T00:00:00+00:00", "parts": ["changed part of document D3"] }
+        self.__update([changed_document])
+
+        self.assertFalse(self.persister.is_path_exists("c/indexes/index_document_mapping.json"))
+        self.assertFalse(self.persister.is_path_exists("c/indexes/reverse_index_document_mapping.json"))
+        self.assertTrue(self.persister.is_path_exists("c/document_store/info.json"))
+        # Searchers that still use the previous manifest read JSON documents until the next run
+        self.assertTrue(self.persister.is_path_exists("c/documents"))
+
+        index_document_mapping = IndexDocumentMapping.load(self.persister, "c")
+        document_ordinals, _ = index_document_mapping.lookup(index_document_mapping.get_indexed_item_ids())
+        self.assertEqual({ index_document_mapping.get_document_path(int(document_ordinal)) for document_ordinal in document_ordinals },
+                         { f"c/document_store/{document['id']}" for document in self.documents })
+
+        searcher = self.__create_searcher()
+        unchanged_result = searcher.search("part 2 of document D5", max_number_of_chunks=1, include_matched_chunks_content=True)["results"][0]
+        self.assertEqual(unchanged_result["id"], "D5")
+        self.assertEqual(unchanged_result["path"], "c/document_store/D5")
+        self.assertEqual(unchanged_result["matchedChunks"][0]["content"]["indexedData"], "part 2 of document D5")
+        changed_result = searcher.search("changed part of document D3", max_number_of_chunks=1, include_matched_chunks_content=True)["results"][0]
+        self.assertEqual(changed_result["matchedChunks"][0]["content"]["indexedData"], "changed part of document D3")
+
+        self.__update([changed_document])
+
+        self.assertFalse(self.persister.is_path_exists("c/documents"))
+        self.assertEqual(self.__create_searcher().search("part 2 of document D5", max_number_of_chunks=1)["results"][0]["id"], "D5")
+
+    def __create_legacy_collection(self, collection_name, documents):
+        # Files as collections were written before the document store and the binary index document mapping
+        embedder = FakeEmbedder()
+        faiss_index = faiss.IndexIDMap(faiss.IndexFlatL2(embedder.get_number_of_dimensions()))
+        index_document_mapping = {}
+        reverse_index_document_mapping = {}
+
+        index_item_id = 0
+        for converted_document in [FakeConverter().convert(document)[0] for document in documents]:
+            document_path = f"{collection_name}/documents/{converted_document['id']}.json"
+            self.persister.save_text_file(json.dumps(converted_document), document_path)
+
+            reverse_index_document_mapping[converted_document["id"]] = []
+            for chunk_number, chunk in enumerate(converted_document["chunks"]):
+                index_document_mapping[str(index_item_id)] = {
+                    "documentId": converted_document["id"],
+                    "documentUrl": converted_document["url"],
+                    "documentPath": document_path,
+                    "chunkNumber": chunk_number,
+                }
+                reverse_index_document_mapping[converted_document["id"]].append(index_item_id)
+                faiss_index.add_with_ids(np.expand_dims(embedder.embed(chunk["indexedData"]), axis=0), np.array([index_item_id]))
+                index_item_id += 1
+
+        self.persister.save_text_file(json.dumps(index_document_mapping), f"{collection_name}/indexes/index_document_mapping.json")
+        self.persister.save_text_file(json.dumps(reverse_index_document_mapping), f"{collection_name}/indexes/reverse_index_document_mapping.json")
+        self.persister.save_text_file(json.dumps({ "lastIndexItemId": index_item_id - 1 }), f"{collection_name}/indexes/index_info.json")
+        self.persister.save_bin_file(faiss.serialize_index(faiss_index), f"{collection_name}/indexes/{INDEXER_NAME}/indexer")
+        self.persister.save_text_file(json.dumps({
+            "collectionName": collection_name,
+            "updatedTime": "2025-01-01T00:00:00+00:00",
+            "lastModifiedDocumentTime": "2025-01-01T00:00:00+00:00",
+            "numberOfDocuments": len(documents),
+            "numberOfChunks": index_item_id,
+            "reader": { "type": "fake" },
+            "indexers": [{ "name": INDEXER_NAME }],
+        }), f"{collection_name}/manifest.json")
+
+    def __update(self, documents):
+        DocumentCollectionCreator("c",
+                                  FakeReader(documents),
+                                  FakeConverter(),
+                                  [FaissIndexer.load(INDEXER_NAME, FakeEmbedder(), self.persister, f"c/indexes/{INDEXER_NAME}")],
+                                  self.persister,
+                                  OPERATION_TYPE.UPDATE).run()
+
+    def __create_searcher(self):
+        return DocumentCollectionSearcher("c",
+                                          lambda: (FaissIndexer.load(INDEXER_NAME, FakeEmbedder(), self.persister, f"c/indexes/{INDEXER_NAME}"), None),
+                                          self.persister)
+
+    def __list_files(self):
+        return sorted(os.path.relpath(os.path.join(folder, file_name), self.base_path)
+                      for folder, _, file_names in os.walk(self.base_path)
+                      for file_name in file_names)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+
+from main.utils.lru_cache import LruCache
+from main.persisters.disk_persister import DiskPersister
+from main.core.documents_collection_creator import DocumentCollectionCreator, OPERATION_TYPE
+from main.core.documents_collection_searcher import DocumentCollectionSearcher
+from main.indexes.indexers.faiss_indexer import FaissIndexer
+from tests.fakes import FakeEmbedder, FakeReader, FakeConverter, create_documents
+
+INDEXER_NAME = "indexer_FAISS_IndexFlatL2__embeddings_fake-model"
+
+class LruCacheTest(unittest.TestCase):
+    def test_least_recently_used_items_are_evicted_by_size(self):
+        cache = LruCache(max_size=10)
+        cache.put("a", "first", size=4)
+        cache.put("b", "second", size=4)
+        cache.get("a")
+
+        cache.put("c", "third", size=4)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "first")
+        self.assertEqual(cache.get("c"), "third")
+        self.assertEqual(cache.get_statistics()["size"], 8)
+
+    def test_items_larger_than_cache_are_not_cached(self):
+        cache = LruCache(max_size=10)
+        cache.put("a", "first", size=4)
+
+        cache.put("b", "second", size=11)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "first")
+
+    def test_replaced_item_changes_size(self):
+        cache = LruCache(max_size=10, size_func=len)
+        cache.put("a", "first")
+        cache.put("a", "replaced")
+
+        self.assertEqual(cache.get("a"), "replaced")
+        self.assertEqual(cache.get_statistics()["size"], len("replaced"))
+
+    def test_statistics_count_hits_and_misses(self):
+        cache = LruCache(max_size=10)
+        cache.put("a", "first")
+        cache.get("a")
+        cache.get("b")
+        cache.clear()
+        cache.get("a")
+
+        statistics = cache.get_statistics()
+        self.assertEqual((statistics["hits"], statistics["misses"]), (1, 2))
+        self.assertEqual((statistics["numberOfItems"], statistics["size"]), (0, 0))
+
+
+class DocumentCacheTest(unittest.TestCase):
+    def test_repeated_searches_read_documents_from_cache(self):
+        temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary_directory.cleanup)
+        persister = DiskPersister(base_path=temporary_directory.name)
+        DocumentCollectionCreator("c", FakeReader(create_documents(10)), FakeConverter(), [FaissIndexer(INDEXER_NAME, FakeEmbedder())], persister, OPERATION_TYPE.CREATE).run()
+        searcher = DocumentCollectionSearcher("c", lambda: (FaissIndexer.load(INDEXER_NAME, FakeEmbedder(), persister, f"c/indexes/{INDEXER_NAME}"), None), persister)
+
+        first_results = searcher.search("part 1 of document D4", max_number_of_chunks=5, include_matched_chunks_content=True)
+        first_statistics = searcher.get_document_cache_statistics()
+        second_results = searcher.search("part 1 of document D4", max_number_of_chunks=5, include_matched_chunks_content=True)
+        second_statistics = searcher.get_document_cache_statistics()
+
+        self.assertEqual(first_results, second_results)
+        self.assertGreater(first_statistics["misses"], 0)
+        self.assertEqual(second_statistics["misses"], first_statistics["misses"])
+        self.assertGreater(second_statistics["hits"], first_statistics["hits"])
+
+
+if __name__ == "__main__":
+    unittest.main()
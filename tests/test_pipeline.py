@@ -0,0 +1,56 @@
+import unittest
+
+from main.utils.pipeline import Pipeline, PipelineStage
+
+class PipelineTest(unittest.TestCase):
+    def test_items_pass_all_stages_in_order(self):
+        output_items = []
+        pipeline = Pipeline([
+            PipelineStage("Reading", lambda _: iter(range(0, 100)), output_queue_size=3),
+            PipelineStage("Doubling", lambda items: (2 * item for item in items), output_queue_size=3),
+            PipelineStage("Collecting", lambda items: (output_items.append(item) for item in items)),
+        ])
+
+        pipeline.run()
+
+        self.assertEqual(output_items, [2 * item for item in range(0, 100)])
+        self.assertTrue(pipeline.is_last_stage_completed)
+
+    def test_items_queued_before_error_are_processed_by_next_stages(self):
+        def read_items(_):
+            yield from range(0, 10)
+            raise ConnectionError("Source is not available")
+
+        output_items = []
+        pipeline = Pipeline([
+            PipelineStage("Reading", read_items, output_queue_size=100),
+            PipelineStage("Collecting", lambda items: (output_items.append(item) for item in items)),
+        ])
+
+        with self.assertRaises(ConnectionError):
+            pipeline.run()
+
+        self.assertEqual(output_items, list(range(0, 10)))
+        self.assertTrue(pipeline.is_last_stage_completed)
+
+    def test_error_of_last_stage_stops_previous_stages(self):
+        def collect_items(items):
+            for item in items:
+                if item == 5:
+                    raise ValueError("Item can not be indexed")
+                yield item
+
+        pipeline = Pipeline([
+            PipelineStage("Reading", lambda _: iter(range(0, 1_000_000)), output_queue_size=1),
+            PipelineStage("Collecting", collect_items),
+        ])
+
+        with self.assertRaises(ValueError):
+            pipeline.run()
+
+        self.assertFalse(pipeline.is_last_stage_completed)
+        self.assertLess(pipeline.stages[0].number_of_output_items, 1_000_000)
+
+
+if __name__ == "__main__":
+    unittest.main()